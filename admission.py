@@ -0,0 +1,178 @@
+# admission.py
+"""Adaptive admission control for the expensive endpoints (/generate, /reflect).
+
+Each endpoint has an AdmissionController holding a concurrency limit that adapts to the
+latency it observes (AIMD): completions under the target latency raise the limit by about
+one per limit's worth of requests, a completion over it cuts the limit by 10% (at most once
+per target interval). Requests beyond the limit wait in a FIFO queue, but only if the
+expected wait (queue position x average latency / limit) fits in max_wait; otherwise, or
+when the wait runs out, they are shed at once with Overloaded, so the server keeps doing
+useful work at its limit instead of queueing requests whose clients have already gone.
+
+Runs on the event loop only: acquire/release are not thread-safe.
+"""
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+ADMISSION_GENERATE_INITIAL_LIMIT = int(os.getenv("ADMISSION_GENERATE_INITIAL_LIMIT", str(os.cpu_count() or 2)))
+ADMISSION_GENERATE_MAX_LIMIT = int(os.getenv("ADMISSION_GENERATE_MAX_LIMIT", "64"))
+ADMISSION_GENERATE_TARGET_SECONDS = float(os.getenv("ADMISSION_GENERATE_TARGET_SECONDS", "2"))
+ADMISSION_GENERATE_MAX_WAIT_SECONDS = float(os.getenv("ADMISSION_GENERATE_MAX_WAIT_SECONDS", "1"))
+
+ADMISSION_REFLECT_INITIAL_LIMIT = int(os.getenv("ADMISSION_REFLECT_INITIAL_LIMIT", "16"))
+ADMISSION_REFLECT_MAX_LIMIT = int(os.getenv("ADMISSION_REFLECT_MAX_LIMIT", "128"))
+ADMISSION_REFLECT_TARGET_SECONDS = float(os.getenv("ADMISSION_REFLECT_TARGET_SECONDS", "10"))
+ADMISSION_REFLECT_MAX_WAIT_SECONDS = float(os.getenv("ADMISSION_REFLECT_MAX_WAIT_SECONDS", "0.5"))
+
+BACKOFF_RATIO = 0.9
+WAIT_SAMPLES = 1000
+
+
+class Overloaded(Exception):
+    def __init__(self, message, retry_after=1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 4)
+
+
+class AdmissionController:
+    def __init__(self, name, initial_limit, max_limit, target_seconds, max_wait_seconds, min_limit=1):
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max(max_limit, min_limit)
+        self.limit = float(min(max(initial_limit, min_limit), self.max_limit))
+        self.target_seconds = target_seconds
+        self.max_wait_seconds = max_wait_seconds
+        self.in_flight = 0
+        self._waiters = deque()
+        self._last_decrease = 0.0
+        self.latency_ewma = None
+        self.queue_waits = deque(maxlen=WAIT_SAMPLES)
+        self.admitted = 0
+        self.completed = 0
+        self.shed = {"deadline": 0, "wait_timeout": 0}
+
+    @property
+    def current_limit(self):
+        return max(self.min_limit, int(self.limit))
+
+    @property
+    def queued(self):
+        return sum(1 for waiter in self._waiters if not waiter.done())
+
+    def expected_wait(self, position):
+        latency = self.latency_ewma if self.latency_ewma is not None else self.target_seconds
+        return position * latency / self.current_limit
+
+    def retry_after(self):
+        return max(1, min(30, math.ceil(self.expected_wait(self.queued + 1))))
+
+    def _shed(self, reason):
+        self.shed[reason] += 1
+        raise Overloaded(f"{self.name} is over capacity ({self.in_flight} in flight, limit {self.current_limit}, "
+                         f"{self.queued} queued)", self.retry_after())
+
+    async def acquire(self):
+        """Wait for a slot; returns the seconds spent queued, raises Overloaded instead of missing max_wait."""
+        if self.in_flight < self.current_limit and not self.queued:
+            self.in_flight += 1
+            self.admitted += 1
+            self.queue_waits.append(0.0)
+            return 0.0
+        if self.expected_wait(self.queued + 1) > self.max_wait_seconds:
+            self._shed("deadline")
+
+        start = time.monotonic()
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait({waiter}, timeout=self.max_wait_seconds)
+        except BaseException:
+            # Cancelled (client went away): give back a slot that was already handed over
+            if waiter.done() and not waiter.cancelled():
+                self.in_flight -= 1
+                self._wake()
+            waiter.cancel()
+            raise
+        if not waiter.done():
+            waiter.cancel()
+            self._shed("wait_timeout")
+        # release() handed its slot (in_flight already counts this request) to the waiter
+        waited = time.monotonic() - start
+        self.admitted += 1
+        self.queue_waits.append(waited)
+        return waited
+
+    def release(self, latency):
+        self.in_flight -= 1
+        self.completed += 1
+        self._adjust(latency)
+        self._wake()
+
+    def _wake(self):
+        while self._waiters and self.in_flight < self.current_limit:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def _adjust(self, latency):
+        self.latency_ewma = latency if self.latency_ewma is None else 0.8 * self.latency_ewma + 0.2 * latency
+        now = time.monotonic()
+        if latency > self.target_seconds:
+            if now - self._last_decrease >= self.target_seconds:
+                self.limit = max(self.min_limit, self.limit * BACKOFF_RATIO)
+                self._last_decrease = now
+        elif self.in_flight + 1 >= self.current_limit:
+            # Only grow a limit that is actually being used
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    @asynccontextmanager
+    async def slot(self):
+        await self.acquire()
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - start)
+
+    def stats(self):
+        waits = list(self.queue_waits)
+        return {
+            "limit": self.current_limit,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "admitted": self.admitted,
+            "completed": self.completed,
+            "shed": dict(self.shed),
+            "latency_ewma_seconds": round(self.latency_ewma, 4) if self.latency_ewma is not None else None,
+            "queue_wait_p50_seconds": _percentile(waits, 0.5),
+            "queue_wait_p95_seconds": _percentile(waits, 0.95),
+            "queue_wait_max_seconds": round(max(waits), 4) if waits else None,
+            "target_seconds": self.target_seconds,
+            "max_wait_seconds": self.max_wait_seconds,
+        }
+
+
+generate_admission = AdmissionController(
+    "/generate", ADMISSION_GENERATE_INITIAL_LIMIT, ADMISSION_GENERATE_MAX_LIMIT,
+    ADMISSION_GENERATE_TARGET_SECONDS, ADMISSION_GENERATE_MAX_WAIT_SECONDS,
+)
+reflect_admission = AdmissionController(
+    "/reflect", ADMISSION_REFLECT_INITIAL_LIMIT, ADMISSION_REFLECT_MAX_LIMIT,
+    ADMISSION_REFLECT_TARGET_SECONDS, ADMISSION_REFLECT_MAX_WAIT_SECONDS,
+)
+
+
+def admission_stats():
+    return {controller.name: controller.stats() for controller in (generate_admission, reflect_admission)}
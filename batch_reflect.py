@@ -0,0 +1,252 @@
+# batch_reflect.py
+"""Morning reflections for every active user in one run.
+
+Reads each user's latest twin from the history index, builds the same prompt as
+POST /reflect and runs the completions concurrently, at most BATCH_REFLECT_CONCURRENCY
+at a time. A 429 pauses every worker for the Retry-After the API sent (or an exponential
+backoff with jitter) before retrying; a user whose completion still fails gets the
+local_fallback text. Results go to vector_store/reflections.json, which
+GET /reflections/{user_id} serves.
+
+    python batch_reflect.py --concurrency 16 --active-days 1
+    OPENAI_API_BASE=http://127.0.0.1:8765/v1 OPENAI_API_KEY=sk-fake python batch_reflect.py   # fake_services.py
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+import aiohttp
+import openai
+
+import vector_store
+from reflection import REFLECTION_MODEL, agenerate_reflection, local_fallback
+from twin_history import get_history_index
+
+BATCH_REFLECT_CONCURRENCY = int(os.getenv("BATCH_REFLECT_CONCURRENCY", "8"))
+BATCH_REFLECT_MAX_RETRIES = int(os.getenv("BATCH_REFLECT_MAX_RETRIES", "5"))
+BATCH_REFLECT_BACKOFF_SECONDS = float(os.getenv("BATCH_REFLECT_BACKOFF_SECONDS", "1"))
+BATCH_REFLECT_MAX_BACKOFF_SECONDS = float(os.getenv("BATCH_REFLECT_MAX_BACKOFF_SECONDS", "60"))
+BATCH_REFLECT_TIMEOUT_SECONDS = float(os.getenv("BATCH_REFLECT_TIMEOUT_SECONDS", "60"))
+ACTIVE_DAYS = float(os.getenv("BATCH_REFLECT_ACTIVE_DAYS", "7"))
+
+# The store has no mood or journal text, so the batch prompt uses a neutral morning check-in
+DEFAULT_EMOTION = "ready to start the day"
+DEFAULT_RECENT_EVENTS = "a new day is starting"
+DEFAULT_GOALS = "stay focused and balanced today"
+
+RETRYABLE_ERRORS = (
+    openai.error.RateLimitError,
+    openai.error.ServiceUnavailableError,
+    openai.error.APIConnectionError,
+    openai.error.Timeout,
+)
+
+
+def retryable(error):
+    if isinstance(error, RETRYABLE_ERRORS):
+        return True
+    # 5xx from the API are transient; 4xx (bad key, bad request) won't get better by retrying
+    return isinstance(error, openai.error.APIError) and (error.http_status or 500) >= 500
+
+
+def reflections_path():
+    return vector_store.store_path("reflections.json")
+
+
+def active_twins(active_days=ACTIVE_DAYS, limit=None):
+    """Latest twin per user, for users whose latest twin is newer than active_days (0: everyone)."""
+    history = get_history_index()
+    cutoff = (datetime.utcnow() - timedelta(days=active_days)).isoformat() if active_days > 0 else ""
+    twins = []
+    for user_id in sorted(history.users()):
+        twin = history.latest(user_id)
+        if twin and str(twin.get("timestamp", "")) >= cutoff:
+            twins.append(twin)
+            if limit and len(twins) >= limit:
+                break
+    return twins
+
+
+def reflect_request(twin):
+    """ReflectRequest-shaped data for a stored twin."""
+    return {
+        "name": twin.get("name") or "there",
+        "current_emotion": DEFAULT_EMOTION,
+        "recent_events": DEFAULT_RECENT_EVENTS,
+        "goals": DEFAULT_GOALS,
+        "neurotransmitters": twin.get("neurotransmitters") or {},
+        "xbox_game": twin.get("xbox_game"),
+        "game_mode": twin.get("game_mode"),
+        "duration_minutes": twin.get("duration_minutes"),
+        "switch_time": twin.get("switch_time"),
+    }
+
+
+def _retry_after(error):
+    headers = getattr(error, "headers", None) or {}
+    try:
+        return float(headers.get("Retry-After") or headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class BatchReflector:
+    """Runs the completions with bounded concurrency and a shared rate-limit pause."""
+
+    def __init__(self, concurrency=BATCH_REFLECT_CONCURRENCY, max_retries=BATCH_REFLECT_MAX_RETRIES,
+                 backoff_seconds=BATCH_REFLECT_BACKOFF_SECONDS, timeout=BATCH_REFLECT_TIMEOUT_SECONDS):
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.timeout = timeout
+        self.paused_until = 0.0
+        self.rate_limited = 0
+        self.retries = 0
+
+    def backoff(self, attempt, error):
+        delay = _retry_after(error)
+        if delay is None:
+            delay = min(BATCH_REFLECT_MAX_BACKOFF_SECONDS, self.backoff_seconds * 2 ** attempt)
+        return delay * random.uniform(1.0, 1.25)
+
+    async def wait_for_pause(self):
+        delay = self.paused_until - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def reflect(self, twin, semaphore):
+        data = reflect_request(twin)
+        async with semaphore:
+            error = None
+            for attempt in range(self.max_retries + 1):
+                await self.wait_for_pause()
+                try:
+                    journal = await agenerate_reflection(data, request_timeout=self.timeout)
+                    return self.result(twin, journal, "llm", attempt)
+                except Exception as e:
+                    error = e
+                    if not retryable(e) or attempt == self.max_retries:
+                        break
+                    delay = self.backoff(attempt, e)
+                    if isinstance(e, openai.error.RateLimitError):
+                        # The limit is per account: hold every worker back, not just this one
+                        self.rate_limited += 1
+                        self.paused_until = max(self.paused_until, time.monotonic() + delay)
+                    else:
+                        await asyncio.sleep(delay)
+                    self.retries += 1
+            print(f"⚠️ Reflection fallback for {twin.get('user_id')}: {error}")
+            return self.result(twin, local_fallback(data), "fallback", attempt, error)
+
+    @staticmethod
+    def result(twin, journal, source, attempt, error=None):
+        result = {
+            "user_id": twin.get("user_id"),
+            "name": twin.get("name"),
+            "vector_id": twin.get("vector_id"),
+            "twin_timestamp": twin.get("timestamp"),
+            "journal_entry": journal,
+            "source": source,
+            "attempts": attempt + 1,
+            "generated_at": datetime.utcnow().isoformat(),
+        }
+        if error is not None:
+            result["error"] = str(error)
+        return result
+
+    async def run(self, twins):
+        semaphore = asyncio.Semaphore(self.concurrency)
+        # One shared HTTP session so connections to the API are reused across completions
+        async with aiohttp.ClientSession() as session:
+            openai.aiosession.set(session)
+            return await asyncio.gather(*(self.reflect(twin, semaphore) for twin in twins))
+
+
+def load_reflections():
+    path = reflections_path()
+    if not os.path.exists(path):
+        return {"generated_at": None, "reflections": {}}
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def save_reflections(results, model=REFLECTION_MODEL):
+    """Merge results into reflections.json (users not in this run keep their last reflection)."""
+    store = load_reflections()
+    store["reflections"].update({r["user_id"]: r for r in results if r.get("user_id")})
+    store["generated_at"] = datetime.utcnow().isoformat()
+    store["model"] = model
+    path = reflections_path()
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(store, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    return store
+
+
+def run_batch(concurrency=BATCH_REFLECT_CONCURRENCY, active_days=ACTIVE_DAYS, limit=None):
+    """Reflect for every active user and save the results; returns a run summary."""
+    start = time.perf_counter()
+    twins = active_twins(active_days, limit)
+    reflector = BatchReflector(concurrency=concurrency)
+    results = asyncio.run(reflector.run(twins)) if twins else []
+    save_reflections(results)
+    return {
+        "users": len(results),
+        "llm": sum(1 for r in results if r["source"] == "llm"),
+        "fallback": sum(1 for r in results if r["source"] == "fallback"),
+        "retries": reflector.retries,
+        "rate_limited": reflector.rate_limited,
+        "concurrency": concurrency,
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+
+_lock = threading.Lock()
+_cached = None
+_cached_key = None
+
+
+def get_reflection(user_id):
+    """A user's stored reflection; reflections.json is re-read only when it changes on disk."""
+    global _cached, _cached_key
+    path = reflections_path()
+    try:
+        stat = os.stat(path)
+        key = (path, stat.st_mtime_ns, stat.st_size)
+    except FileNotFoundError:
+        return None
+    with _lock:
+        if key != _cached_key:
+            _cached = load_reflections()
+            _cached_key = key
+        return _cached["reflections"].get(user_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate reflections for every active user.")
+    parser.add_argument("--concurrency", type=int, default=BATCH_REFLECT_CONCURRENCY)
+    parser.add_argument("--active-days", type=float, default=ACTIVE_DAYS,
+                        help="Only users with a twin in the last N days (0: all users)")
+    parser.add_argument("--limit", type=int, help="At most this many users")
+    parser.add_argument("--store-dir", help="Store to read twins from and write reflections.json to")
+    args = parser.parse_args()
+
+    if args.store_dir:
+        vector_store.set_store_dir(args.store_dir)
+    if args.concurrency < 1:
+        print("❌ --concurrency must be at least 1", file=sys.stderr)
+        return 1
+    summary = run_batch(args.concurrency, args.active_days, args.limit)
+    print(f"✅ Reflections written to {reflections_path()}: {json.dumps(summary)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,245 @@
+# benchmarks.py
+"""Function-level benchmarks for the generator and vector-store hot paths.
+
+Each function is timed over parameterized store sizes (number of stored twins) and
+catalog sizes (synthetic fragrances/games added on top of the shipped JSON files),
+with fixed seeds so `random.uniform` noise is identical between runs. Timings are
+per call (best/median over several rounds); memory is the tracemalloc peak of one call.
+
+    python benchmarks.py --store-sizes 1000,10000 --catalog-sizes 0,1000 --output bench.json
+    python benchmarks.py --only search_similar_twins,add_twin
+
+genderize.io is replaced by a constant so network latency does not enter the numbers,
+and the store lives in a scratch directory.
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+INVOKED_FROM = os.getcwd()
+SCRATCH_DIR = tempfile.mkdtemp(prefix="neurosync-bench-")
+os.chdir(SCRATCH_DIR)
+sys.path.insert(0, REPO_DIR)
+
+import generator  # noqa: E402
+import main  # noqa: E402
+import reference_data  # noqa: E402
+import vector_store  # noqa: E402
+from brain_regions import compute_brain_regions, compute_subvectors  # noqa: E402
+
+NT_KEYS = vector_store.NT_KEYS
+NOTE_WORDS = ["lavender", "vanilla", "mint", "citrus", "rose", "bergamot", "cinnamon", "musk", "amber", "jasmine",
+              "cedar", "patchouli", "iris", "pepper", "oud", "tonka bean", "sandalwood", "neroli", "pine", "apple"]
+TAGS = ["dopamine", "serotonin", "oxytocin", "GABA", "cortisol"]
+
+SAMPLE_REQUEST = main.TwinRequest(
+    name="Ananya Malhotra",
+    email="ananya.malhotra@stanford.edu",
+    job_title="Software Engineer",
+    company="Acme AI",
+    career_goals="I want to lead an ML team and ship products I am proud of",
+    productivity_limiters="deadline pressure, burnout and constant multitasking with my manager",
+    scent_note="versace eros",
+    childhood_scent="my grandmother's kitchen smelled of warm cinnamon, vanilla and fresh jasmine",
+    assigned_sex="female",
+)
+
+
+def synthetic_twin(rng, i):
+    return {
+        "name": f"user{i % 5000}",
+        "gender": rng.choice(["female", "male", "neutral"]),
+        "life_stage": rng.choice(["young_adult", "adult", "senior"]),
+        "age_range": rng.choice(["18-25", "25-40", "60+"]),
+        "neurotransmitters": {k: round(rng.random(), 2) for k in NT_KEYS},
+        "timestamp": f"2025-01-{1 + i % 28:02d}T{i % 24:02d}:00:00",
+    }
+
+
+def use_store(size, seed):
+    """Point vector_store at a fresh scratch store holding `size` twins.
+
+    Rebuilt for every case so benchmarks that write (add_twin) do not inflate later ones.
+    """
+    store_dir = os.path.join(SCRATCH_DIR, f"store_{size}")
+    shutil.rmtree(store_dir, ignore_errors=True)
+    vector_store.set_store_dir(store_dir)
+    rng = random.Random(seed)
+    twins = [synthetic_twin(rng, i) for i in range(size)]
+    if twins:
+        vector_store.add_twins(twins)
+    else:
+        vector_store.save_metadata([])
+
+
+class Catalog:
+    """Temporarily grow the fragrance and game catalogs with synthetic entries."""
+
+    def __init__(self, extra, seed):
+        self.extra = extra
+        self.seed = seed
+
+    def __enter__(self):
+        self.saved = reference_data.get_reference()
+        sources = {**self.saved.sources,
+                   "fragrance_notes": dict(self.saved.fragrance_db),
+                   "game_profiles": list(self.saved.game_profiles)}
+        rng = random.Random(self.seed)
+        for i in range(self.extra):
+            notes = rng.sample(NOTE_WORDS, 3)
+            sources["fragrance_notes"][f"synthetic perfume {i}"] = notes
+            sources["game_profiles"].append({
+                "name": f"Synthetic Game {i}",
+                "modes": ["Solo", "Co-op"],
+                "tags": rng.sample(TAGS, 2),
+                "scent_affinity": {note: round(rng.random(), 2) for note in notes},
+                "duration_range": [15, 45],
+            })
+        reference_data.set_reference(reference_data.ReferenceData(sources))
+        return self
+
+    def __exit__(self, *exc):
+        reference_data.set_reference(self.saved)
+
+
+def bench_cases():
+    """(name, axes, callable) for every benchmarked function; axes says which sizes matter."""
+    nt = {"dopamine": 0.62, "serotonin": 0.55, "oxytocin": 0.48, "GABA": 0.41, "cortisol": 0.58}
+    return [
+        ("generate_twin_vector", ("catalog",),
+         lambda: generator.generate_twin_vector(SAMPLE_REQUEST, goals_sentiment=0.3, stressors_sentiment=-0.4)),
+        ("extract_keywords", (), lambda: generator.extract_keywords(SAMPLE_REQUEST.productivity_limiters)),
+        ("extract_memory_scent_profile", ("catalog",),
+         lambda: generator.extract_memory_scent_profile(SAMPLE_REQUEST.childhood_scent, reference_data.get_reference().fragrance_db,
+                                                       reference_data.get_reference().scent_map)),
+        ("get_closest_scent", ("catalog",), lambda: generator.get_closest_scent("versache eross")),
+        ("build_scent_profile", ("catalog",), lambda: generator.build_scent_profile("dior savage")),
+        ("match_game", ("catalog",), lambda: generator.match_game("mint", SAMPLE_REQUEST.productivity_limiters, nt)),
+        ("add_twin", ("store",), lambda: vector_store.add_twin(synthetic_twin(random.Random(0), 0))),
+        ("load_metadata", ("store",), vector_store.load_metadata),
+        ("search_similar_twins", ("store",), lambda: vector_store.search_similar_twins(nt, top_k=10)),
+        ("search_similar_twins[brain_regions]", ("store",),
+         lambda: vector_store.search_similar_twins(compute_brain_regions(nt), top_k=10, space="brain_regions")),
+        ("search_similar_twins[subvectors]", ("store",),
+         lambda: vector_store.search_similar_twins(compute_subvectors(nt), top_k=10, space="subvectors")),
+    ]
+
+
+def measure(fn, seed, rounds, min_round_seconds):
+    random.seed(seed)
+    fn()  # warm-up: lazy imports, caches, tagger loading
+
+    number = 1
+    while True:
+        random.seed(seed)
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        if time.perf_counter() - start >= min_round_seconds or number >= 1 << 16:
+            break
+        number *= 2
+
+    per_call = []
+    for _ in range(rounds):
+        random.seed(seed)
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        per_call.append((time.perf_counter() - start) / number)
+
+    random.seed(seed)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "calls_per_round": number,
+        "rounds": rounds,
+        "best_us": round(min(per_call) * 1e6, 2),
+        "median_us": round(statistics.median(per_call) * 1e6, 2),
+        "stdev_us": round(statistics.pstdev(per_call) * 1e6, 2),
+        "peak_alloc_kb": round(peak / 1024, 1),
+    }
+
+
+def run(store_sizes, catalog_sizes, only, seed, rounds, min_round_seconds):
+    generator.infer_gender = lambda name: "female"
+    results = []
+    for name, axes, fn in bench_cases():
+        if only and name not in only:
+            continue
+        stores = store_sizes if "store" in axes else store_sizes[:1]
+        catalogs = catalog_sizes if "catalog" in axes else catalog_sizes[:1]
+        for store_size in stores:
+            for catalog_size in catalogs:
+                use_store(store_size, seed)
+                # the hot paths print diagnostics; keep the formatting cost but not the terminal I/O
+                with Catalog(catalog_size, seed), open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                    try:
+                        stats = measure(fn, seed, rounds, min_round_seconds)
+                    except Exception as e:
+                        stats = {"error": f"{type(e).__name__}: {(str(e).strip().splitlines() or [''])[0]}"}
+                row = {"function": name, "store_size": store_size, "catalog_extra": catalog_size, **stats}
+                results.append(row)
+                print_row(row)
+    return results
+
+
+def print_row(row):
+    if "error" in row:
+        print(f"{row['function']:<30} store={row['store_size']:<8} catalog=+{row['catalog_extra']:<6} ❌ {row['error']}")
+        return
+    print(f"{row['function']:<30} store={row['store_size']:<8} catalog=+{row['catalog_extra']:<6} "
+          f"best={row['best_us']:>12.1f}µs median={row['median_us']:>12.1f}µs peak={row['peak_alloc_kb']:>10.1f}KB")
+
+
+def int_list(text):
+    return [int(x) for x in text.split(",") if x.strip()]
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Microbenchmarks for generator and vector-store hot paths.")
+    parser.add_argument("--store-sizes", type=int_list, default="1000,10000")
+    parser.add_argument("--catalog-sizes", type=int_list, default="0,1000",
+                        help="Synthetic fragrances/games added to the shipped catalogs")
+    parser.add_argument("--only", type=lambda s: set(s.split(",")), help="Comma-separated function names")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--min-round-seconds", type=float, default=0.2)
+    parser.add_argument("--output", help="Write results as JSON")
+    args = parser.parse_args(argv)
+
+    results = run(args.store_sizes, args.catalog_sizes, args.only, args.seed, args.rounds, args.min_round_seconds)
+
+    if args.output:
+        report = {
+            "timestamp": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": {
+                "store_sizes": args.store_sizes,
+                "catalog_sizes": args.catalog_sizes,
+                "seed": args.seed,
+                "rounds": args.rounds,
+            },
+            "results": results,
+        }
+        with open(os.path.join(INVOKED_FROM, args.output), "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,48 @@
+# brain_regions.py
+"""Brain-region activity and per-region subvectors derived from a twin's neurotransmitters.
+
+generate_twin_vector reports these with every twin; the vector store indexes them as two
+more embedding spaces (BRAIN_REGIONS: 4 dims, SUBVECTOR_KEYS: 8 dims) and uses the same
+formulas to backfill twins stored before those indexes existed.
+"""
+BRAIN_REGIONS = ["amygdala", "prefrontal_cortex", "hippocampus", "hypothalamus"]
+SUBVECTOR_KEYS = [
+    ("amygdala", "emotional_memory"),
+    ("amygdala", "threat_detection"),
+    ("prefrontal_cortex", "planning"),
+    ("prefrontal_cortex", "focus"),
+    ("hippocampus", "memory_encoding"),
+    ("hippocampus", "spatial_navigation"),
+    ("hypothalamus", "stress_response"),
+    ("hypothalamus", "emotional_regulation"),
+]
+
+
+def compute_brain_regions(nt):
+    return {
+        "amygdala": round((nt["cortisol"] * 0.6 + nt["oxytocin"] * 0.4), 2),
+        "prefrontal_cortex": round((nt["dopamine"] * 0.5 + nt["serotonin"] * 0.5), 2),
+        "hippocampus": round((nt["serotonin"] * 0.6 + nt["GABA"] * 0.4), 2),
+        "hypothalamus": round((nt["GABA"] * 0.5 + nt["cortisol"] * 0.5), 2)
+    }
+
+
+def compute_subvectors(nt):
+    return {
+        "amygdala": {
+            "emotional_memory": round((nt["oxytocin"] * 0.6 + nt["cortisol"] * 0.4), 2),
+            "threat_detection": round(nt["cortisol"], 2)
+        },
+        "prefrontal_cortex": {
+            "planning": round(nt["dopamine"], 2),
+            "focus": round((nt["dopamine"] * 0.6 + nt["serotonin"] * 0.4), 2)
+        },
+        "hippocampus": {
+            "memory_encoding": round(nt["serotonin"], 2),
+            "spatial_navigation": round(nt["GABA"], 2)
+        },
+        "hypothalamus": {
+            "stress_response": round((nt["cortisol"] * 0.7 + nt["GABA"] * 0.3), 2),
+            "emotional_regulation": round(nt["GABA"], 2)
+        }
+    }
@@ -0,0 +1,239 @@
+# cohorts.py
+"""Neurochemical cohorts: k-means over the twin vectors in the FAISS index.
+
+A periodic job (main.py, or `python store_admin.py cohorts`) trains faiss.Kmeans on a
+snapshot of the index, then under the store write lock labels every twin with its
+nearest centroid and writes vector_store/cohorts.json: the centroids plus each cohort's
+size and most popular game and playlist. Training starts from the previous centroids
+so cohort numbers stay stable between runs. New twins are labelled on the way in with
+a single nearest-centroid lookup (assign_cohort).
+
+The background job runs in one process at a time (an flock on vector_store/cohorts.lock)
+and only once cohorts.json is COHORT_INTERVAL_SECONDS old, so restarts and extra workers
+don't retrain; metadata.json is rewritten only when some twin's label changed.
+"""
+import fcntl
+import json
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+import faiss
+import numpy as np
+
+import vector_store
+from vector_store import (
+    NT_KEYS,
+    VECTOR_DIM,
+    StoreLocked,
+    bump_version,
+    index_ids,
+    load_index,
+    load_metadata,
+    load_tombstones,
+    save_metadata,
+    store_lock,
+)
+
+COHORT_K = int(os.getenv("COHORT_K", "8"))
+COHORT_NITER = int(os.getenv("COHORT_NITER", "25"))
+COHORT_INTERVAL_SECONDS = float(os.getenv("COHORT_INTERVAL_SECONDS", "3600"))
+COHORT_TOP_N = 3
+
+
+def cohorts_path():
+    return vector_store.store_path("cohorts.json")
+
+
+def live_vectors(index):
+    """(vector_ids, float32 vectors) for every twin in the index that is not tombstoned."""
+    if index.ntotal == 0:
+        return np.empty(0, dtype='int64'), np.empty((0, VECTOR_DIM), dtype='float32')
+    ids = index_ids(index)
+    vectors = index.index.reconstruct_n(0, index.ntotal)
+    tombstones = load_tombstones()
+    if tombstones:
+        keep = ~np.isin(ids, np.fromiter(tombstones, dtype='int64'))
+        ids, vectors = ids[keep], vectors[keep]
+    return ids, vectors
+
+
+def train_centroids(vectors, k, niter=COHORT_NITER, init_centroids=None, seed=1234):
+    kmeans = faiss.Kmeans(VECTOR_DIM, k, niter=niter, seed=seed)
+    if init_centroids is not None and init_centroids.shape == (k, VECTOR_DIM):
+        kmeans.train(vectors, init_centroids=init_centroids)
+    else:
+        kmeans.train(vectors)
+    return kmeans.centroids
+
+
+def nearest_centroids(centroids, vectors):
+    index = faiss.IndexFlatL2(VECTOR_DIM)
+    index.add(np.ascontiguousarray(centroids, dtype='float32'))
+    _, labels = index.search(np.ascontiguousarray(vectors, dtype='float32'), 1)
+    return labels[:, 0]
+
+
+def _top(counter):
+    return [{"name": name, "count": count} for name, count in counter.most_common(COHORT_TOP_N)]
+
+
+def summarize(centroids, metadata):
+    members = [[] for _ in range(len(centroids))]
+    tombstones = load_tombstones()
+    for entry in metadata:
+        cohort = entry.get("cohort")
+        if isinstance(cohort, int) and 0 <= cohort < len(centroids) and entry.get("vector_id") not in tombstones:
+            members[cohort].append(entry)
+    summary = []
+    for cohort, (centroid, entries) in enumerate(zip(centroids, members)):
+        games = Counter(e["xbox_game"] for e in entries if e.get("xbox_game"))
+        playlists = Counter(e["spotify_playlist"] for e in entries if e.get("spotify_playlist"))
+        summary.append({
+            "cohort": cohort,
+            "size": len(entries),
+            "centroid": {k: round(float(v), 4) for k, v in zip(NT_KEYS, centroid)},
+            "top_xbox_game": games.most_common(1)[0][0] if games else None,
+            "top_spotify_playlist": playlists.most_common(1)[0][0] if playlists else None,
+            "xbox_games": _top(games),
+            "spotify_playlists": _top(playlists),
+        })
+    return summary
+
+
+def save_cohorts(report):
+    path = cohorts_path()
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(report, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def load_cohorts():
+    path = cohorts_path()
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def run_cohort_job(k=COHORT_K, niter=COHORT_NITER):
+    """Retrain the cohorts and relabel every twin; returns the cohorts.json report (None if too few twins)."""
+    start = time.perf_counter()
+    # Train on a snapshot without holding the write lock; /generate keeps writing meanwhile
+    _, vectors = live_vectors(load_index())
+    if len(vectors) < k:
+        return None
+    previous = load_cohorts()
+    init = np.array(previous["centroids"], dtype='float32') if previous else None
+    centroids = train_centroids(vectors, k, niter, init)
+
+    with store_lock():
+        index = load_index()
+        metadata = load_metadata()
+        labels = {}
+        if index.ntotal:
+            ids = index_ids(index)
+            labels = dict(zip(ids.tolist(), nearest_centroids(centroids, index.index.reconstruct_n(0, index.ntotal)).tolist()))
+        relabelled = 0
+        for entry in metadata:
+            label = labels.get(entry.get("vector_id"))
+            if label is not None and entry.get("cohort") != label:
+                entry["cohort"] = label
+                relabelled += 1
+        report = {
+            "k": k,
+            "trained_at": datetime.utcnow().isoformat(),
+            "trained_on": int(len(vectors)),
+            "train_seconds": round(time.perf_counter() - start, 3),
+            "relabelled": relabelled,
+            "centroids": centroids.tolist(),
+            "cohorts": summarize(centroids, metadata),
+        }
+        # cohorts.json first: the version bump is what invalidates cached /cohorts and /twins responses
+        save_cohorts(report)
+        if relabelled:
+            save_metadata(metadata)
+        else:
+            bump_version()
+    return report
+
+
+def cohorts_age():
+    """Seconds since cohorts.json was written, or None if it doesn't exist."""
+    try:
+        return time.time() - os.path.getmtime(cohorts_path())
+    except FileNotFoundError:
+        return None
+
+
+@contextmanager
+def _job_lock():
+    # Held for training + relabelling so only one process runs the job; never waits
+    f = open(vector_store.store_path("cohorts.lock"), "a")
+    try:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise StoreLocked("the cohort job is running in another process")
+        yield
+    finally:
+        f.close()
+
+
+def run_cohort_job_if_due(interval=COHORT_INTERVAL_SECONDS, k=COHORT_K, niter=COHORT_NITER):
+    """run_cohort_job if cohorts.json is missing or at least `interval` old and no other
+    process is running it; returns its report, or None if nothing ran."""
+    age = cohorts_age()
+    if age is not None and age < interval:
+        return None
+    try:
+        with _job_lock():
+            age = cohorts_age()  # another worker may have finished a run while we checked
+            if age is not None and age < interval:
+                return None
+            return run_cohort_job(k, niter)
+    except StoreLocked:
+        return None
+
+
+def seconds_until_due(interval=COHORT_INTERVAL_SECONDS):
+    age = cohorts_age()
+    return interval if age is None else max(1.0, interval - age)
+
+
+_lock = threading.Lock()
+_centroids = None
+_centroids_key = None
+
+
+def get_centroids():
+    """Centroids from cohorts.json as an (k, 5) float32 array, reloaded only when the file changes."""
+    global _centroids, _centroids_key
+    path = cohorts_path()
+    try:
+        stat = os.stat(path)
+        key = (path, stat.st_mtime_ns, stat.st_size)
+    except FileNotFoundError:
+        return None
+    with _lock:
+        if key != _centroids_key:
+            report = load_cohorts()
+            _centroids = np.array(report["centroids"], dtype='float32').reshape(-1, VECTOR_DIM)
+            _centroids_key = key
+        return _centroids
+
+
+def assign_cohort(neurotransmitters):
+    """Nearest cohort for one twin's neurotransmitters, or None before the first clustering run."""
+    centroids = get_centroids()
+    if centroids is None or not len(centroids):
+        return None
+    try:
+        vector = np.array([[neurotransmitters[k] for k in NT_KEYS]], dtype='float32')
+    except (KeyError, TypeError):
+        return None
+    return int(nearest_centroids(centroids, vector)[0])
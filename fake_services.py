@@ -0,0 +1,143 @@
+# fake_services.py
+"""Local stand-ins for genderize.io and the OpenAI chat completions API.
+
+Used by the load-test harness and for running batch jobs offline. Point the app at it with
+
+    GENDERIZE_URL=http://127.0.0.1:8765/genderize
+    OPENAI_API_BASE=http://127.0.0.1:8765/v1
+
+    python fake_services.py --port 8765 --llm-latency-ms 300
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class FakeServiceConfig:
+    def __init__(self, genderize_latency_ms=20, llm_latency_ms=300, llm_error_rate=0.0, llm_rate_limit_rate=0.0, seed=0):
+        self.genderize_latency_ms = genderize_latency_ms
+        self.llm_latency_ms = llm_latency_ms
+        self.llm_error_rate = llm_error_rate
+        self.llm_rate_limit_rate = llm_rate_limit_rate
+        self.rng = random.Random(seed)
+        self.rng_lock = threading.Lock()
+
+    def roll(self):
+        with self.rng_lock:
+            return self.rng.random()
+
+
+def fake_gender(name):
+    digest = hashlib.sha256(name.lower().encode()).digest()[0]
+    return ["female", "male", None][digest % 3]
+
+
+def fake_completion(messages):
+    prompt = messages[-1]["content"] if messages else ""
+    content = (
+        "🧠 Reflection (offline stand-in)\n"
+        f"You shared {len(prompt.split())} words about your day. Take a short walk, "
+        "try a calming lavender scent, and queue up a Lofi Chill playlist."
+    )
+    return {
+        "id": "chatcmpl-fake",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": "gpt-3.5-turbo",
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": len(prompt.split()), "completion_tokens": len(content.split()), "total_tokens": 0},
+    }
+
+
+def make_handler(config):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def send_json(self, status, payload, headers=None):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path.rstrip("/") not in ("", "/genderize"):
+                return self.send_json(404, {"error": "not found"})
+            name = parse_qs(url.query).get("name", [""])[0]
+            time.sleep(config.genderize_latency_ms / 1000)
+            self.send_json(200, {"name": name, "gender": fake_gender(name), "probability": 0.9, "count": 1000})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            if not urlparse(self.path).path.endswith("/chat/completions"):
+                return self.send_json(404, {"error": {"message": "not found"}})
+
+            time.sleep(config.llm_latency_ms / 1000)
+            roll = config.roll()
+            if roll < config.llm_rate_limit_rate:
+                return self.send_json(
+                    429,
+                    {"error": {"message": "Rate limit reached (fake)", "type": "requests", "code": "rate_limit_exceeded"}},
+                    headers={"Retry-After": "1"},
+                )
+            if roll < config.llm_rate_limit_rate + config.llm_error_rate:
+                return self.send_json(500, {"error": {"message": "Internal error (fake)", "type": "server_error"}})
+            self.send_json(200, fake_completion(payload.get("messages", [])))
+
+    return Handler
+
+
+def start_fake_services(host="127.0.0.1", port=0, config=None):
+    """Start the fake services on a daemon thread; returns (server, base_url)."""
+    server = ThreadingHTTPServer((host, port), make_handler(config or FakeServiceConfig()))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def service_env(base_url):
+    """Environment variables that point the app at the fake services."""
+    return {
+        "GENDERIZE_URL": f"{base_url}/genderize",
+        "OPENAI_API_BASE": f"{base_url}/v1",
+        "OPENAI_API_KEY": "sk-fake-local",
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run local stand-ins for genderize.io and OpenAI.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--genderize-latency-ms", type=float, default=20)
+    parser.add_argument("--llm-latency-ms", type=float, default=300)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--llm-rate-limit-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    config = FakeServiceConfig(args.genderize_latency_ms, args.llm_latency_ms, args.llm_error_rate, args.llm_rate_limit_rate)
+    server, base_url = start_fake_services(args.host, args.port, config)
+    print(f"✅ Fake services listening on {base_url}")
+    for key, value in service_env(base_url).items():
+        print(f"   export {key}={value}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# fast_nlp.py
+"""Lexicon-based stand-ins for the TextBlob calls used by the generator (NLP_MODE=fast).
+
+The twin only reacts to a fixed vocabulary (stress_map / stress categories), so keyword
+extraction is a regex tokenizer plus a set lookup instead of perceptron POS tagging.
+Sentiment reuses TextBlob's own lexicon (en-sentiment.xml), parsed once, and applies
+pattern's averaging, modifier and negation rules without building a TextBlob per call.
+Use nlp_compare.py to see how far the resulting twins drift from the TextBlob mode.
+"""
+import functools
+import os
+import re
+import xml.etree.ElementTree as ET
+
+TOKEN_RE = re.compile(r"n't|[a-z]+(?=n't)|[a-z]+(?:'[a-z]+)?|!")
+NEGATIONS = frozenset(["no", "not", "n't", "never"])
+STOPWORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before being below between both
+but by can could did do does doing down during each few for from further had has have having he her here hers
+herself him himself his how i if in into is it its itself just me more most my myself nor of off on once only or
+other our ours ourselves out over own same she should so some such than that the their theirs them themselves then
+there these they this those through to too under until up very was we were what when where which while who whom
+why will with would you your yours yourself yourselves smelled smell smells like
+""".split())
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+def keyword_hits(text, lexicon):
+    """Tokens of text that appear in lexicon, in order (the fast equivalent of noun extraction)."""
+    return [token for token in tokenize(text) if token in lexicon]
+
+
+def content_words(text):
+    """Non-stopword tokens, standing in for the nouns/adjectives TextBlob would tag."""
+    return [token for token in tokenize(text) if len(token) > 2 and token not in STOPWORDS]
+
+
+@functools.lru_cache(maxsize=1)
+def sentiment_lexicon():
+    """{word: (polarity, intensity, is_modifier)} from TextBlob's bundled lexicon.
+
+    Scores are averaged per part of speech and then across parts of speech, the same
+    way pattern does for untagged text; adverbs ("very", "really") act as modifiers.
+    """
+    import textblob
+
+    path = os.path.join(os.path.dirname(textblob.__file__), "en", "en-sentiment.xml")
+    senses = {}
+    for node in ET.parse(path).getroot().iter("word"):
+        form = node.get("form")
+        if form:
+            pos_senses = senses.setdefault(form, {}).setdefault(node.get("pos"), [])
+            pos_senses.append((float(node.get("polarity", 0)), float(node.get("intensity", 1))))
+    lexicon = {}
+    adjectives = []
+    for form, by_pos in senses.items():
+        per_pos = {pos: (_mean(p for p, _ in v), _mean(i for _, i in v)) for pos, v in by_pos.items()}
+        lexicon[form] = (_mean(p for p, _ in per_pos.values()), _mean(i for _, i in per_pos.values()), "RB" in by_pos)
+        if "JJ" in per_pos:
+            adjectives.append((form, per_pos["JJ"]))
+    # TextBlob also scores "terribly" like "terrible", "happily" like "happy"
+    for form, (score, intensity) in adjectives:
+        if form.endswith("y"):
+            form = form[:-1] + "i"
+        if form.endswith("le"):
+            form = form[:-2]
+        lexicon[form + "ly"] = (score, intensity, True)
+    return lexicon
+
+
+def _mean(values):
+    values = list(values)
+    return sum(values) / len(values)
+
+
+def polarity(text):
+    """Sentiment polarity in [-1, 1]: pattern's assessment rules over the same lexicon.
+
+    Known words are averaged; a preceding adverb scales the next known word by its
+    intensity, a preceding negation flips it to half strength ("not good" = -0.35) and
+    "!" boosts the previous word.
+    """
+    lexicon = sentiment_lexicon()
+    scores = []  # [polarity, intensity, negated] per assessed chunk
+    modifier = None
+    negation = None
+    for token in tokenize(text):
+        entry = lexicon.get(token)
+        if entry is not None:
+            score, intensity, is_modifier = entry
+            if modifier is None:
+                scores.append([score, intensity, False])
+            else:
+                scores[-1][0] = max(-1.0, min(score * scores[-1][1], 1.0))
+                scores[-1][1] = intensity
+            if negation is not None:
+                scores[-1][1] = 1.0 / scores[-1][1]
+                scores[-1][2] = True
+            modifier = token if is_modifier else None
+            negation = token if token in NEGATIONS else None
+        else:
+            if token in NEGATIONS:
+                negation = token
+            elif negation and len(token.strip("'")) > 1:
+                negation = None
+            if negation is not None and modifier is not None and modifier.endswith("ly"):
+                scores[-1][2] = True
+                negation = None
+            elif modifier and len(token) > 2:
+                modifier = None
+            if token == "!" and scores:
+                scores[-1][0] = max(-1.0, min(scores[-1][0] * 1.25, 1.0))
+    if not scores:
+        return 0.0
+    return sum(score * -0.5 if negated else score for score, _, negated in scores) / len(scores)
@@ -2,53 +2,17 @@
 
 from pydantic import BaseModel
 from typing import List, Optional, Dict
+from types import SimpleNamespace
 import json, os, random
 from datetime import datetime
 import requests
-import difflib
 import pandas as pd
-from vector_store import load_metadata
-
-
-
-with open(os.path.join(os.path.dirname(__file__), "fragrance_notes.json"), "r") as f:
-    fragrance_db = json.load(f)
-
-with open(os.path.join(os.path.dirname(__file__), "cultural_affinities.json"), "r") as f:
-    cultural_affinities = json.load(f)
-
-
-scent_map = {
-    "lavender": {"GABA": 0.15, "cortisol": -0.1},
-    "vanilla": {"oxytocin": 0.1, "dopamine": 0.05},   
-    "mint": {"dopamine": 0.12, "serotonin": 0.05},  
-    "citrus": {"serotonin": 0.15, "cortisol": -0.05}, 
-    "rose": {"oxytocin": 0.12, "GABA": 0.05},        
-    "bergamot": {"serotonin": 0.12, "GABA": 0.08},   
-    "cinnamon": {"dopamine": 0.15},     
-    "tonka bean": {"oxytocin": 0.08, "dopamine": 0.04}, 
-    "linalool": {"GABA": 0.18, "cortisol": -0.12},
-    "musk": {"oxytocin": 0.1, "amygdala": 0.03},
-    "androstadienone": {"dopamine": 0.12, "cortisol": 0.08, "amygdala": 0.06},
-    "sandalwood": {"GABA": 0.1, "serotonin": 0.06},
-    "amber": {"dopamine": 0.05, "oxytocin": 0.07}, 
-    "jasmine": {"serotonin": 0.1, "oxytocin": 0.08},
-    "cedarwood": {"GABA": 0.1, "cortisol": -0.05}, 
-    "ylang ylang": {"oxytocin": 0.1, "dopamine": 0.06},
-}
-
-stress_map = {
-    "deadline": {"cortisol": 0.25, "dopamine": -0.1}, 
-    "burnout": {"cortisol": 0.35, "GABA": -0.15, "dopamine": -0.1}, 
-    "lonely": {"oxytocin": -0.25, "serotonin": -0.1},   
-    "exam": {"cortisol": 0.3, "dopamine": 0.05, "GABA": -0.05}, 
-    "overwhelmed": {"cortisol": 0.4, "GABA": -0.2, "serotonin": -0.1},
-    "uncertainty": {"cortisol": 0.2, "serotonin": -0.1},   
-    "rejection": {"dopamine": -0.15, "oxytocin": -0.2},  
-    "fatigue": {"dopamine": -0.1, "GABA": -0.1},  
-    "multitasking": {"dopamine": -0.05, "serotonin": -0.05},
-    "conflict": {"cortisol": 0.3, "oxytocin": -0.15}     
-}
+from reference_data import get_reference
+from brain_regions import compute_brain_regions, compute_subvectors
+import fast_nlp
+
+GENDERIZE_URL = os.getenv("GENDERIZE_URL", "https://api.genderize.io")
+NLP_MODE = os.getenv("NLP_MODE", "textblob")  # "textblob" (POS tagging) or "fast" (lexicon lookups)
 
 
 class TwinRequest(BaseModel):
@@ -65,7 +29,7 @@ class TwinRequest(BaseModel):
 
 def infer_gender(name):
     try:
-        res = requests.get(f"https://api.genderize.io?name={name.split()[0]}")
+        res = requests.get(f"{GENDERIZE_URL}?name={name.split()[0]}")
         if res.status_code == 200:
             return res.json().get("gender", "neutral")
     except:
@@ -120,42 +84,40 @@ def infer_age_range(job_title: str, goals: str) -> str:
         return "60+"
     return "25-40"
 
-def apply_cultural_modifiers(nt: Dict[str, float], email: str, name: str):
+def apply_cultural_modifiers(nt: Dict[str, float], email: str, name: str, reference=None):
     region = infer_region(email)
     work_env = infer_work_environment(email)
     style_score = email_style_score(email)
     alignment = verify_name_email_alignment(name, email)
-    favored_scents = cultural_affinities.get(region, [])
-    
-    for scent in favored_scents:
-        modifiers = scent_map.get(scent.lower(), {})
-        for k, v in modifiers.items():
-            nt[k] = min(1.0, max(0.0, nt.get(k, 0.5) + v * 0.05))
+    for k, v in (reference or get_reference()).cultural_effects.get(region, []):
+        nt[k] = min(1.0, max(0.0, nt.get(k, 0.5) + v))
 
     return nt, region, work_env, style_score, alignment
 
-def get_fragrance_notes(scent: str):
+def resolve_fragrance(scent: str, reference=None):
+    """Catalog key for scent, falling back to the closest known fragrance (or None)."""
+    reference = reference or get_reference()
     normalized = scent.lower().strip()
-    if normalized in fragrance_db:
-        return fragrance_db[normalized]
-    else:
-        closest = get_closest_scent(normalized)
-        if closest:
-            print(f"[Fallback] Scent '{scent}' not found. Using closest match: '{closest}'")
-            return fragrance_db[closest]
-        return []
-
-def build_scent_profile(scent: str):
-    notes = get_fragrance_notes(scent)
-    nt_map = {}
-    for note in notes:
-        effects = scent_map.get(note.lower(), {})
-        for nt in effects:
-            nt_map.setdefault(nt, []).append(note)
+    if normalized in reference.fragrance_db:
+        return normalized
+    closest = reference.closest_fragrance(normalized)
+    if closest:
+        print(f"[Fallback] Scent '{scent}' not found. Using closest match: '{closest}'")
+    return closest
+
+def get_fragrance_notes(scent: str, reference=None):
+    reference = reference or get_reference()
+    key = resolve_fragrance(scent, reference)
+    return reference.fragrance_db[key] if key else []
+
+def build_scent_profile(scent: str, reference=None):
+    reference = reference or get_reference()
+    key = resolve_fragrance(scent, reference)
+    profile = reference.scent_profiles.get(key, {"notes": [], "neurotransmitter_map": {}})
     return {
         "scent": scent,
-        "notes": notes,
-        "neurotransmitter_map": nt_map
+        "notes": profile["notes"],
+        "neurotransmitter_map": profile["neurotransmitter_map"]
     }
 
 def infer_life_stage_from_text(job_title: str, goals: str) -> str:
@@ -182,8 +144,11 @@ def infer_region(email: str) -> str:
     return "North America"
 
 def extract_memory_scent_profile(childhood_memory: str, fragrance_db, scent_map):
-    blob = TextBlob(childhood_memory.lower())
-    nouns = [word for word, tag in blob.tags if tag in ("NN", "NNS", "NNP", "JJ")]
+    if NLP_MODE == "fast":
+        nouns = fast_nlp.content_words(childhood_memory)
+    else:
+        blob = TextBlob(childhood_memory.lower())
+        nouns = [word for word, tag in blob.tags if tag in ("NN", "NNS", "NNP", "JJ")]
 
     extracted_notes = []
     for word in nouns:
@@ -240,10 +205,8 @@ def analyze_circadian_rhythm(nt, timestamp):
 
     return circadian_window, circadian_note
 
-def get_closest_scent(input_scent: str):
-    scent_keys = list(fragrance_db.keys())
-    matches = difflib.get_close_matches(input_scent, scent_keys, n=1, cutoff=0.5)
-    return matches[0] if matches else None
+def get_closest_scent(input_scent: str, reference=None):
+    return (reference or get_reference()).closest_fragrance(input_scent)
 
 def apply_modifiers(base: Dict[str, float], modifiers: Dict[str, float]):
     for k, v in modifiers.items():
@@ -262,11 +225,22 @@ def determine_cognitive_focus(subvectors):
 
 from textblob import TextBlob
 
-def extract_keywords(text: str) -> List[str]:
-    """Extracts noun-based keywords from input text using TextBlob POS tagging."""
+def extract_keywords(text: str, reference=None) -> List[str]:
+    """Extracts noun-based keywords from input text using TextBlob POS tagging.
+
+    With NLP_MODE=fast only words in the reference keyword lexicon are returned, which is all the
+    callers ever match against.
+    """
+    if NLP_MODE == "fast":
+        return fast_nlp.keyword_hits(text, (reference or get_reference()).keyword_lexicon)
     blob = TextBlob(text)
     return [word for word, tag in blob.tags if tag.startswith("NN")]
 
+def sentiment_polarity(text: str) -> float:
+    if NLP_MODE == "fast":
+        return fast_nlp.polarity(text)
+    return TextBlob(text).sentiment.polarity
+
 def log_journal_entry(data: TwinRequest, output: dict):
     log_dir = "journal_logs"
     os.makedirs(log_dir, exist_ok=True)
@@ -288,16 +262,12 @@ Suggested Playlist: {output.get('spotify_playlist', 'N/A')}
 """)
 
 
-def generate_twin_vector(data: TwinRequest, goals_sentiment=None, stressors_sentiment=None):
-    stress_categories = {
-        "social": ["communication", "manager", "team", "conflict"],
-        "workload": ["deadline", "overload", "multitasking", "burnout"],
-        "environment": ["noise", "space", "distractions"]
-    }
+def generate_twin_vector(data: TwinRequest, goals_sentiment=None, stressors_sentiment=None, reference=None):
+    reference = reference or get_reference()
     classified_stressors = {"social": [], "workload": [], "environment": []}
-    stress_words = extract_keywords(data.productivity_limiters)
+    stress_words = extract_keywords(data.productivity_limiters, reference)
     for word in stress_words:
-        for category, terms in stress_categories.items():
+        for category, terms in reference.stress_categories.items():
             if word.lower() in terms:
                 classified_stressors[category].append(word.lower())
     
@@ -342,23 +312,21 @@ def generate_twin_vector(data: TwinRequest, goals_sentiment=None, stressors_sent
     industry = infer_industry(data.job_title, data.company)
 
   
-    for note in get_fragrance_notes(data.scent_note):
-        apply_modifiers(nt, scent_map.get(note, {}))
+    # Summed note effects are precomputed per fragrance by the reference registry
+    apply_modifiers(nt, reference.fragrance_effects.get(resolve_fragrance(data.scent_note, reference), {}))
 
-    scent_profile = build_scent_profile(data.scent_note)
+    scent_profile = build_scent_profile(data.scent_note, reference)
 
-    keywords = extract_keywords(data.productivity_limiters)
+    keywords = extract_keywords(data.productivity_limiters, reference)
     for word in keywords:
-        if word.lower() in stress_map:
-            apply_modifiers(nt, stress_map[word.lower()])
+        if word.lower() in reference.stress_map:
+            apply_modifiers(nt, reference.stress_map[word.lower()])
 
     if goals_sentiment is None:
-        goals_blob = TextBlob(data.career_goals)
-        goals_sentiment = goals_blob.sentiment.polarity
+        goals_sentiment = sentiment_polarity(data.career_goals)
 
     if stressors_sentiment is None:
-        stress_blob = TextBlob(data.productivity_limiters)
-        stressors_sentiment = stress_blob.sentiment.polarity
+        stressors_sentiment = sentiment_polarity(data.productivity_limiters)
 
     nt["dopamine"] += goals_sentiment * 0.04
     nt["serotonin"] += goals_sentiment * 0.02
@@ -376,15 +344,15 @@ def generate_twin_vector(data: TwinRequest, goals_sentiment=None, stressors_sent
         nt["cortisol"] += stressors_sentiment * 0.05
         nt["GABA"] -= stressors_sentiment * 0.03
 
-    memory_sentiment = TextBlob(data.childhood_scent).sentiment.polarity
+    memory_sentiment = sentiment_polarity(data.childhood_scent)
     nt["serotonin"] += memory_sentiment * 0.02
     nt["hippocampus_memory_boost"] = round(memory_sentiment * 0.02, 3)
-    memory_scent_profile = extract_memory_scent_profile(data.childhood_scent, fragrance_db, scent_map)
+    memory_scent_profile = extract_memory_scent_profile(data.childhood_scent, reference.fragrance_db, reference.scent_map)
     
    
     for k in nt:
         nt[k] = round(min(1, max(0, nt[k])), 2)
-    nt, region, work_env, style_score, alignment = apply_cultural_modifiers(nt, data.email, data.name)
+    nt, region, work_env, style_score, alignment = apply_cultural_modifiers(nt, data.email, data.name, reference)
 
     job_title_lower = data.job_title.lower()
     if "manager" in job_title_lower:
@@ -421,12 +389,7 @@ def generate_twin_vector(data: TwinRequest, goals_sentiment=None, stressors_sent
         nt["oxytocin"] = min(1, nt.get("oxytocin", 0.5) + 0.03)
 
 
-    brain_regions = {
-        "amygdala": round((nt["cortisol"] * 0.6 + nt["oxytocin"] * 0.4), 2),
-        "prefrontal_cortex": round((nt["dopamine"] * 0.5 + nt["serotonin"] * 0.5), 2),
-        "hippocampus": round((nt["serotonin"] * 0.6 + nt["GABA"] * 0.4), 2),
-        "hypothalamus": round((nt["GABA"] * 0.5 + nt["cortisol"] * 0.5), 2)
-    }
+    brain_regions = compute_brain_regions(nt)
 
     lowest_region = min(brain_regions, key=brain_regions.get)
     region_scent_suggestions = {
@@ -437,24 +400,7 @@ def generate_twin_vector(data: TwinRequest, goals_sentiment=None, stressors_sent
     }
     scent_reinforcement = region_scent_suggestions.get(lowest_region, "any calming scent you enjoy")
 
-    subvectors = {
-        "amygdala": {
-            "emotional_memory": round((nt["oxytocin"] * 0.6 + nt["cortisol"] * 0.4), 2),
-            "threat_detection": round(nt["cortisol"], 2)
-        },
-        "prefrontal_cortex": {
-            "planning": round(nt["dopamine"], 2),
-            "focus": round((nt["dopamine"] * 0.6 + nt["serotonin"] * 0.4), 2)
-        },
-        "hippocampus": {
-            "memory_encoding": round(nt["serotonin"], 2),
-            "spatial_navigation": round(nt["GABA"], 2)
-        },
-        "hypothalamus": {
-            "stress_response": round((nt["cortisol"] * 0.7 + nt["GABA"] * 0.3), 2),
-            "emotional_regulation": round(nt["GABA"], 2)
-        }
-    }
+    subvectors = compute_subvectors(nt)
 
     dominant_nt = max(nt, key=nt.get)
     if dominant_nt == "dopamine":
@@ -518,7 +464,6 @@ def generate_twin_vector(data: TwinRequest, goals_sentiment=None, stressors_sent
         "reflection_tags": [data.job_title, data.productivity_limiters, data.scent_note],
         "xbox_game": xbox_game,
         "game_mode": game_mode,
-        "vector_id": len(load_metadata()) - 1,
         "duration_minutes": duration_minutes,
         "switch_time": switch_time,
         "spotify_playlist": spotify_playlist,
@@ -534,7 +479,7 @@ def generate_twin_vector(data: TwinRequest, goals_sentiment=None, stressors_sent
         "stressor_categories": classified_stressors,
         "olfactory_region_modeling": {
             "region": region,
-            "favored_scents": cultural_affinities.get(region, [])
+            "favored_scents": reference.cultural_affinities.get(region, [])
         
         }
         }
@@ -552,3 +497,73 @@ def generate_twin_vector(data: TwinRequest, goals_sentiment=None, stressors_sent
 
     log_journal_entry(data, output)
     return output
+
+
+def match_game(favorite_scent, stressors_text, neurotransmitters, reference=None):
+    reference = reference or get_reference()
+    scent = favorite_scent.lower().strip()
+    stress_keywords = extract_keywords(stressors_text, reference)
+
+    
+    candidates = reference.games_by_scent.get(scent) or reference.game_profiles
+
+    
+    def score_game(game):
+        scent_score = game["scent_affinity"].get(scent, 0)
+        nt_score = sum(neurotransmitters.get(tag, 0.5) for tag in game.get("tags", [])) / len(game.get("tags", []) or [1])
+        return scent_score * 0.6 + nt_score * 0.4  # Weighted: scent more important
+
+    best_game = sorted(candidates, key=score_game, reverse=True)[0]
+
+    
+    flat_neurotransmitters = {k: v for k, v in neurotransmitters.items() if isinstance(v, (float, int))}
+
+    dominant_nt = max(neurotransmitters, key=neurotransmitters.get)
+    rationale = (
+        f"Matched with '{best_game['name']}' because its scent affinity with '{scent}' "
+        f"is high and it supports neurotransmitters like {', '.join(best_game['tags'])}. "
+        f"Your current dominant neurotransmitter is {dominant_nt}."
+    )
+
+    return {
+        "xbox_game": best_game["name"],
+        "game_mode": random.choice(best_game["modes"]),
+        "duration_minutes": random.randint(*best_game["duration_range"]),
+        "switch_time": "After 30 mins" if "burnout" in stress_keywords else "After 20 mins",
+        "spotify_playlist": best_game.get("spotify_playlist", "Focus Boost"),
+        "match_reason": rationale
+    }
+
+
+def build_twin(fields: dict):
+    """CPU-bound part of /generate: sentiment, twin vector, scent profiles and game match.
+
+    Takes the request as a plain dict so it can run on a process pool worker.
+    Returns (twin, scent_profile, memory_scent_profile).
+    """
+    data = SimpleNamespace(**fields)
+    # One registry snapshot for the whole request, so a reload mid-request can't mix catalogs
+    reference = get_reference()
+    goals_sentiment = sentiment_polarity(data.career_goals)
+    stressors_sentiment = sentiment_polarity(data.productivity_limiters)
+    twin = generate_twin_vector(data, goals_sentiment=goals_sentiment, stressors_sentiment=stressors_sentiment,
+                                reference=reference)
+    scent_profile = twin["scent_profile"]
+    memory_scent_profile = twin["memory_scent_profile"]
+    print(f"📊 Sentiment — Goals: {goals_sentiment}, Stressors: {stressors_sentiment}")
+
+    twin["goals_sentiment"] = goals_sentiment
+    twin["stressors_sentiment"] = stressors_sentiment
+    if goals_sentiment < -0.3:
+        twin["neurotransmitters"]["dopamine"] = max(0, twin["neurotransmitters"].get("dopamine", 0.5) - 0.05)
+        twin["neurotransmitters"]["serotonin"] = max(0, twin["neurotransmitters"].get("serotonin", 0.5) - 0.05)
+    if stressors_sentiment < -0.3:
+        twin["neurotransmitters"]["cortisol"] = min(1, twin["neurotransmitters"].get("cortisol", 0.5) + 0.1)
+        twin["neurotransmitters"]["GABA"] = max(0, twin["neurotransmitters"].get("GABA", 0.5) - 0.05)
+
+    print("DEBUG: Twin vector keys:", list(twin.keys()))
+
+    game = match_game(data.scent_note, data.productivity_limiters, twin["neurotransmitters"], reference)
+    twin.update(game)
+    twin["timestamp"] = datetime.utcnow().isoformat()
+    return twin, scent_profile, memory_scent_profile
@@ -0,0 +1,108 @@
+# http_cache.py
+"""ETag / conditional-GET support for read endpoints backed by the vector store.
+
+A response is fully determined by (path, query, store version), so that triple is both
+the ETag and the key of a small LRU of already-encoded bodies. A poll with a matching
+If-None-Match costs one stat of state.json and returns 304; a repeated query at the same
+version is served from the LRU without touching the store.
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from fastapi.responses import Response
+
+from vector_store import store_version
+
+HTTP_CACHE_ENTRIES = int(os.getenv("HTTP_CACHE_ENTRIES", "256"))
+HTTP_CACHE_MAX_BODY_BYTES = int(os.getenv("HTTP_CACHE_MAX_BODY_BYTES", str(1 << 20)))
+
+
+class ResponseCache:
+    """Thread-safe LRU of encoded response bodies."""
+
+    def __init__(self, max_entries=HTTP_CACHE_ENTRIES, max_body_bytes=HTTP_CACHE_MAX_BODY_BYTES):
+        self.max_entries = max_entries
+        self.max_body_bytes = max_body_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def get(self, key):
+        with self._lock:
+            body = self._entries.get(key)
+            if body is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def put(self, key, body):
+        if self.max_entries <= 0 or len(body) > self.max_body_bytes:
+            return
+        with self._lock:
+            self._entries[key] = body
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def record_not_modified(self):
+        with self._lock:
+            self.not_modified += 1
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "max_entries": self.max_entries, "hits": self.hits,
+                    "misses": self.misses, "not_modified": self.not_modified}
+
+
+response_cache = ResponseCache()
+
+
+def request_key(request):
+    """(path, canonical query): parameter order does not create distinct cache entries."""
+    query = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+    return request.url.path, query
+
+
+def make_etag(version, key):
+    digest = hashlib.sha1("?".join(key).encode("utf-8")).hexdigest()[:16]
+    return f'"{version}-{digest}"'
+
+
+def etag_matches(request, etag):
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = [t.strip() for t in header.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+def encode_json(content):
+    # Same encoding as JSONResponse
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def cached_json(request, build):
+    """Serve build()'s JSON content with an ETag for (path, query, store version).
+
+    The version is read before build() runs, so a cached body is never older than its ETag.
+    """
+    key = request_key(request)
+    version = store_version()
+    etag = make_etag(version, key)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request, etag):
+        response_cache.record_not_modified()
+        return Response(status_code=304, headers=headers)
+
+    body = response_cache.get((version, key))
+    if body is None:
+        body = encode_json(build())
+        response_cache.put((version, key), body)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,348 @@
+# loadtest.py
+"""Offline load test for /generate, /reflect and /twins.
+
+Starts the fake genderize/OpenAI services and a uvicorn server in a scratch directory
+(so the real vector store is untouched), replays a synthetic or recorded corpus at a
+fixed concurrency and writes throughput, latency percentiles and error rates as JSON.
+
+    python loadtest.py --concurrency 16 --requests 2000 --output results/loadtest.json
+    python loadtest.py --corpus recorded.jsonl --compare results/previous.json
+
+A recorded corpus is JSONL with one {"method", "path", "json"?, "params"?} object per line.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+
+from fake_services import FakeServiceConfig, service_env, start_fake_services
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+FIRST_NAMES = ["Ananya", "Liam", "Priya", "Noah", "Mei", "Carlos", "Fatima", "Jonas", "Aiko", "Zoe"]
+LAST_NAMES = ["Malhotra", "Smith", "Chen", "Garcia", "Okafor", "Müller", "Sato", "Haddad"]
+JOB_TITLES = ["Software Engineer", "Product Manager", "Student", "Data Analyst", "Founder", "Nurse", "Teacher"]
+DOMAINS = ["gmail.com", "stanford.edu", "acme.co.uk", "startup.in", "yahoo.com"]
+GOALS = [
+    "I want to lead a team and ship products I am proud of",
+    "Finish my degree and land a great internship",
+    "Grow my company while keeping a healthy routine",
+]
+LIMITERS = [
+    "deadline pressure and burnout from multitasking",
+    "constant meetings, conflict with my manager and noise",
+    "I feel lonely and overwhelmed before every exam",
+]
+SCENTS = ["versace eros", "chanel no 5", "dior sauvage", "ysl libre", "lavender", "vanilla musk", "unknown scent"]
+MEMORIES = [
+    "my grandmother's kitchen smelled of cinnamon and vanilla",
+    "fresh rain on the garden and jasmine at night",
+    "the beach with coconut sunscreen and citrus",
+]
+EMOTIONS = ["anxious", "motivated", "tired", "calm", "overwhelmed"]
+
+
+def synthetic_corpus(size, mix, seed):
+    """Deterministic list of requests drawn from the endpoint mix."""
+    rng = random.Random(seed)
+    endpoints = [name for name, weight in mix.items() for _ in range(weight)]
+    corpus = []
+    for i in range(size):
+        endpoint = rng.choice(endpoints)
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        nt = {k: round(rng.uniform(0.2, 0.8), 2) for k in ["dopamine", "serotonin", "oxytocin", "GABA", "cortisol"]}
+        if endpoint == "generate":
+            corpus.append({"method": "POST", "path": "/generate", "json": {
+                "name": name,
+                "email": f"{name.split()[0].lower()}{i}@{rng.choice(DOMAINS)}",
+                "job_title": rng.choice(JOB_TITLES),
+                "company": "Acme",
+                "career_goals": rng.choice(GOALS),
+                "productivity_limiters": rng.choice(LIMITERS),
+                "scent_note": rng.choice(SCENTS),
+                "childhood_scent": rng.choice(MEMORIES),
+                "assigned_sex": rng.choice(["female", "male", "unspecified"]),
+            }})
+        elif endpoint == "reflect":
+            corpus.append({"method": "POST", "path": "/reflect", "json": {
+                "name": name,
+                "current_emotion": rng.choice(EMOTIONS),
+                "recent_events": rng.choice(LIMITERS),
+                "goals": rng.choice(GOALS),
+                "neurotransmitters": nt,
+                "xbox_game": "Stardew Valley",
+                "game_mode": "Relaxed",
+                "duration_minutes": 30,
+                "switch_time": "After 20 mins",
+            }})
+        else:
+            params = rng.choice([{}, {"life_stage": "adult"}, {"gender": "female"}, {"limit": 50}])
+            corpus.append({"method": "GET", "path": "/twins", "params": params})
+    return corpus
+
+
+def load_corpus(path):
+    with open(path, "r") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def endpoint_of(item):
+    return item["path"].split("?")[0]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_app(port, workdir, env_overrides, workers=1):
+    env = dict(os.environ, **env_overrides)
+    cmd = [
+        sys.executable, "-m", "uvicorn", "main:app",
+        "--app-dir", REPO_DIR, "--host", "127.0.0.1", "--port", str(port),
+        "--workers", str(workers), "--log-level", "warning",
+    ]
+    log = open(os.path.join(workdir, "server.log"), "w")
+    return subprocess.Popen(cmd, cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+
+def wait_until_ready(base_url, timeout, proc=None):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc is not None and proc.poll() is not None:
+            raise RuntimeError(f"Server exited with code {proc.returncode} before becoming ready")
+        try:
+            if requests.get(f"{base_url}/twins", params={"limit": 1}, timeout=2).status_code < 500:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"Server at {base_url} not ready after {timeout}s")
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+def summarize(samples, wall_seconds):
+    latencies = sorted(s["latency_ms"] for s in samples)
+    errors = sum(1 for s in samples if not s["ok"])
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+        "throughput_rps": round(len(samples) / wall_seconds, 2) if wall_seconds else 0.0,
+        # Successful responses only: shed (503) requests are cheap and would inflate throughput_rps
+        "goodput_rps": round((len(samples) - errors) / wall_seconds, 2) if wall_seconds else 0.0,
+        "latency_ms": {
+            "mean": round(sum(latencies) / len(latencies), 2) if latencies else None,
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "max": latencies[-1] if latencies else None,
+        },
+    }
+
+
+def run_load(base_url, corpus, concurrency, timeout, honor_retry_after=False):
+    items = iter(corpus)
+    items_lock = threading.Lock()
+    samples = []
+    samples_lock = threading.Lock()
+
+    def worker():
+        session = requests.Session()
+        local = []
+        while True:
+            with items_lock:
+                item = next(items, None)
+            if item is None:
+                break
+            start = time.perf_counter()
+            try:
+                res = session.request(item["method"], base_url + item["path"], json=item.get("json"),
+                                      params=item.get("params"), timeout=timeout)
+                status, ok = res.status_code, res.status_code < 400
+            except requests.RequestException as e:
+                res = None
+                status, ok = type(e).__name__, False
+            local.append({
+                "endpoint": endpoint_of(item),
+                "status": status,
+                "ok": ok,
+                "latency_ms": round((time.perf_counter() - start) * 1000, 3),
+            })
+            if honor_retry_after and res is not None and res.status_code == 503:
+                # Behave like a well-mannered client: back off before sending the next request
+                try:
+                    time.sleep(float(res.headers.get("Retry-After", 0)))
+                except ValueError:
+                    pass
+        with samples_lock:
+            samples.extend(local)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(worker)
+    wall = time.perf_counter() - start
+
+    by_endpoint = {}
+    for sample in samples:
+        by_endpoint.setdefault(sample["endpoint"], []).append(sample)
+    status_counts = {}
+    for sample in samples:
+        key = f"{sample['endpoint']} {sample['status']}"
+        status_counts[key] = status_counts.get(key, 0) + 1
+
+    return {
+        "wall_seconds": round(wall, 3),
+        "overall": summarize(samples, wall),
+        "endpoints": {name: summarize(group, wall) for name, group in sorted(by_endpoint.items())},
+        "status_counts": status_counts,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=REPO_DIR, stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, baseline):
+    print("\nComparison with baseline:")
+    for name, stats in current["endpoints"].items():
+        old = baseline.get("endpoints", {}).get(name)
+        if not old:
+            continue
+        for label, new_value, old_value in [
+            ("rps", stats["throughput_rps"], old["throughput_rps"]),
+            ("p99 ms", stats["latency_ms"]["p99"], old["latency_ms"]["p99"]),
+            ("error rate", stats["error_rate"], old["error_rate"]),
+        ]:
+            if old_value in (None, 0) or new_value is None:
+                print(f"  {name:<12} {label:<10} {old_value} -> {new_value}")
+            else:
+                print(f"  {name:<12} {label:<10} {old_value} -> {new_value} ({(new_value - old_value) / old_value:+.1%})")
+
+
+def print_report(report):
+    print(f"\n{'endpoint':<12} {'reqs':>7} {'err%':>7} {'rps':>9} {'ok rps':>9} {'p50':>9} {'p95':>9} {'p99':>9}")
+    rows = list(report["results"]["endpoints"].items()) + [("ALL", report["results"]["overall"])]
+    for name, stats in rows:
+        lat = stats["latency_ms"]
+        print(f"{name:<12} {stats['requests']:>7} {stats['error_rate'] * 100:>6.2f}% {stats['throughput_rps']:>9.1f} "
+              f"{stats.get('goodput_rps', 0):>9.1f} "
+              f"{lat['p50'] or 0:>9.1f} {lat['p95'] or 0:>9.1f} {lat['p99'] or 0:>9.1f}")
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = int(weight or 1)
+    unknown = set(mix) - {"generate", "reflect", "twins"}
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown endpoints in mix: {', '.join(sorted(unknown))}")
+    return mix
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline load test for the NeuroSync API.")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=500, help="Synthetic corpus size")
+    parser.add_argument("--mix", type=parse_mix, default="generate=2,reflect=1,twins=3")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--corpus", help="Replay a recorded JSONL corpus instead of a synthetic one")
+    parser.add_argument("--warmup", type=int, default=20, help="Requests sent before measuring")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--base-url", help="Target an already running server instead of starting one")
+    parser.add_argument("--llm-latency-ms", type=float, default=300)
+    parser.add_argument("--genderize-latency-ms", type=float, default=20)
+    parser.add_argument("--request-timeout", type=float, default=60)
+    parser.add_argument("--honor-retry-after", action="store_true",
+                        help="Clients sleep for a 503's Retry-After before their next request")
+    parser.add_argument("--startup-timeout", type=float, default=180)
+    parser.add_argument("--output", default="loadtest_results.json")
+    parser.add_argument("--compare", help="Previous results JSON to compare against")
+    args = parser.parse_args(argv)
+
+    corpus = load_corpus(args.corpus) if args.corpus else synthetic_corpus(args.requests, args.mix, args.seed)
+    warmup = synthetic_corpus(args.warmup, args.mix, args.seed + 1) if args.warmup else []
+
+    fake_server = proc = None
+    workdir = tempfile.mkdtemp(prefix="neurosync-loadtest-")
+    base_url = args.base_url
+    try:
+        if not base_url:
+            fake_config = FakeServiceConfig(args.genderize_latency_ms, args.llm_latency_ms, seed=args.seed)
+            fake_server, fake_url = start_fake_services(config=fake_config)
+            port = free_port()
+            proc = start_app(port, workdir, service_env(fake_url), args.workers)
+            base_url = f"http://127.0.0.1:{port}"
+            print(f"Starting app on {base_url} (scratch dir {workdir}) ...")
+        wait_until_ready(base_url, args.startup_timeout, proc)
+
+        if warmup:
+            run_load(base_url, warmup, args.concurrency, args.request_timeout, args.honor_retry_after)
+        print(f"Replaying {len(corpus)} requests at concurrency {args.concurrency} ...")
+        results = run_load(base_url, corpus, args.concurrency, args.request_timeout, args.honor_retry_after)
+    finally:
+        if proc is not None:
+            proc.terminate()
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        if fake_server is not None:
+            fake_server.shutdown()
+
+    report = {
+        "timestamp": datetime.utcnow().isoformat(),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {
+            "concurrency": args.concurrency,
+            "requests": len(corpus),
+            "mix": args.mix if not args.corpus else None,
+            "corpus": args.corpus,
+            "seed": args.seed,
+            "workers": args.workers,
+            "llm_latency_ms": args.llm_latency_ms,
+            "genderize_latency_ms": args.genderize_latency_ms,
+            "base_url": args.base_url,
+            "honor_retry_after": args.honor_retry_after,
+        },
+        "results": results,
+    }
+
+    print_report(report)
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✅ Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            compare(results, json.load(f)["results"])
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,39 @@
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse, FileResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional, Union
 from datetime import datetime
 import json
 import os
+import tempfile
+import threading
+import time
 import random
 import requests
 import openai
-from generator import generate_twin_vector, infer_gender, apply_modifiers, extract_keywords
 import nltk
-from generator import build_scent_profile
 
 from fastapi import Query
 import pandas as pd
-from generator import extract_memory_scent_profile
-from vector_store import load_metadata, add_twin
+from vector_store import load_live_metadata, write_twins, delete_vector_ids, load_tombstones, compact_store
+from vector_store import SPACES, StoreLocked, ensure_space_indexes
+from twin_history import get_history_index, record_twin
+from mmap_store import get_mapped_store, live_vector_ids, search_similar_twins, stored_vector
+from http_cache import cached_json, response_cache
+from twin_pages import MAX_PAGE_SIZE, ORDERS, InvalidCursor, page_twins
+from cohorts import COHORT_INTERVAL_SECONDS, assign_cohort, load_cohorts, run_cohort_job_if_due, seconds_until_due
+from twin_export import DEFAULT_CHUNK_SIZE, EXPORT_FORMATS, ndjson_chunks, write_columnar
 from textblob import TextBlob
-from generator import infer_life_stage_from_text
+from generator import build_twin
+from reference_data import get_reference, reload_reference
+from admission import Overloaded, admission_stats, generate_admission, reflect_admission
+from reflection import agenerate_reflection, local_fallback
+from batch_reflect import get_reflection
+from profiling import PROFILING_ENABLED, list_profiles, load_profile, profile_call, profile_middleware, profile_path
+from nlp_pool import PoolBusy, run_in_pool, start_pool, shutdown_pool, pool_stats
+from starlette.concurrency import run_in_threadpool
 
 
 from textblob import download_corpora
@@ -46,6 +61,9 @@ for corpus in required:
 
 
 openai.api_key = os.getenv("OPENAI_API_KEY")
+COMPACTION_INTERVAL_SECONDS = float(os.getenv("COMPACTION_INTERVAL_SECONDS", "300"))
+COMPACTION_MIN_TOMBSTONES = int(os.getenv("COMPACTION_MIN_TOMBSTONES", "1"))
+REFLECT_TIMEOUT_SECONDS = float(os.getenv("REFLECT_TIMEOUT_SECONDS", "20"))
 app = FastAPI()
 
 app.add_middleware(
@@ -57,34 +75,6 @@ app.add_middleware(
 )
 
 
-with open(os.path.join(os.path.dirname(__file__), "fragrance_notes.json"), "r") as f:
-    fragrance_db = json.load(f)
-
-with open(os.path.join(os.path.dirname(__file__), "game_profiles.json"), "r") as f:
-    game_profiles = json.load(f)
-
-
-scent_map = {
-    "lavender": {"GABA": 0.1},
-    "vanilla": {"oxytocin": 0.1},
-    "mint": {"dopamine": 0.1},
-    "citrus": {"serotonin": 0.1},
-    "rose": {"oxytocin": 0.1},
-    "bergamot": {"serotonin": 0.1},
-    "cinnamon": {"dopamine": 0.1},
-    "tonka bean": {"oxytocin": 0.1},
-    "linalool": {"GABA": 0.1}
-}
-
-stress_map = {
-    "deadline": {"cortisol": 0.2, "GABA": -0.1},
-    "burnout": {"cortisol": 0.3, "dopamine": -0.1},
-    "lonely": {"oxytocin": -0.2},
-    "exam": {"cortisol": 0.2, "dopamine": 0.05},
-    "overwhelmed": {"cortisol": 0.25, "GABA": -0.15}
-}
-
-
 class TwinRequest(BaseModel):
     name: str
     email: str
@@ -107,6 +97,12 @@ class ReflectRequest(BaseModel):
     duration_minutes: Optional[int] = None
     switch_time: Optional[str] = None
 
+class SimilarRequest(BaseModel):
+    # Either a query vector for the chosen space (dict or flat list) or a stored twin to search around
+    vector: Optional[Union[dict, List[float]]] = None
+    vector_id: Optional[int] = None
+
+
 
 def determine_cognitive_focus(subvectors):
     if not subvectors:
@@ -123,89 +119,36 @@ def determine_cognitive_focus(subvectors):
     return focus_map.get(dominant_region, "general cognition")
 
 
-    
-def get_fragrance_notes(scent):
-    return fragrance_db.get(scent.lower().strip(), [])
-
-def match_game(favorite_scent, stressors_text, neurotransmitters):
-    scent = favorite_scent.lower().strip()
-    stress_keywords = extract_keywords(stressors_text)
-
-    
-    candidates = [g for g in game_profiles if scent in g.get("scent_affinity", {})]
-    if not candidates:
-        candidates = game_profiles  
-
-    
-    def score_game(game):
-        scent_score = game["scent_affinity"].get(scent, 0)
-        nt_score = sum(neurotransmitters.get(tag, 0.5) for tag in game.get("tags", [])) / len(game.get("tags", []) or [1])
-        return scent_score * 0.6 + nt_score * 0.4  # Weighted: scent more important
-
-    candidates.sort(key=score_game, reverse=True)
-    best_game = candidates[0]
-
-    
-    flat_neurotransmitters = {k: v for k, v in neurotransmitters.items() if isinstance(v, (float, int))}
-
-    dominant_nt = max(neurotransmitters, key=neurotransmitters.get)
-    rationale = (
-        f"Matched with '{best_game['name']}' because its scent affinity with '{scent}' "
-        f"is high and it supports neurotransmitters like {', '.join(best_game['tags'])}. "
-        f"Your current dominant neurotransmitter is {dominant_nt}."
-    )
-
-    return {
-        "xbox_game": best_game["name"],
-        "game_mode": random.choice(best_game["modes"]),
-        "duration_minutes": random.randint(*best_game["duration_range"]),
-        "switch_time": "After 30 mins" if "burnout" in stress_keywords else "After 20 mins",
-        "spotify_playlist": best_game.get("spotify_playlist", "Focus Boost"),
-        "match_reason": rationale
-    }
-
 
 @app.post("/generate")
 async def generate(data: TwinRequest):
     try:
-        print("== ✅ Request received at /generate ==")
-        goals_sentiment = TextBlob(data.career_goals).sentiment.polarity
-        stressors_sentiment = TextBlob(data.productivity_limiters).sentiment.polarity
-        twin = generate_twin_vector(data, goals_sentiment=goals_sentiment, stressors_sentiment=stressors_sentiment)
-        scent_profile = build_scent_profile(data.scent_note)
-        memory_scent_profile = extract_memory_scent_profile(data.childhood_scent, fragrance_db, scent_map)
-        print(f"📊 Sentiment — Goals: {goals_sentiment}, Stressors: {stressors_sentiment}")
-
-        twin["goals_sentiment"] = goals_sentiment
-        twin["stressors_sentiment"] = stressors_sentiment
-        if goals_sentiment < -0.3:
-            twin["neurotransmitters"]["dopamine"] = max(0, twin["neurotransmitters"].get("dopamine", 0.5) - 0.05)
-            twin["neurotransmitters"]["serotonin"] = max(0, twin["neurotransmitters"].get("serotonin", 0.5) - 0.05)
-        if stressors_sentiment < -0.3:
-            twin["neurotransmitters"]["cortisol"] = min(1, twin["neurotransmitters"].get("cortisol", 0.5) + 0.1)
-            twin["neurotransmitters"]["GABA"] = max(0, twin["neurotransmitters"].get("GABA", 0.5) - 0.05)
-       
-
-       
+        async with generate_admission.slot():
+            return await create_twin(data)
+    except Overloaded as e:
+        # Shed before any work is done: cheaper for us, and the client can retry elsewhere/later
+        print("⚠️ /generate shed:", str(e))
+        return JSONResponse(status_code=503, content={"status": "error", "detail": str(e)},
+                            headers={"Retry-After": str(e.retry_after)})
 
-        
-
-        print("DEBUG: Twin vector keys:", list(twin.keys()))
 
-        
-        game = match_game(data.scent_note, data.productivity_limiters, twin["neurotransmitters"])
-        twin.update(game)
-        twin["timestamp"] = datetime.utcnow().isoformat()
+async def create_twin(data: TwinRequest):
+    try:
+        print("== ✅ Request received at /generate ==")
+        # TextBlob tagging/sentiment, difflib matching and game scoring are CPU-bound;
+        # run them on the NLP pool so light endpoints keep a responsive event loop
+        twin, scent_profile, memory_scent_profile = await run_in_pool(build_twin, dict(data))
 
         required_keys = ["neurotransmitters", "xbox_game"]
         for key in required_keys:
             if key not in twin:
                 raise ValueError(f"❌ Key '{key}' missing from twin output")
 
-        metadata = load_metadata()
-        vector_id = len(metadata)
-                
-        add_twin(twin)
+        twin["cohort"] = assign_cohort(twin["neurotransmitters"])
+        entries, before, after = await run_in_threadpool(profile_call, write_twins, [twin])
+        entry = entries[0]
+        record_twin(entry, before, after)
+        vector_id = twin["vector_id"] = entry["vector_id"]
 
         print("== ✅ Final Output ==", twin)
 
@@ -226,6 +169,8 @@ async def generate(data: TwinRequest):
             "timestamp": datetime.utcnow().isoformat(), 
             "brain_regions": twin.get("brain_regions", {}),
             "vector_id": vector_id,
+            "user_id": entry["user_id"],
+            "cohort": twin["cohort"],
             "goals_sentiment": twin.get("goals_sentiment", 0),
             "stressors_sentiment": twin.get("stressors_sentiment", 0),
             "subvectors": twin.get("subvectors", {}),
@@ -236,6 +181,9 @@ async def generate(data: TwinRequest):
         print("== ✅ Final Output ==", output)
         return JSONResponse(content=json.loads(json.dumps(output, default=str)))
     
+    except PoolBusy as e:
+        print("⚠️ /generate rejected:", str(e))
+        return JSONResponse(status_code=503, content={"status": "error", "detail": str(e)}, headers={"Retry-After": "1"})
 
     except Exception as e:
         print("❌ ERROR in /generate:", str(e))
@@ -244,109 +192,68 @@ async def generate(data: TwinRequest):
         
 @app.post("/reflect")
 async def reflect(data: ReflectRequest):
+    payload = dict(data)
     try:
         print("== Incoming Reflect Request ==")
         print(data)
+        async with reflect_admission.slot():
+            return {"journal_entry": await agenerate_reflection(payload, request_timeout=REFLECT_TIMEOUT_SECONDS)}
 
-        def analyze_neuro(nt):
-            suggestions = []
-            if nt.get("dopamine", 0.5) < 0.4:
-                suggestions.append("Dopamine is low — try mint or cinnamon, or celebrate small wins.")
-            if nt.get("serotonin", 0.5) < 0.4:
-                suggestions.append("Low serotonin? Sunshine, citrus scents, or journaling may help.")
-            if nt.get("oxytocin", 0.5) < 0.4:
-                suggestions.append("Oxytocin seems low — reconnect with friends or try vanilla or rose scents.")
-            if nt.get("GABA", 0.5) < 0.4:
-                suggestions.append("GABA is low. Try lavender, quiet time, or calming music.")
-            if nt.get("cortisol", 0.5) > 0.7:
-                suggestions.append("Cortisol is high — breathe deeply, take breaks, and avoid multitasking.")
-            return suggestions
-
-        def local_fallback():
-            insights = analyze_neuro(data.neurotransmitters)
-            game_reco = f"🎮 Play: {data.xbox_game or 'a focus-friendly game'} ({data.game_mode}), for ~{data.duration_minutes} mins. Switch: {data.switch_time}."
-            tips = "\n".join(f"- {tip}" for tip in insights)
-            return f"""
-🧠 Today’s Reflection for {data.name}  
-Your brain chemistry suggests:  
-{tips}
-
-{game_reco}  
-Stay mindful and pace your energy today.
-"""
-
-        
-        def build_prompt():
-            insights = analyze_neuro(data.neurotransmitters or {})
-            joined_insights = "\n".join(insights)
-            work_env = data.neurotransmitters.get("work_env", "general_consumer")
-            style_score = data.neurotransmitters.get("email_style_score", 0)
-            aligned = data.neurotransmitters.get("name_email_aligned", False)
-
-            if work_env == "corporate":
-                tone = "Focus on work-life balance and actionable calm-down strategies. Assume the user may be under pressure."
-
-            elif work_env == "academic":
-                tone = "Emphasize structure, routine, and intellectual grounding. Recommend curiosity-fueled recovery strategies."
-
-            else:
-                tone = "Keep the tone empathetic and casual — support emotional regulation and creative rejuvenation."
-
-            if style_score < 0:
-                tone += " Keep it light and encouraging — possibly a younger or expressive user."
-
-            elif aligned:
-                tone += " You can assume the user is self-aware and identity-aligned. Reinforce motivation gently."
-
-            game_reco = f"Today’s game: {data.xbox_game} ({data.game_mode}), play for ~{data.duration_minutes} minutes, then switch: {data.switch_time}."
-            playlist = f"We’ve also curated a Spotify playlist for today: {data.name}'s {data.game_mode} Vibes 🎶"
-            return (
-                f"My name is {data.name}. I feel {data.current_emotion}. "
-                f"Recent events include: {data.recent_events}. My goals are: {data.goals}. "
-                f"Based on my brain chemistry, here's what's going on: {joined_insights}. "
-                f"{game_reco} Suggest a daily routine, calming scent and a Spotify playlist to help.\n\n"
-                f"🎯 Context: {tone}"
-            )
-
-        prompt = build_prompt()
-
-        
-        res = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        "You're a motivational mental wellness coach who interprets emotional state, brain chemistry, "
-                        "and gaming focus to offer an uplifting reflection with practical guidance. Keep it kind, clear, and actionable."
-                    )
-                },
-                {"role": "user", "content": prompt}
-            ]
-        )
-
-        journal = res.choices[0].message.content.strip()
-
-        if not journal:
-            raise ValueError("GPT returned empty response")
-
-        return {"journal_entry": journal}
+    except Overloaded as e:
+        print("⚠️ /reflect over capacity, serving the local reflection:", str(e))
+        return {"journal_entry": local_fallback(payload)}
 
     except Exception as e:
         print("❌ GPT fallback triggered due to:", e)
-        return {"journal_entry": local_fallback()}
+        return {"journal_entry": local_fallback(payload)}
+
+@app.get("/reflections/{user_id}")
+def get_user_reflection(user_id: str):
+    # Written by batch_reflect.py; served from memory until reflections.json changes
+    reflection = get_reflection(user_id)
+    if reflection is None:
+        raise HTTPException(status_code=404, detail=f"No reflection for user '{user_id}'")
+    return {"status": "success", "reflection": reflection}
+
 
 @app.get("/twins")
 def get_twins(
+    request: Request,
     gender: Optional[str] = Query(None),
     life_stage: Optional[str] = Query(None),
     age_range: Optional[str] = Query(None),
     user_id: Optional[str] = Query(None),
+    cohort: Optional[int] = Query(None),
     
-    limit: Optional[int] = Query(None)
+    limit: Optional[int] = Query(None, ge=1),
+    cursor: Optional[str] = Query(None),
+    page_size: Optional[int] = Query(None, ge=1),
+    order: Optional[str] = Query(None)
 ):
-    try:
-        metadata = load_metadata()
+    paginate = cursor is not None or page_size is not None or order is not None
+    if limit is not None:
+        # The unpaged listing is capped like a page, however large a limit the client asks for
+        limit = min(limit, MAX_PAGE_SIZE)
+    if order is not None and order not in ORDERS:
+        return JSONResponse(status_code=400, content={"status": "error", "detail": f"order must be one of {', '.join(ORDERS)}"})
+
+    def build_page():
+        # Keyset pagination on (timestamp, vector_id); `limit` doubles as the page size
+        filters = {"gender": gender or None, "life_stage": life_stage or None,
+                   "age_range": age_range or None, "user_id": user_id or None, "cohort": cohort}
+        results, next_cursor, size = page_twins(filters, page_size or limit, cursor, order or "asc")
+        return {"status": "success", "count": len(results), "twins": results,
+                "order": order or "asc", "page_size": size, "next_cursor": next_cursor}
+
+    def build():
+        store = get_mapped_store()
+        if store.columns is not None:
+            filters = {"gender": gender or None, "life_stage": life_stage or None,
+                       "age_range": age_range or None, "user_id": user_id or None, "cohort": cohort}
+            results = store.filter_entries(filters, limit)
+            return {"status": "success", "count": len(results), "twins": results}
+
+        metadata = load_live_metadata()
         
 
         results = [
@@ -356,6 +263,7 @@ def get_twins(
             and (not age_range or m.get("age_range") == age_range)
             
             and (not user_id or m.get("user_id") == user_id)
+            and (cohort is None or m.get("cohort") == cohort)
         ]
 
         
@@ -366,7 +274,281 @@ def get_twins(
         if limit:
             results = results[:limit]
 
-        return JSONResponse(content={"status": "success", "count": len(results), "twins": results})
+        return {"status": "success", "count": len(results), "twins": results}
+
+    try:
+        # Polls with unchanged filters and store version get a 304 or a cached body
+        return cached_json(request, build_page if paginate else build)
+    except InvalidCursor as e:
+        return JSONResponse(status_code=400, content={"status": "error", "detail": str(e)})
     except Exception as e:
         print("❌ ERROR in /twins:", str(e))
         return JSONResponse(status_code=500, content={"status": "error", "detail": str(e)})
+
+
+@app.post("/twins/similar")
+def find_similar_twins(
+    req: SimilarRequest,
+    space: str = Query("neurotransmitters"),
+    top_k: int = Query(5, ge=1, le=1000),
+    gender: Optional[str] = Query(None),
+    life_stage: Optional[str] = Query(None),
+    age_range: Optional[str] = Query(None),
+    user_id: Optional[str] = Query(None)
+):
+    if space not in SPACES:
+        return JSONResponse(status_code=400, content={"status": "error", "detail": f"space must be one of {', '.join(SPACES)}"})
+    if (req.vector is None) == (req.vector_id is None):
+        return JSONResponse(status_code=400, content={"status": "error", "detail": "Pass exactly one of vector, vector_id"})
+
+    query = req.vector
+    if req.vector_id is not None:
+        query = stored_vector(req.vector_id, space) if req.vector_id not in load_tombstones() else None
+        if query is None:
+            raise HTTPException(status_code=404, detail=f"No twin with vector_id {req.vector_id}")
+
+    filters = {"gender": gender or None, "life_stage": life_stage or None,
+               "age_range": age_range or None, "user_id": user_id or None}
+    try:
+        # One extra hit so the query twin itself can be left out
+        results = search_similar_twins(query, top_k + (req.vector_id is not None), filters, space)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"status": "error", "detail": str(e)})
+    except Exception as e:
+        print("❌ ERROR in /twins/similar:", str(e))
+        return JSONResponse(status_code=500, content={"status": "error", "detail": str(e)})
+    results = [r for r in results if r.get("vector_id") != req.vector_id][:top_k]
+    return {"status": "success", "space": space, "count": len(results), "twins": results}
+
+
+@app.get("/twins/export")
+def export_twins(
+    format: str = Query("ndjson"),
+    gender: Optional[str] = Query(None),
+    life_stage: Optional[str] = Query(None),
+    age_range: Optional[str] = Query(None),
+    user_id: Optional[str] = Query(None),
+    chunk_size: int = Query(DEFAULT_CHUNK_SIZE, ge=1, le=50000)
+):
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(EXPORT_FORMATS)}")
+    filters = {"gender": gender, "life_stage": life_stage, "age_range": age_range, "user_id": user_id}
+
+    if format == "ndjson":
+        return StreamingResponse(
+            ndjson_chunks(filters, chunk_size),
+            media_type="application/x-ndjson",
+            headers={"Content-Disposition": "attachment; filename=twins.ndjson"}
+        )
+
+    fd, path = tempfile.mkstemp(suffix=f".{format}")
+    os.close(fd)
+    try:
+        write_columnar(path, format, filters, chunk_size)
+    except Exception as e:
+        os.remove(path)
+        print("❌ ERROR in /twins/export:", str(e))
+        raise HTTPException(status_code=500, detail=f"Export failed: {e}")
+    media_type = "application/vnd.apache.parquet" if format == "parquet" else "application/vnd.apache.arrow.file"
+    return FileResponse(
+        path,
+        media_type=media_type,
+        filename=f"twins.{format}",
+        background=BackgroundTask(os.remove, path)
+    )
+
+
+@app.get("/twins/{user_id}/history")
+def get_twin_history(
+    request: Request,
+    user_id: str,
+    start: Optional[str] = Query(None),
+    end: Optional[str] = Query(None),
+    limit: Optional[int] = Query(None)
+):
+    def build():
+        results = get_history_index().range(user_id, start, end)
+        if limit:
+            results = results[-limit:]
+        return {"status": "success", "user_id": user_id, "count": len(results), "twins": results}
+
+    try:
+        return cached_json(request, build)
+    except Exception as e:
+        print("❌ ERROR in /twins/{user_id}/history:", str(e))
+        return JSONResponse(status_code=500, content={"status": "error", "detail": str(e)})
+
+
+@app.get("/twins/{user_id}/latest")
+def get_latest_twin(request: Request, user_id: str):
+    def build():
+        latest = get_history_index().latest(user_id)
+        if latest is None:
+            raise HTTPException(status_code=404, detail=f"No twins found for user '{user_id}'")
+        return {"status": "success", "user_id": user_id, "twin": latest}
+
+    return cached_json(request, build)
+
+
+@app.get("/twins/{user_id}/deltas")
+def get_twin_deltas(
+    request: Request,
+    user_id: str,
+    start: Optional[str] = Query(None),
+    end: Optional[str] = Query(None)
+):
+    def build():
+        deltas = get_history_index().deltas(user_id, start, end)
+        return {"status": "success", "user_id": user_id, "count": len(deltas), "deltas": deltas}
+
+    try:
+        return cached_json(request, build)
+    except Exception as e:
+        print("❌ ERROR in /twins/{user_id}/deltas:", str(e))
+        return JSONResponse(status_code=500, content={"status": "error", "detail": str(e)})
+
+
+@app.delete("/twins/user/{user_id}")
+def delete_user_twins(user_id: str):
+    # From the store on disk, not this worker's history index, so twins other workers wrote are included
+    deleted = delete_vector_ids(live_vector_ids({"user_id": user_id}))
+    if not deleted:
+        raise HTTPException(status_code=404, detail=f"No twins found for user '{user_id}'")
+    return {"status": "success", "user_id": user_id, "deleted_vector_ids": deleted}
+
+
+@app.delete("/twins/vector/{vector_id}")
+def delete_twin(vector_id: int):
+    if not live_vector_ids({"vector_id": vector_id}):
+        raise HTTPException(status_code=404, detail=f"No twin with vector_id {vector_id}")
+    delete_vector_ids([vector_id])
+    return {"status": "success", "deleted_vector_ids": [vector_id]}
+
+
+def compaction_loop():
+    while True:
+        time.sleep(COMPACTION_INTERVAL_SECONDS)
+        try:
+            if len(load_tombstones()) >= COMPACTION_MIN_TOMBSTONES:
+                result = compact_store(wait=False)
+                print(f"🧹 Compacted vector store: removed {result['removed']}, {result['remaining']} twins remain")
+        except StoreLocked:
+            pass  # another worker (or store_admin.py) is writing; try again next interval
+        except Exception as e:
+            print("❌ ERROR in background compaction:", str(e))
+
+
+@app.on_event("startup")
+def open_mapped_store():
+    # Maps the index and column file; pages are shared with every other worker on the host
+    try:
+        built = ensure_space_indexes()
+        if built:
+            print(f"✅ Built {', '.join(built)} indexes for the existing store")
+        get_mapped_store()
+    except Exception as e:
+        print("⚠️ Could not open memory-mapped store:", str(e))
+
+
+@app.on_event("startup")
+def start_nlp_pool():
+    start_pool()
+
+
+@app.on_event("shutdown")
+def stop_nlp_pool():
+    shutdown_pool()
+
+
+@app.get("/pool")
+def get_pool_stats():
+    return pool_stats()
+
+
+@app.get("/admission")
+def get_admission_stats():
+    return admission_stats()
+
+
+@app.get("/cache")
+def get_cache_stats():
+    return response_cache.stats()
+
+
+@app.on_event("startup")
+def load_reference_data():
+    get_reference()
+
+
+@app.get("/reference")
+def get_reference_summary():
+    return get_reference().summary()
+
+
+@app.post("/reference/reload")
+def reload_reference_data():
+    # Parses and precomputes off to the side, then swaps; requests in flight keep the old snapshot
+    try:
+        reference = reload_reference(force=True)
+        return {"status": "success", "reference": reference.summary()}
+    except Exception as e:
+        print("❌ ERROR reloading reference data:", str(e))
+        return JSONResponse(status_code=500, content={"status": "error", "detail": str(e)})
+
+
+@app.get("/cohorts")
+def get_cohorts(request: Request):
+    def build():
+        report = load_cohorts()
+        if report is None:
+            raise HTTPException(status_code=404, detail="Cohorts have not been computed yet")
+        return {"status": "success", "k": report["k"], "trained_at": report["trained_at"],
+                "trained_on": report["trained_on"], "cohorts": report["cohorts"]}
+
+    return cached_json(request, build)
+
+
+def cohort_loop():
+    # Every worker runs this loop, but the job itself runs in one of them once cohorts.json is stale
+    while True:
+        try:
+            report = run_cohort_job_if_due(COHORT_INTERVAL_SECONDS)
+            if report is not None:
+                print(f"🧭 Clustered {report['trained_on']} twins into {report['k']} cohorts in {report['train_seconds']}s "
+                      f"({report['relabelled']} relabelled)")
+        except Exception as e:
+            print("❌ ERROR in background cohort clustering:", str(e))
+        time.sleep(seconds_until_due(COHORT_INTERVAL_SECONDS))
+
+
+@app.on_event("startup")
+def start_cohort_job():
+    if COHORT_INTERVAL_SECONDS > 0:
+        threading.Thread(target=cohort_loop, name="cohort-clustering", daemon=True).start()
+
+
+@app.on_event("startup")
+def start_compaction():
+    if COMPACTION_INTERVAL_SECONDS > 0:
+        threading.Thread(target=compaction_loop, name="store-compaction", daemon=True).start()
+
+
+if PROFILING_ENABLED:
+    # Registered only when profiling is configured; otherwise requests skip it entirely
+    app.middleware("http")(profile_middleware)
+
+    @app.get("/debug/profiles")
+    def get_profiles():
+        return {"status": "success", "profiles": list_profiles()}
+
+    @app.get("/debug/profiles/{profile_id}")
+    def get_profile(profile_id: str, format: str = Query("json")):
+        if format not in ("json", "prof"):
+            raise HTTPException(status_code=400, detail="format must be one of json, prof")
+        report = load_profile(profile_id)
+        if report is None:
+            raise HTTPException(status_code=404, detail=f"No profile '{profile_id}'")
+        if format == "prof":
+            return FileResponse(profile_path(profile_id, "prof"), media_type="application/octet-stream",
+                                filename=f"{profile_id}.prof")
+        return report
@@ -0,0 +1,369 @@
+# mmap_store.py
+"""Memory-mapped read path for the vector store.
+
+The FAISS index is opened with IO_FLAG_MMAP_IFC so its vectors stay in the page cache
+instead of being copied onto each process's heap, and metadata is read from the
+fixed-layout column file written by vector_store.save_columns. Opening is O(1) in the
+store size and every uvicorn worker on a machine shares the same physical pages.
+
+    python mmap_store.py --workers 4 --store-size 200000   # RSS per worker and time-to-ready
+"""
+import argparse
+import json
+import os
+import struct
+import threading
+import time
+
+import faiss
+import numpy as np
+
+import vector_store
+from vector_store import COLUMN_MAGIC, NT_KEYS, STRING_COLUMNS, _align, load_tombstones, matches_filters
+
+MMAP_FLAGS = getattr(faiss, "IO_FLAG_MMAP_IFC", 0) | getattr(faiss, "IO_FLAG_READ_ONLY", 0)
+
+
+def load_index_mmap(space="neurotransmitters"):
+    path = vector_store.space_index_path(space)
+    if not os.path.exists(path):
+        return vector_store.load_space_index(space)
+    try:
+        index = faiss.read_index(path, MMAP_FLAGS)
+    except RuntimeError as e:
+        print(f"⚠️ Could not memory-map {path} ({e}); reading it onto the heap")
+        return vector_store.load_space_index(space)
+    return index if isinstance(index, faiss.IndexIDMap) else vector_store.load_space_index(space)
+
+
+class ColumnFile:
+    """Read-only view over a metadata.columns file; every column is a slice of one mmap."""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            if f.read(len(COLUMN_MAGIC)) != COLUMN_MAGIC:
+                raise ValueError(f"{path} is not a metadata column file")
+            (header_len,) = struct.unpack("<Q", f.read(8))
+            header = json.loads(f.read(header_len))
+        data_start = _align(len(COLUMN_MAGIC) + 8 + header_len)
+
+        self.rows = header["rows"]
+        self.metadata_stamp = header["metadata_stamp"]
+        self.columns = {}
+        buf = np.memmap(path, dtype=np.uint8, mode="r") if self.rows else None
+        for spec in header["columns"]:
+            dtype = np.dtype(spec["dtype"])
+            shape = tuple(spec["shape"])
+            if not self.rows:
+                self.columns[spec["name"]] = np.empty(shape, dtype=dtype)
+                continue
+            start = data_start + spec["offset"]
+            nbytes = int(np.prod(shape)) * dtype.itemsize
+            self.columns[spec["name"]] = buf[start:start + nbytes].view(dtype).reshape(shape)
+
+    def __len__(self):
+        return self.rows
+
+    def rows_for_ids(self, vector_ids):
+        """Row numbers for vector_ids (-1 where absent); the vector_id column is sorted."""
+        ids = self.columns["vector_id"]
+        vector_ids = np.asarray(vector_ids, dtype='int64')
+        rows = np.searchsorted(ids, vector_ids)
+        found = rows < len(ids)
+        found[found] = ids[rows[found]] == vector_ids[found]
+        return np.where(found, rows, -1)
+
+    def entry(self, row):
+        nt_values = self.columns["neurotransmitters"][row]
+        entry = {}
+        for name in STRING_COLUMNS:
+            value = self.columns[name][row].decode("utf-8", errors="ignore")
+            entry[name] = value or None
+        entry["vector_id"] = int(self.columns["vector_id"][row])
+        if "cohort" in self.columns and self.columns["cohort"][row] >= 0:
+            entry["cohort"] = int(self.columns["cohort"][row])
+        nt = {k: float(v) for k, v in zip(NT_KEYS, nt_values) if not np.isnan(v)}
+        extra = self.columns["extra"][row]
+        if extra:
+            extra = json.loads(extra)
+            if "neurotransmitters" in extra:
+                extra_nt = extra.pop("neurotransmitters")
+                nt = None if extra_nt is None else {**nt, **extra_nt}
+            entry.update(extra)
+        entry["neurotransmitters"] = nt
+        return entry
+
+    def mask(self, filters=None, tombstones=frozenset(), rows=None):
+        """Boolean mask over all rows, or over just `rows` (an array of row numbers) if given."""
+        def column(name):
+            return self.columns[name] if rows is None else self.columns[name][rows]
+
+        mask = np.ones(self.rows if rows is None else len(rows), dtype=bool)
+        for key, value in (filters or {}).items():
+            if value is None:
+                continue
+            if key in STRING_COLUMNS:
+                mask &= column(key) == str(value).encode("utf-8")
+            elif key in ("vector_id", "cohort"):
+                # Files written before cohorts existed have no cohort column, hence no members
+                mask &= column(key) == int(value) if key in self.columns else False
+            else:
+                raise KeyError(f"Cannot filter column file on '{key}'")
+        if tombstones and len(mask):
+            mask &= ~np.isin(column("vector_id"), np.fromiter(tombstones, dtype='int64'))
+        return mask
+
+    def timestamp_order(self):
+        """Row numbers sorted by (timestamp, vector_id); computed once for files written before ts_order existed."""
+        if "ts_order" not in self.columns:
+            self.columns["ts_order"] = np.lexsort((self.columns["vector_id"], self.columns["timestamp"]))
+        return self.columns["ts_order"]
+
+    def order_position(self, key, inclusive):
+        """Number of rows in timestamp order whose (timestamp, vector_id) is < key (<= if inclusive)."""
+        order = self.timestamp_order()
+        timestamps, ids = self.columns["timestamp"], self.columns["vector_id"]
+        lo, hi = 0, len(order)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            row = order[mid]
+            mid_key = (bytes(timestamps[row]), int(ids[row]))
+            if mid_key < key or (inclusive and mid_key == key):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+
+class MappedStore:
+    def __init__(self):
+        self.index = load_index_mmap()
+        self.space_indexes = {"neurotransmitters": self.index}
+        self.columns = None
+        path = vector_store.COLUMNS_PATH
+        if os.path.exists(path) and os.path.exists(vector_store.META_PATH):
+            columns = ColumnFile(path)
+            # Written right after metadata.json; a mismatch means a writer died in between
+            if columns.metadata_stamp == vector_store.metadata_stamp():
+                self.columns = columns
+
+    def filter_entries(self, filters=None, limit=None):
+        rows = np.flatnonzero(self.columns.mask(filters, load_tombstones()))
+        if limit:
+            rows = rows[:limit]
+        return [self.columns.entry(row) for row in rows]
+
+    def page(self, filters=None, size=50, after=None, descending=False):
+        """Up to `size` live entries in (timestamp, vector_id) order, strictly past the key `after`.
+
+        The start is found by binary search and rows are filtered in small blocks from
+        there, so a page costs about O(size) however deep it is.
+        """
+        order = self.columns.timestamp_order()
+        tombstones = load_tombstones()
+        if after is not None:
+            after = (after[0].encode("utf-8"), int(after[1]))
+        if descending:
+            pos = len(order) if after is None else self.columns.order_position(after, inclusive=False)
+        else:
+            pos = 0 if after is None else self.columns.order_position(after, inclusive=True)
+
+        block = max(2 * size, 256)
+        rows = []
+        while len(rows) < size:
+            if descending:
+                if pos <= 0:
+                    break
+                candidates = order[max(0, pos - block):pos][::-1]
+                pos -= len(candidates)
+            else:
+                if pos >= len(order):
+                    break
+                candidates = order[pos:pos + block]
+                pos += len(candidates)
+            matched = candidates[self.columns.mask(filters, tombstones, rows=candidates)]
+            rows.extend(matched[:size - len(rows)].tolist())
+        return [self.columns.entry(row) for row in rows]
+
+    def index_for(self, space):
+        """The index for an embedding space, mapped on first use."""
+        if space not in self.space_indexes:
+            self.space_indexes[space] = load_index_mmap(space)
+        return self.space_indexes[space]
+
+    def search(self, query_vector, top_k=5, filters=None, space="neurotransmitters"):
+        query = np.array([vector_store.space_vector(space, query_vector)], dtype='float32')
+        index = self.index_for(space)
+        if index.ntotal == 0 or self.columns is None:
+            return []
+        params = None
+        tombstones = load_tombstones()
+        if tombstones:
+            selector = faiss.IDSelectorNot(faiss.IDSelectorBatch(np.array(sorted(tombstones), dtype='int64')))
+            params = faiss.SearchParameters(sel=selector)
+        distances, ids = index.search(query, top_k, params=params)
+        similar = []
+        for distance, vid, row in zip(distances[0], ids[0], self.columns.rows_for_ids(ids[0])):
+            if vid < 0 or row < 0:
+                continue
+            entry = self.columns.entry(row)
+            if not matches_filters(entry, filters):
+                continue
+            entry["distance"] = float(distance)
+            similar.append(entry)
+        return similar
+
+
+_lock = threading.Lock()
+_store = None
+_store_key = None
+
+
+def _file_key(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (path, stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+def get_mapped_store():
+    """Process-wide mapped store, reopened only when an index or the column file is replaced."""
+    global _store, _store_key
+    key = (
+        _file_key(vector_store.INDEX_PATH),
+        _file_key(vector_store.COLUMNS_PATH),
+        _file_key(vector_store.META_PATH),
+        *(_file_key(vector_store.space_index_path(space)) for space in vector_store.EXTRA_SPACES),
+    )
+    with _lock:
+        if _store is None or key != _store_key:
+            _store = MappedStore()
+            _store_key = key
+        return _store
+
+
+def live_vector_ids(filters=None):
+    """vector_ids of the live (not tombstoned) twins matching filters, as stored on disk now."""
+    store = get_mapped_store()
+    if store.columns is None:
+        return [m["vector_id"] for m in vector_store.load_live_metadata() if matches_filters(m, filters)]
+    ids = store.columns.columns["vector_id"]
+    return ids[store.columns.mask(filters, load_tombstones())].tolist()
+
+
+def stored_vector(vector_id, space="neurotransmitters"):
+    """vector_id's vector in `space`, read from the mapped index (None if it isn't stored)."""
+    return vector_store.stored_space_vector(get_mapped_store().index_for(space), vector_id)
+
+
+def search_similar_twins(query_vector, top_k=5, filters=None, space="neurotransmitters"):
+    store = get_mapped_store()
+    if store.columns is None:
+        return vector_store.search_similar_twins(query_vector, top_k, filters, space)
+    return store.search(query_vector, top_k, filters, space)
+
+
+def _memory_status():
+    status = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("VmRSS", "RssAnon", "RssFile"):
+                status[key] = int(value.split()[0])
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key == "Pss":
+                    status["Pss"] = int(value.split()[0])
+    except FileNotFoundError:
+        pass
+    return status
+
+
+def _measure_worker(mode, store_dir, ready_barrier, done_barrier, results):
+    start = time.perf_counter()
+    vector_store.set_store_dir(store_dir)
+    query = {k: 0.5 for k in NT_KEYS}
+    if mode == "mmap":
+        store = get_mapped_store()
+        store.search(query, top_k=10)
+    else:
+        index = vector_store.load_index()
+        metadata = vector_store.load_metadata()
+        index.search(np.array([[0.5] * len(NT_KEYS)], dtype='float32'), 10)
+    ready = time.perf_counter() - start
+    # Touch every page of the vectors so resident memory reflects a fully warmed worker
+    if mode == "mmap":
+        store.index.search(np.random.rand(64, len(NT_KEYS)).astype('float32'), 1)
+    else:
+        index.search(np.random.rand(64, len(NT_KEYS)).astype('float32'), 1)
+    ready_barrier.wait()  # all workers alive at once, so shared pages are counted as shared
+    results.put({"mode": mode, "ready_seconds": round(ready, 4), **_memory_status()})
+    done_barrier.wait()
+
+
+def measure(store_dir, workers):
+    import multiprocessing
+
+    ctx = multiprocessing.get_context("spawn")
+    report = {}
+    for mode in ("heap", "mmap"):
+        results = ctx.Queue()
+        ready_barrier, done_barrier = ctx.Barrier(workers), ctx.Barrier(workers + 1)
+        procs = [ctx.Process(target=_measure_worker, args=(mode, store_dir, ready_barrier, done_barrier, results))
+                 for _ in range(workers)]
+        for proc in procs:
+            proc.start()
+        samples = [results.get() for _ in procs]
+        done_barrier.wait()
+        for proc in procs:
+            proc.join()
+        report[mode] = {
+            "workers": workers,
+            "ready_seconds_max": max(s["ready_seconds"] for s in samples),
+            "rss_kb_per_worker": round(sum(s["VmRSS"] for s in samples) / workers),
+            "anon_kb_per_worker": round(sum(s.get("RssAnon", 0) for s in samples) / workers),
+            "file_kb_per_worker": round(sum(s.get("RssFile", 0) for s in samples) / workers),
+            "pss_kb_total": sum(s.get("Pss", 0) for s in samples) or None,
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare heap vs memory-mapped store loading across workers.")
+    parser.add_argument("--store-dir", help="Existing store to measure (default: build a synthetic one)")
+    parser.add_argument("--store-size", type=int, default=200000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--output", help="Write the report as JSON")
+    args = parser.parse_args()
+
+    store_dir = args.store_dir
+    if not store_dir:
+        import random
+        import tempfile
+
+        store_dir = tempfile.mkdtemp(prefix="neurosync-mmap-")
+        vector_store.set_store_dir(store_dir)
+        rng = random.Random(0)
+        print(f"Building synthetic store with {args.store_size} twins in {store_dir} ...")
+        vector_store.add_twins([{
+            "name": f"user{i}",
+            "gender": rng.choice(["female", "male", "neutral"]),
+            "life_stage": rng.choice(["young_adult", "adult", "senior"]),
+            "age_range": rng.choice(["18-25", "25-40", "60+"]),
+            "neurotransmitters": {k: round(rng.random(), 2) for k in NT_KEYS},
+        } for i in range(args.store_size)])
+
+    report = measure(store_dir, args.workers)
+    for mode, stats in report.items():
+        print(f"{mode:<5} ready={stats['ready_seconds_max']:.3f}s rss/worker={stats['rss_kb_per_worker']}KB "
+              f"(anon {stats['anon_kb_per_worker']}KB, file {stats['file_kb_per_worker']}KB) pss total={stats['pss_kb_total']}KB")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"store_dir": store_dir, "report": report}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+# nlp_compare.py
+"""Compare NLP_MODE=fast against the TextBlob pipeline on the same /generate requests.
+
+Every request is run through generator.build_twin once per mode with the same random
+seed, so any difference in the resulting twin comes from keyword extraction and
+sentiment alone. Reports per-neurotransmitter drift, how often the matched game and
+stressor categories change, and the time each mode spends per request.
+
+    python nlp_compare.py --size 500
+    python nlp_compare.py --corpus corpus.jsonl --output nlp_compare.json   # loadtest.py corpus format
+"""
+import argparse
+import contextlib
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+INVOKED_FROM = os.getcwd()
+SCRATCH_DIR = tempfile.mkdtemp(prefix="neurosync-nlp-")
+os.chdir(SCRATCH_DIR)  # build_twin writes journal_logs/ into the working directory
+sys.path.insert(0, REPO_DIR)
+
+import generator  # noqa: E402
+import vector_store  # noqa: E402
+from loadtest import load_corpus, synthetic_corpus  # noqa: E402
+
+NT_KEYS = vector_store.NT_KEYS
+MODES = ("textblob", "fast")
+
+
+def run_mode(mode, requests_, seed):
+    generator.NLP_MODE = mode
+    twins = []
+    start = time.perf_counter()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for i, fields in enumerate(requests_):
+            random.seed(seed + i)
+            twin, _, memory_scent_profile = generator.build_twin(dict(fields))
+            twin["memory_scent_notes"] = sorted(memory_scent_profile["scent_notes"])
+            twins.append(twin)
+    return twins, time.perf_counter() - start
+
+
+def compare(baseline, fast):
+    diffs = {k: [abs(b["neurotransmitters"][k] - f["neurotransmitters"][k]) for b, f in zip(baseline, fast)] for k in NT_KEYS}
+    distances = [math.sqrt(sum(diffs[k][i] ** 2 for k in NT_KEYS)) for i in range(len(baseline))]
+    n = len(baseline)
+
+    def agreement(key):
+        return round(sum(b.get(key) == f.get(key) for b, f in zip(baseline, fast)) / n, 4)
+
+    return {
+        "neurotransmitters": {
+            k: {"mean_abs_diff": round(sum(v) / n, 4), "max_abs_diff": round(max(v), 4)} for k, v in diffs.items()
+        },
+        "l2_mean": round(sum(distances) / n, 4),
+        "l2_max": round(max(distances), 4),
+        "identical_vectors": round(sum(d == 0 for d in distances) / n, 4),
+        "goals_sentiment_max_diff": round(max(abs(b["goals_sentiment"] - f["goals_sentiment"]) for b, f in zip(baseline, fast)), 4),
+        "stressors_sentiment_max_diff": round(max(abs(b["stressors_sentiment"] - f["stressors_sentiment"]) for b, f in zip(baseline, fast)), 4),
+        "same_stressor_categories": agreement("stressor_categories"),
+        "same_memory_scent_notes": agreement("memory_scent_notes"),
+        "same_xbox_game": agreement("xbox_game"),
+        "same_switch_time": agreement("switch_time"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure how far NLP_MODE=fast twins drift from the TextBlob pipeline.")
+    parser.add_argument("--size", type=int, default=200, help="Synthetic /generate requests to compare")
+    parser.add_argument("--corpus", help="JSONL corpus in loadtest.py format (only /generate items are used)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="Write the report as JSON")
+    args = parser.parse_args()
+
+    if args.corpus:
+        items = load_corpus(os.path.join(INVOKED_FROM, args.corpus))
+    else:
+        items = synthetic_corpus(args.size, {"generate": 1}, args.seed)
+    requests_ = [item["json"] for item in items if item.get("path") == "/generate"]
+    if not requests_:
+        print("❌ Corpus has no /generate requests")
+        return 1
+
+    vector_store.set_store_dir(os.path.join(SCRATCH_DIR, "vector_store"))
+    generator.infer_gender = lambda name: "neutral"  # keep genderize.io out of both the vectors and the timings
+
+    results = {}
+    for mode in MODES:
+        try:
+            results[mode] = run_mode(mode, requests_, args.seed)
+        except Exception as e:
+            print(f"❌ {mode} mode failed: {str(e).strip().splitlines()[0] if str(e).strip() else e!r}")
+            return 1
+
+    (baseline, baseline_seconds), (fast, fast_seconds) = results["textblob"], results["fast"]
+    report = {
+        "requests": len(requests_),
+        "seed": args.seed,
+        "ms_per_request": {
+            "textblob": round(baseline_seconds / len(requests_) * 1000, 3),
+            "fast": round(fast_seconds / len(requests_) * 1000, 3),
+        },
+        "speedup": round(baseline_seconds / max(fast_seconds, 1e-9), 2),
+        "drift": compare(baseline, fast),
+    }
+
+    drift = report["drift"]
+    print(f"{report['requests']} requests: textblob {report['ms_per_request']['textblob']}ms, "
+          f"fast {report['ms_per_request']['fast']}ms per request ({report['speedup']}x)")
+    for k, stats in drift["neurotransmitters"].items():
+        print(f"  {k:<10} mean |Δ| {stats['mean_abs_diff']:.4f}  max |Δ| {stats['max_abs_diff']:.4f}")
+    print(f"  L2 mean {drift['l2_mean']:.4f}, max {drift['l2_max']:.4f}; identical vectors {drift['identical_vectors']:.1%}")
+    print(f"  same game {drift['same_xbox_game']:.1%}, same stressor categories {drift['same_stressor_categories']:.1%}, "
+          f"same memory scent notes {drift['same_memory_scent_notes']:.1%}")
+    if args.output:
+        with open(os.path.join(INVOKED_FROM, args.output), "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
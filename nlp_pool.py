@@ -0,0 +1,108 @@
+# nlp_pool.py
+"""Worker pool for the CPU-bound NLP and twin-generation stages of /generate.
+
+    NLP_POOL_KIND         "thread" (default) or "process"
+    NLP_POOL_WORKERS      pool size (default: CPU count)
+    NLP_POOL_MAX_PENDING  requests allowed in or waiting for the pool before new ones get 503
+"""
+import asyncio
+import functools
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from profiling import current_session, run_profiled
+
+NLP_POOL_KIND = os.getenv("NLP_POOL_KIND", "thread")
+NLP_POOL_WORKERS = int(os.getenv("NLP_POOL_WORKERS", str(os.cpu_count() or 2)))
+NLP_POOL_MAX_PENDING = int(os.getenv("NLP_POOL_MAX_PENDING", str(NLP_POOL_WORKERS * 8)))
+
+
+class PoolBusy(Exception):
+    pass
+
+
+def warm_up():
+    """Load the reference data and the tagger/sentiment lexicon for NLP_MODE in this worker."""
+    try:
+        import generator
+
+        generator.get_reference()
+
+        text = "Warm up the deadline tagger before real requests arrive."
+        generator.extract_keywords(text)
+        generator.sentiment_polarity(text)
+    except Exception as e:
+        print("⚠️ NLP pool warm-up failed:", str(e).strip().splitlines()[0] if str(e).strip() else e)
+
+
+def _ready(barrier=None):
+    if barrier is not None:
+        # Hold each thread until all exist, otherwise the executor reuses the first idle one
+        barrier.wait(timeout=60)
+    return os.getpid()
+
+
+_pool = None
+_pending = 0
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        if NLP_POOL_KIND == "process":
+            # spawn: forking a process that already runs the event loop and threads is unsafe
+            _pool = ProcessPoolExecutor(
+                max_workers=NLP_POOL_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=warm_up,
+            )
+        elif NLP_POOL_KIND == "thread":
+            _pool = ThreadPoolExecutor(max_workers=NLP_POOL_WORKERS, thread_name_prefix="nlp", initializer=warm_up)
+        else:
+            raise ValueError(f"Unknown NLP_POOL_KIND '{NLP_POOL_KIND}' (expected 'thread' or 'process')")
+    return _pool
+
+
+def start_pool():
+    """Create every worker up front so the warm-up runs before the first request."""
+    pool = get_pool()
+    barrier = threading.Barrier(NLP_POOL_WORKERS) if NLP_POOL_KIND == "thread" else None
+    wait([pool.submit(_ready, barrier) for _ in range(NLP_POOL_WORKERS)])
+    print(f"✅ NLP pool ready: {NLP_POOL_WORKERS} {NLP_POOL_KIND} workers, max {NLP_POOL_MAX_PENDING} pending")
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+async def run_in_pool(fn, *args, **kwargs):
+    """Run fn on the NLP pool; raises PoolBusy instead of queueing beyond NLP_POOL_MAX_PENDING."""
+    global _pending
+    if _pending >= NLP_POOL_MAX_PENDING:
+        raise PoolBusy(f"NLP pool is saturated ({_pending} requests pending)")
+    _pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        session = current_session()
+        if session is None:
+            return await loop.run_in_executor(get_pool(), functools.partial(fn, *args, **kwargs))
+        # Profiled request: the worker profiles the call itself and sends the stats back
+        result, stats, seconds = await loop.run_in_executor(get_pool(), functools.partial(run_profiled, fn, *args, **kwargs))
+        session.add_worker_stats(fn.__name__, stats, seconds)
+        return result
+    finally:
+        _pending -= 1
+
+
+def pool_stats():
+    return {
+        "kind": NLP_POOL_KIND,
+        "workers": NLP_POOL_WORKERS,
+        "pending": _pending,
+        "max_pending": NLP_POOL_MAX_PENDING,
+    }
@@ -0,0 +1,238 @@
+# profiling.py
+"""Opt-in cProfile capture of single requests.
+
+    PROFILE_REQUESTS     "1" lets a client ask for a profile with the `X-Profile: 1` header
+    PROFILE_SAMPLE_RATE  fraction of requests profiled without being asked (default 0)
+    PROFILE_PATHS        comma-separated path prefixes eligible for profiling (default /generate)
+    PROFILE_DIR          where profiles are written (default profiles/)
+    PROFILE_KEEP         newest profiles kept on disk (default 50)
+
+With neither PROFILE_REQUESTS nor PROFILE_SAMPLE_RATE set, main.py registers neither the
+middleware nor the /debug/profiles routes, so ordinary requests run exactly as before.
+
+A profiled request is recorded on the event-loop thread for its whole duration, and the
+work it hands to the NLP pool or the threadpool is profiled inside the worker (thread
+or process) and merged in. Each profile is saved as <id>.prof (load it with pstats or
+snakeviz) next to <id>.json, a per-function summary served by GET /debug/profiles/<id>.
+Only one request is profiled at a time; the loop profile also sees any other coroutine
+that ran on the loop meanwhile.
+"""
+import contextvars
+import cProfile
+import json
+import os
+import pstats
+import random
+import threading
+import time
+import uuid
+from datetime import datetime
+
+PROFILE_HEADER = "x-profile"
+PROFILE_REQUESTS = os.getenv("PROFILE_REQUESTS", "0") == "1"
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_PATHS = tuple(p for p in os.getenv("PROFILE_PATHS", "/generate").split(",") if p)
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+PROFILE_TOP_N = int(os.getenv("PROFILE_TOP_N", "40"))
+
+PROFILING_ENABLED = PROFILE_REQUESTS or PROFILE_SAMPLE_RATE > 0
+
+_session = contextvars.ContextVar("profile_session", default=None)
+_busy = threading.Lock()
+
+
+class _WorkerStats:
+    """Raw stats collected in a worker, in the shape pstats.Stats loads."""
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+class ProfileSession:
+    def __init__(self, request, reason):
+        self.id = f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.method = request.method
+        self.path = request.url.path
+        self.reason = reason
+        self.loop_profile = cProfile.Profile()
+        self.worker_stats = []
+        self.worker_calls = []
+
+    def add_worker_stats(self, label, stats, seconds):
+        self.worker_calls.append({"function": label, "seconds": round(seconds, 6), "profiled": stats is not None})
+        if stats is not None:
+            self.worker_stats.append(_WorkerStats(stats))
+
+    def stats(self):
+        stats = pstats.Stats(self.loop_profile)
+        for worker in self.worker_stats:
+            stats.add(worker)
+        return stats
+
+
+def _function_name(key):
+    filename, line, name = key
+    if filename == "~":
+        return name  # builtins
+    return f"{os.path.basename(filename)}:{line}({name})"
+
+
+def summarize(stats, top_n=PROFILE_TOP_N):
+    rows = [
+        {
+            "function": _function_name(key),
+            "ncalls": nc,
+            "primitive_calls": cc,
+            "tottime": round(tt, 6),
+            "cumtime": round(ct, 6),
+        }
+        for key, (cc, nc, tt, ct, _) in stats.stats.items()
+    ]
+    return {
+        "total_calls": stats.total_calls,
+        "by_cumtime": sorted(rows, key=lambda r: r["cumtime"], reverse=True)[:top_n],
+        "by_tottime": sorted(rows, key=lambda r: r["tottime"], reverse=True)[:top_n],
+    }
+
+
+def profile_path(profile_id, ext):
+    return os.path.join(PROFILE_DIR, f"{profile_id}.{ext}")
+
+
+def save_profile(session, status_code, seconds):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    stats = session.stats()
+    stats.dump_stats(profile_path(session.id, "prof"))
+    report = {
+        "id": session.id,
+        "method": session.method,
+        "path": session.path,
+        "reason": session.reason,
+        "status_code": status_code,
+        "seconds": round(seconds, 6),
+        "created_at": datetime.utcnow().isoformat(),
+        "worker_calls": session.worker_calls,
+        **summarize(stats),
+    }
+    tmp_path = profile_path(session.id, "json.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(report, f, indent=2)
+    os.replace(tmp_path, profile_path(session.id, "json"))
+    _prune()
+    return report
+
+
+def _prune():
+    reports = sorted(f for f in os.listdir(PROFILE_DIR) if f.endswith(".json"))
+    for name in reports[:max(0, len(reports) - PROFILE_KEEP)]:
+        for ext in ("json", "prof"):
+            try:
+                os.remove(profile_path(name[:-len(".json")], ext))
+            except FileNotFoundError:
+                pass
+
+
+def list_profiles():
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    profiles = []
+    for name in sorted(os.listdir(PROFILE_DIR), reverse=True):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(PROFILE_DIR, name), "r") as f:
+                report = json.load(f)
+        except (OSError, ValueError):
+            continue
+        profiles.append({k: report.get(k) for k in ("id", "method", "path", "reason", "status_code", "seconds", "created_at")})
+    return profiles
+
+
+def load_profile(profile_id):
+    """The saved summary for profile_id, or None (ids are checked so they can't escape PROFILE_DIR)."""
+    if os.path.basename(profile_id) != profile_id:
+        return None
+    try:
+        with open(profile_path(profile_id, "json"), "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _wants_profile(request):
+    if not request.url.path.startswith(PROFILE_PATHS):
+        return None
+    if PROFILE_REQUESTS and request.headers.get(PROFILE_HEADER, "").lower() in ("1", "true", "yes"):
+        return "header"
+    if PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE:
+        return "sampled"
+    return None
+
+
+async def profile_middleware(request, call_next):
+    reason = _wants_profile(request)
+    if reason is None or not _busy.acquire(blocking=False):
+        return await call_next(request)
+    try:
+        session = ProfileSession(request, reason)
+        token = _session.set(session)
+        start = time.perf_counter()
+        try:
+            session.loop_profile.enable()
+        except ValueError as e:
+            # Another profiler already owns this interpreter (Python 3.12+ allows only one)
+            print(f"⚠️ Could not profile {session.path}: {e}")
+            _session.reset(token)
+            return await call_next(request)
+        try:
+            response = await call_next(request)
+        finally:
+            session.loop_profile.disable()
+            _session.reset(token)
+        seconds = time.perf_counter() - start
+        try:
+            save_profile(session, response.status_code, seconds)
+            response.headers["X-Profile-Id"] = session.id
+            print(f"✅ Profiled {session.method} {session.path} ({reason}, {seconds:.3f}s): {session.id}")
+        except OSError as e:
+            print(f"❌ Failed to save profile {session.id}: {e}")
+        return response
+    finally:
+        _busy.release()
+
+
+def run_profiled(fn, *args, **kwargs):
+    """Run fn under its own profiler in a worker; returns (result, raw stats or None, seconds)."""
+    start = time.perf_counter()
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+    except ValueError:
+        return fn(*args, **kwargs), None, time.perf_counter() - start
+    try:
+        result = fn(*args, **kwargs)
+    finally:
+        profile.disable()
+    profile.create_stats()
+    return result, profile.stats, time.perf_counter() - start
+
+
+def current_session():
+    return _session.get()
+
+
+def profile_call(fn, *args, **kwargs):
+    """Call fn, profiling it into the current request's profile if there is one.
+
+    For threadpool work (run_in_threadpool copies the request's context into the thread).
+    """
+    session = _session.get()
+    if session is None:
+        return fn(*args, **kwargs)
+    result, stats, seconds = run_profiled(fn, *args, **kwargs)
+    session.add_worker_stats(getattr(fn, "__name__", repr(fn)), stats, seconds)
+    return result
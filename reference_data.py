@@ -0,0 +1,163 @@
+# reference_data.py
+"""Single registry for the reference JSON files (fragrances, regions, games, NT effects).
+
+Every file is parsed once into an immutable ReferenceData snapshot together with the
+tables requests would otherwise rebuild: a scent profile and summed effect vector per
+fragrance, per-region cultural modifiers and the games indexed by scent. Readers call
+get_reference() and keep the snapshot they got for the rest of the request.
+
+Edited files are picked up without a restart: get_reference() re-stats them at most
+every REFERENCE_RELOAD_SECONDS and, if anything changed, builds a new snapshot and
+swaps it in. A file that fails to parse leaves the previous snapshot in place.
+"""
+import difflib
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+REFERENCE_DIR = os.getenv("REFERENCE_DIR", os.path.dirname(os.path.abspath(__file__)))
+REFERENCE_RELOAD_SECONDS = float(os.getenv("REFERENCE_RELOAD_SECONDS", "5"))
+REFERENCE_FILES = {
+    "fragrance_notes": "fragrance_notes.json",
+    "cultural_affinities": "cultural_affinities.json",
+    "game_profiles": "game_profiles.json",
+    "neuro_effects": "neuro_effects.json",
+}
+CULTURAL_WEIGHT = 0.05
+CLOSEST_CACHE_SIZE = 4096
+
+
+class ReferenceData:
+    """Parsed reference files plus the lookup tables derived from them. Treat as read-only."""
+
+    def __init__(self, sources, stamp=None):
+        self.sources = sources
+        self.stamp = stamp
+        self.loaded_at = datetime.utcnow().isoformat()
+
+        self.fragrance_db = sources["fragrance_notes"]
+        self.cultural_affinities = sources["cultural_affinities"]
+        self.game_profiles = sources["game_profiles"]
+        self.scent_map = sources["neuro_effects"]["scent_map"]
+        self.stress_map = sources["neuro_effects"]["stress_map"]
+        self.stress_categories = sources["neuro_effects"]["stress_categories"]
+
+        # Every word generate_twin_vector reacts to; the fast keyword extractor only looks these up
+        self.keyword_lexicon = frozenset(self.stress_map) | frozenset(
+            term for terms in self.stress_categories.values() for term in terms
+        )
+
+        self.scent_profiles = {}
+        self.fragrance_effects = {}
+        for name, notes in self.fragrance_db.items():
+            nt_map = {}
+            effects = {}
+            for note in notes:
+                for nt in self.scent_map.get(note.lower(), {}):
+                    nt_map.setdefault(nt, []).append(note)
+                for nt, value in self.scent_map.get(note, {}).items():
+                    effects[nt] = effects.get(nt, 0) + value
+            self.scent_profiles[name] = {"notes": notes, "neurotransmitter_map": nt_map}
+            self.fragrance_effects[name] = effects
+
+        self.cultural_effects = {
+            region: [(nt, value * CULTURAL_WEIGHT)
+                     for scent in scents for nt, value in self.scent_map.get(scent.lower(), {}).items()]
+            for region, scents in self.cultural_affinities.items()
+        }
+
+        self.games_by_scent = {}
+        for game in self.game_profiles:
+            for scent in game.get("scent_affinity", {}):
+                self.games_by_scent.setdefault(scent, []).append(game)
+
+        self._fragrance_names = list(self.fragrance_db)
+        self._closest = {}
+
+    def closest_fragrance(self, name):
+        """Closest catalog fragrance for an unknown name (difflib), memoized per snapshot."""
+        if name in self._closest:
+            return self._closest[name]
+        matches = difflib.get_close_matches(name, self._fragrance_names, n=1, cutoff=0.5)
+        if len(self._closest) >= CLOSEST_CACHE_SIZE:
+            self._closest.clear()
+        self._closest[name] = matches[0] if matches else None
+        return self._closest[name]
+
+    def summary(self):
+        return {
+            "loaded_at": self.loaded_at,
+            "fragrances": len(self.fragrance_db),
+            "games": len(self.game_profiles),
+            "regions": len(self.cultural_affinities),
+            "scent_notes": len(self.scent_map),
+            "stress_keywords": len(self.keyword_lexicon),
+        }
+
+
+def reference_path(name):
+    return os.path.join(REFERENCE_DIR, REFERENCE_FILES[name])
+
+
+def _file_key(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (path, stat.st_mtime_ns, stat.st_size)
+
+
+def reference_stamp():
+    return tuple(_file_key(reference_path(name)) for name in REFERENCE_FILES)
+
+
+def load_reference(stamp=None):
+    sources = {}
+    for name in REFERENCE_FILES:
+        with open(reference_path(name), "r") as f:
+            sources[name] = json.load(f)
+    return ReferenceData(sources, stamp)
+
+
+_lock = threading.Lock()
+_current = None
+_checked_at = 0.0
+
+
+def reload_reference(force=False):
+    """Rebuild the snapshot if any file changed (or force) and swap it in; raises on bad files."""
+    global _current, _checked_at
+    with _lock:
+        _checked_at = time.monotonic()
+        stamp = reference_stamp()
+        if _current is not None and not force and stamp == _current.stamp:
+            return _current
+        reference = load_reference(stamp)
+        _current = reference
+        print(f"✅ Loaded reference data: {reference.summary()}")
+        return reference
+
+
+def get_reference():
+    """Current snapshot; re-checks the files at most every REFERENCE_RELOAD_SECONDS."""
+    reference = _current
+    if reference is None:
+        return reload_reference()
+    if REFERENCE_RELOAD_SECONDS > 0 and time.monotonic() - _checked_at >= REFERENCE_RELOAD_SECONDS:
+        try:
+            return reload_reference()
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            print(f"⚠️ Reference data reload failed, keeping the previous snapshot: {e}")
+    return reference
+
+
+def set_reference(reference):
+    """Install a snapshot built in code (e.g. a synthetic catalog); replaced once the files change."""
+    global _current, _checked_at
+    with _lock:
+        if reference.stamp is None:
+            reference.stamp = reference_stamp()
+        _current = reference
+        _checked_at = time.monotonic()
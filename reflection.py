@@ -0,0 +1,103 @@
+# reflection.py
+"""Prompt building and the local fallback for daily reflections.
+
+Shared by POST /reflect and the batch job (batch_reflect.py). `data` is a dict with the
+ReflectRequest fields: name, current_emotion, recent_events, goals, neurotransmitters,
+xbox_game, game_mode, duration_minutes, switch_time.
+"""
+import os
+
+import openai
+
+REFLECTION_MODEL = os.getenv("REFLECTION_MODEL", "gpt-3.5-turbo")
+SYSTEM_PROMPT = (
+    "You're a motivational mental wellness coach who interprets emotional state, brain chemistry, "
+    "and gaming focus to offer an uplifting reflection with practical guidance. Keep it kind, clear, and actionable."
+)
+
+
+def analyze_neuro(nt):
+    suggestions = []
+    if nt.get("dopamine", 0.5) < 0.4:
+        suggestions.append("Dopamine is low — try mint or cinnamon, or celebrate small wins.")
+    if nt.get("serotonin", 0.5) < 0.4:
+        suggestions.append("Low serotonin? Sunshine, citrus scents, or journaling may help.")
+    if nt.get("oxytocin", 0.5) < 0.4:
+        suggestions.append("Oxytocin seems low — reconnect with friends or try vanilla or rose scents.")
+    if nt.get("GABA", 0.5) < 0.4:
+        suggestions.append("GABA is low. Try lavender, quiet time, or calming music.")
+    if nt.get("cortisol", 0.5) > 0.7:
+        suggestions.append("Cortisol is high — breathe deeply, take breaks, and avoid multitasking.")
+    return suggestions
+
+
+def local_fallback(data):
+    insights = analyze_neuro(data.get("neurotransmitters") or {})
+    game_reco = f"🎮 Play: {data.get('xbox_game') or 'a focus-friendly game'} ({data.get('game_mode')}), for ~{data.get('duration_minutes')} mins. Switch: {data.get('switch_time')}."
+    tips = "\n".join(f"- {tip}" for tip in insights)
+    return f"""
+🧠 Today’s Reflection for {data['name']}  
+Your brain chemistry suggests:  
+{tips}
+
+{game_reco}  
+Stay mindful and pace your energy today.
+"""
+
+
+def build_prompt(data):
+    nt = data.get("neurotransmitters") or {}
+    insights = analyze_neuro(nt)
+    joined_insights = "\n".join(insights)
+    work_env = nt.get("work_env", "general_consumer")
+    style_score = nt.get("email_style_score", 0)
+    aligned = nt.get("name_email_aligned", False)
+
+    if work_env == "corporate":
+        tone = "Focus on work-life balance and actionable calm-down strategies. Assume the user may be under pressure."
+
+    elif work_env == "academic":
+        tone = "Emphasize structure, routine, and intellectual grounding. Recommend curiosity-fueled recovery strategies."
+
+    else:
+        tone = "Keep the tone empathetic and casual — support emotional regulation and creative rejuvenation."
+
+    if style_score < 0:
+        tone += " Keep it light and encouraging — possibly a younger or expressive user."
+
+    elif aligned:
+        tone += " You can assume the user is self-aware and identity-aligned. Reinforce motivation gently."
+
+    game_reco = f"Today’s game: {data.get('xbox_game')} ({data.get('game_mode')}), play for ~{data.get('duration_minutes')} minutes, then switch: {data.get('switch_time')}."
+    return (
+        f"My name is {data['name']}. I feel {data.get('current_emotion')}. "
+        f"Recent events include: {data.get('recent_events')}. My goals are: {data.get('goals')}. "
+        f"Based on my brain chemistry, here's what's going on: {joined_insights}. "
+        f"{game_reco} Suggest a daily routine, calming scent and a Spotify playlist to help.\n\n"
+        f"🎯 Context: {tone}"
+    )
+
+
+def build_messages(data):
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": build_prompt(data)},
+    ]
+
+
+def journal_from(res):
+    journal = res.choices[0].message.content.strip()
+    if not journal:
+        raise ValueError("GPT returned empty response")
+    return journal
+
+
+def generate_reflection(data):
+    """One blocking completion for data; raises on any failure so callers can fall back."""
+    res = openai.ChatCompletion.create(model=REFLECTION_MODEL, messages=build_messages(data))
+    return journal_from(res)
+
+
+async def agenerate_reflection(data, **kwargs):
+    res = await openai.ChatCompletion.acreate(model=REFLECTION_MODEL, messages=build_messages(data), **kwargs)
+    return journal_from(res)
@@ -0,0 +1,211 @@
+# store_admin.py
+"""Maintenance CLI for the vector store.
+
+    python store_admin.py check                   # compare the FAISS indexes with metadata.json
+    python store_admin.py rebuild                 # rebuild the FAISS indexes from metadata.json
+    python store_admin.py import twins.jsonl      # bulk-load twins, one JSON object per line
+    python store_admin.py compact                 # reclaim space held by deleted (tombstoned) twins
+    python store_admin.py cohorts --k 8           # recluster twins into cohorts now
+
+Commands that write hold vector_store.store_lock for their whole run.
+"""
+import argparse
+import json
+import sys
+import time
+
+from cohorts import COHORT_K, get_centroids, nearest_centroids, run_cohort_job
+from vector_store import (
+    NT_KEYS,
+    STRING_COLUMNS,
+    append_twins,
+    twin_vectors,
+    check_consistency,
+    compact_store,
+    load_index,
+    load_metadata,
+    load_space_indexes,
+    rebuild_index,
+    rebuild_space_indexes,
+    save_index,
+    save_metadata,
+    save_space_indexes,
+    store_lock,
+    StoreLocked,
+)
+
+REQUIRED_FIELDS = ["name", "gender", "life_stage", "age_range", "neurotransmitters"]
+
+
+def cmd_check(args):
+    index = load_index()
+    metadata = load_metadata()
+    problems = check_consistency(index, metadata, space_indexes=load_space_indexes(metadata))
+    for problem in problems[:args.max_problems]:
+        print(f"❌ {problem}")
+    if len(problems) > args.max_problems:
+        print(f"... and {len(problems) - args.max_problems} more")
+    if problems:
+        print(f"Store is inconsistent ({len(problems)} problems). Run `python store_admin.py rebuild` to repair.")
+        return 1
+    print(f"✅ Store is consistent: {index.ntotal} vectors, {len(metadata)} metadata entries")
+    return 0
+
+
+def cmd_rebuild(args):
+    start = time.perf_counter()
+    metadata = load_metadata()
+    index, kept, dropped = rebuild_index(metadata)
+    save_space_indexes(rebuild_space_indexes(kept, load_space_indexes(metadata)))
+    save_index(index)
+    save_metadata(kept)
+    elapsed = time.perf_counter() - start
+    print(f"✅ Rebuilt indexes with {index.ntotal} vectors in {elapsed:.2f}s")
+    if dropped:
+        print(f"⚠️ Dropped {dropped} metadata entries without a full neurotransmitter vector")
+    return 0
+
+
+def cmd_compact(args):
+    start = time.perf_counter()
+    result = compact_store()
+    print(f"✅ Removed {result['removed']} tombstoned twins in {time.perf_counter() - start:.2f}s")
+    return 0
+
+
+def cmd_cohorts(args):
+    report = run_cohort_job(k=args.k)
+    if report is None:
+        print(f"❌ Need at least {args.k} live twins to build {args.k} cohorts")
+        return 1
+    for cohort in report["cohorts"]:
+        print(f"  cohort {cohort['cohort']}: {cohort['size']} twins, top game {cohort['top_xbox_game']}, "
+              f"top playlist {cohort['top_spotify_playlist']}")
+    print(f"✅ Clustered {report['trained_on']} twins into {report['k']} cohorts in {report['train_seconds']:.2f}s "
+          f"({report['relabelled']} twins relabelled)")
+    return 0
+
+
+def validate_twin(twin):
+    if not isinstance(twin, dict):
+        return "not a JSON object"
+    missing = [k for k in REQUIRED_FIELDS if k not in twin]
+    if missing:
+        return f"missing {', '.join(missing)}"
+    # The column file and TwinTable encode these as strings; required ones can't be null either
+    not_strings = [k for k in STRING_COLUMNS
+                   if not isinstance(twin.get(k), str) and (k in REQUIRED_FIELDS or twin.get(k) is not None)]
+    if not_strings:
+        return f"{', '.join(not_strings)}: expected a string"
+    nt = twin["neurotransmitters"] or {}
+    if not isinstance(nt, dict):
+        return "neurotransmitters must be an object"
+    missing_nt = [k for k in NT_KEYS if not isinstance(nt.get(k), (int, float))]
+    if missing_nt:
+        return f"missing neurotransmitters {', '.join(missing_nt)}"
+    return None
+
+
+def iter_batches(path, batch_size, errors):
+    batch = []
+    with open(path, "r") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                twin = json.loads(line)
+            except json.JSONDecodeError as e:
+                errors.append(f"line {line_no}: invalid JSON ({e})")
+                continue
+            problem = validate_twin(twin)
+            if problem:
+                errors.append(f"line {line_no}: {problem}")
+                continue
+            batch.append(twin)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+def cmd_import(args):
+    index = load_index()
+    metadata = load_metadata()
+    space_indexes = load_space_indexes(metadata)
+    problems = check_consistency(index, metadata, space_indexes=space_indexes)
+    if problems and not args.force:
+        print(f"❌ Store is inconsistent ({len(problems)} problems); run `check`/`rebuild` first or pass --force")
+        return 1
+
+    errors = []
+    imported = 0
+    centroids = get_centroids()
+    start = time.perf_counter()
+    for batch in iter_batches(args.path, args.batch_size, errors):
+        vectors = twin_vectors(batch)
+        if centroids is not None:
+            for twin, cohort in zip(batch, nearest_centroids(centroids, vectors).tolist()):
+                twin["cohort"] = cohort
+        append_twins(index, metadata, batch, vectors, space_indexes)
+        imported += len(batch)
+        elapsed = time.perf_counter() - start
+        print(f"... {imported} twins imported ({imported / max(elapsed, 1e-9):.0f}/s)", file=sys.stderr)
+
+    if imported:
+        save_space_indexes(space_indexes)
+        save_index(index)
+        save_metadata(metadata)
+
+    elapsed = time.perf_counter() - start
+    for error in errors[:args.max_problems]:
+        print(f"⚠️ Skipped {error}")
+    print(f"✅ Imported {imported} twins in {elapsed:.2f}s, skipped {len(errors)} lines; store now holds {index.ntotal} vectors")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check, rebuild and bulk-load the twin vector store.")
+    parser.add_argument("--max-problems", type=int, default=20, help="Maximum problems/skipped lines to print")
+    parser.add_argument("--no-wait", action="store_true",
+                        help="Exit instead of waiting when another process (e.g. the server) holds the store lock")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("check", help="Check that the FAISS index and metadata agree").set_defaults(func=cmd_check, writes=False)
+    sub.add_parser("rebuild", help="Rebuild the FAISS index from metadata.json").set_defaults(func=cmd_rebuild, writes=True)
+    sub.add_parser("compact", help="Remove tombstoned twins from the index and metadata").set_defaults(func=cmd_compact, writes=True)
+
+    cohorts_parser = sub.add_parser("cohorts", help="Recluster twins into cohorts and relabel them")
+    cohorts_parser.add_argument("--k", type=int, default=COHORT_K)
+    cohorts_parser.set_defaults(func=cmd_cohorts, writes=True)
+
+    import_parser = sub.add_parser("import", help="Bulk-load twins from a JSONL file")
+    import_parser.add_argument("path")
+    import_parser.add_argument("--batch-size", type=int, default=5000)
+    import_parser.add_argument("--force", action="store_true", help="Import even if the store is inconsistent")
+    import_parser.set_defaults(func=cmd_import, writes=True)
+
+    args = parser.parse_args(argv)
+    if not args.writes:
+        return args.func(args)
+    return run_locked(args)
+
+
+def run_locked(args):
+    """Run a command that rewrites store files under the store lock, so a live server's writes
+    wait for it instead of being overwritten (and it waits for theirs)."""
+    try:
+        with store_lock(blocking=False):
+            return args.func(args)
+    except StoreLocked as e:
+        if args.no_wait:
+            print(f"❌ {e}; not running `{args.command}` (drop --no-wait to wait for it)")
+            return 1
+        print(f"⏳ {e}; waiting for it to finish...")
+    with store_lock():
+        return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
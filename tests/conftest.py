@@ -0,0 +1,52 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import vector_store  # noqa: E402
+
+
+@pytest.fixture
+def store(tmp_path):
+    """A fresh, empty vector store in a scratch directory."""
+    previous = vector_store.STORE_DIR
+    store_dir = str(tmp_path / "vector_store")
+    vector_store.set_store_dir(store_dir)
+    yield store_dir
+    vector_store.set_store_dir(previous)
+
+
+def make_twin(name, timestamp, nt=None, **fields):
+    twin = {
+        "name": name,
+        "gender": "female",
+        "life_stage": "adult",
+        "age_range": "25-40",
+        "timestamp": timestamp,
+        "neurotransmitters": nt or {"dopamine": 0.5, "serotonin": 0.5, "oxytocin": 0.5, "GABA": 0.5, "cortisol": 0.5},
+    }
+    twin.update(fields)
+    return twin
+
+
+# A valid /generate body
+TWIN_REQUEST = {
+    "name": "Ana Lima", "email": "ana@example.com", "job_title": "Engineer", "company": "Acme",
+    "career_goals": "ship things", "productivity_limiters": "deadline pressure",
+    "scent_note": "mint", "childhood_scent": "cinnamon", "assigned_sex": "female",
+}
+
+
+@pytest.fixture(scope="session")
+def main_app():
+    """The FastAPI app module, imported once; startup events (pool, cohort jobs) are not run."""
+    nltk_data = os.path.join(os.path.dirname(vector_store.__file__), "nltk_data")
+    created = not os.path.exists(nltk_data)
+    import main
+
+    yield main
+    # main creates nltk_data next to itself on import; don't leave an empty one behind
+    if created and os.path.isdir(nltk_data) and not os.listdir(nltk_data):
+        os.rmdir(nltk_data)
@@ -0,0 +1,124 @@
+import asyncio
+
+import pytest
+from conftest import TWIN_REQUEST
+from fastapi.testclient import TestClient
+
+from admission import AdmissionController, Overloaded
+
+REFLECT_REQUEST = {
+    "name": "Ana", "current_emotion": "tired", "recent_events": "a long week", "goals": "rest",
+    "neurotransmitters": {"dopamine": 0.3, "serotonin": 0.4, "oxytocin": 0.5, "GABA": 0.3, "cortisol": 0.8},
+    "xbox_game": "Halo Infinite", "game_mode": "Solo", "duration_minutes": 20, "switch_time": "After 20 mins",
+}
+
+
+def controller(limit=1, max_limit=1, target=1.0, max_wait=1.0):
+    return AdmissionController("test", limit, max_limit, target, max_wait)
+
+
+def test_sheds_when_the_expected_wait_misses_the_deadline():
+    c = controller(target=10.0, max_wait=1.0)
+
+    async def scenario():
+        await c.acquire()
+        with pytest.raises(Overloaded) as e:
+            await c.acquire()  # one slot, ~10s per request: no chance within 1s
+        return e.value
+
+    error = asyncio.run(scenario())
+    assert c.shed == {"deadline": 1, "wait_timeout": 0}
+    assert error.retry_after == 10
+    assert (c.in_flight, c.queued) == (1, 0)
+
+
+def test_sheds_when_the_wait_runs_out():
+    c = controller(target=0.01, max_wait=0.05)
+
+    async def scenario():
+        await c.acquire()
+        with pytest.raises(Overloaded):
+            await c.acquire()  # looks admissible, but the slot is never released
+
+    asyncio.run(scenario())
+    assert c.shed == {"deadline": 0, "wait_timeout": 1}
+    assert (c.in_flight, c.queued) == (1, 0)
+
+
+def test_cancelled_waiters_give_their_slot_back():
+    c = controller(target=0.01, max_wait=5.0)
+
+    async def scenario():
+        await c.acquire()
+        gone = asyncio.create_task(c.acquire())
+        handed_over = asyncio.create_task(c.acquire())
+        nextone = asyncio.create_task(c.acquire())
+        await asyncio.sleep(0)
+        assert c.queued == 3
+
+        gone.cancel()  # cancelled while still waiting
+        await asyncio.sleep(0)
+        assert (c.in_flight, c.queued) == (1, 2)
+
+        c.release(0.001)  # hands the slot to handed_over, which is cancelled before it runs
+        handed_over.cancel()
+        await nextone  # so the slot moves on instead of leaking
+        assert (c.in_flight, c.queued) == (1, 0)
+        c.release(0.001)
+        assert c.in_flight == 0
+
+    asyncio.run(scenario())
+    assert c.shed == {"deadline": 0, "wait_timeout": 0}
+
+
+def test_limit_rises_additively_and_falls_multiplicatively():
+    c = controller(limit=4, max_limit=10, target=1.0)
+
+    async def scenario():
+        for _ in range(4):
+            await c.acquire()
+
+    asyncio.run(scenario())
+    c.release(0.1)  # fast, with the limit in use: +1/limit
+    assert c.limit == pytest.approx(4.25)
+    c.release(0.1)  # fast, but only 2 of 4 slots busy: no growth
+    assert c.limit == pytest.approx(4.25)
+    c.release(2.0)  # over target: -10%
+    assert c.limit == pytest.approx(4.25 * 0.9)
+    c.release(2.0)  # a second slow completion within the target interval doesn't cut again
+    assert c.limit == pytest.approx(4.25 * 0.9)
+    assert c.in_flight == 0
+
+
+def busy(main_app, monkeypatch, name, target):
+    c = controller(target=target, max_wait=0.5)
+    asyncio.run(c.acquire())  # the only slot is taken
+    monkeypatch.setattr(main_app, name, c)
+    return c
+
+
+def test_generate_answers_503_with_retry_after_when_overloaded(main_app, store, monkeypatch):
+    c = busy(main_app, monkeypatch, "generate_admission", target=3.0)
+
+    async def no_twin(data):
+        raise AssertionError("shed requests must not reach create_twin")
+
+    monkeypatch.setattr(main_app, "create_twin", no_twin)
+    response = TestClient(main_app.app).post("/generate", json=TWIN_REQUEST)
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "3"
+    assert response.json()["status"] == "error"
+    assert c.shed["deadline"] == 1
+
+
+def test_reflect_serves_the_local_fallback_when_overloaded(main_app, monkeypatch):
+    c = busy(main_app, monkeypatch, "reflect_admission", target=10.0)
+
+    async def no_gpt(payload, request_timeout=None):
+        raise AssertionError("shed requests must not call the LLM")
+
+    monkeypatch.setattr(main_app, "agenerate_reflection", no_gpt)
+    response = TestClient(main_app.app).post("/reflect", json=REFLECT_REQUEST)
+    assert response.status_code == 200
+    assert response.json() == {"journal_entry": main_app.local_fallback(REFLECT_REQUEST)}
+    assert c.shed["deadline"] == 1
@@ -0,0 +1,52 @@
+import multiprocessing
+
+import pytest
+from conftest import make_twin
+
+import vector_store
+
+
+def hold_lock(store_dir, locked, release):
+    vector_store.set_store_dir(store_dir)
+    with vector_store.store_lock():
+        locked.set()
+        release.wait(10)
+
+
+def test_deletes_hide_twins_and_compaction_keeps_ids(store):
+    vector_store.add_twins([make_twin(f"user{i}", f"2026-01-01T00:00:0{i}") for i in range(5)])
+    vector_store.delete_vector_ids([1, 3])
+    assert [m["vector_id"] for m in vector_store.load_live_metadata()] == [0, 2, 4]
+
+    result = vector_store.compact_store()
+    assert result == {"removed": 2, "remaining": 3}
+    assert vector_store.load_tombstones() == frozenset()
+    assert [m["vector_id"] for m in vector_store.load_metadata()] == [0, 2, 4]
+
+    # ids are never reused, even for the removed maximum
+    vector_store.delete_vector_ids([4])
+    vector_store.compact_store()
+    assert vector_store.add_twin(make_twin("new", "2026-01-02T00:00:00"))["vector_id"] == 5
+    metadata = vector_store.load_metadata()
+    assert vector_store.check_consistency(vector_store.load_index(), metadata,
+                                          space_indexes=vector_store.load_space_indexes(metadata)) == []
+
+
+def test_store_lock_excludes_other_processes(store):
+    ctx = multiprocessing.get_context("fork")
+    locked, release = ctx.Event(), ctx.Event()
+    holder = ctx.Process(target=hold_lock, args=(store, locked, release))
+    holder.start()
+    try:
+        assert locked.wait(10)
+        with pytest.raises(vector_store.StoreLocked):
+            vector_store.compact_store(wait=False)
+        with pytest.raises(vector_store.StoreLocked):
+            with vector_store.store_lock(blocking=False):
+                pass
+    finally:
+        release.set()
+        holder.join(10)
+    with vector_store.store_lock(blocking=False):
+        with vector_store.store_lock(blocking=False):  # reentrant within the process
+            pass
@@ -0,0 +1,53 @@
+import pytest
+from conftest import make_twin
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+import http_cache
+import vector_store
+
+
+@pytest.fixture
+def client(store, monkeypatch):
+    # Versions restart at 1 in every scratch store, so cached bodies must not carry over
+    monkeypatch.setattr(http_cache, "response_cache", http_cache.ResponseCache())
+    app = FastAPI()
+
+    @app.get("/twins")
+    def twins(request: Request):
+        return http_cache.cached_json(request, lambda: {"count": len(vector_store.load_live_metadata())})
+
+    return TestClient(app)
+
+
+def test_etag_304_until_the_version_changes(client):
+    vector_store.add_twin(make_twin("ana", "2026-01-01T00:00:00"))
+    first = client.get("/twins")
+    assert first.status_code == 200 and first.json() == {"count": 1}
+    etag = first.headers["etag"]
+
+    assert client.get("/twins", headers={"If-None-Match": etag}).status_code == 304
+
+    vector_store.add_twin(make_twin("bob", "2026-01-02T00:00:00"))
+    changed = client.get("/twins", headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.json() == {"count": 2}
+    assert changed.headers["etag"] != etag
+
+    etag = changed.headers["etag"]
+    vector_store.delete_vector_ids([0])
+    deleted = client.get("/twins", headers={"If-None-Match": etag})
+    assert deleted.status_code == 200 and deleted.json() == {"count": 1}
+
+
+def test_bare_version_bump_invalidates(client):
+    etag = client.get("/twins").headers["etag"]
+    vector_store.bump_version()
+    response = client.get("/twins", headers={"If-None-Match": etag})
+    assert response.status_code == 200 and response.headers["etag"] != etag
+
+
+def test_query_is_part_of_the_etag(client):
+    a = client.get("/twins?gender=female&limit=5").headers["etag"]
+    b = client.get("/twins?limit=5&gender=female").headers["etag"]
+    c = client.get("/twins?gender=male").headers["etag"]
+    assert a == b != c
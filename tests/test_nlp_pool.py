@@ -0,0 +1,47 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from conftest import TWIN_REQUEST
+from fastapi.testclient import TestClient
+
+import nlp_pool
+
+
+@pytest.fixture
+def small_pool(monkeypatch):
+    pool = ThreadPoolExecutor(max_workers=2)
+    monkeypatch.setattr(nlp_pool, "_pool", pool)
+    monkeypatch.setattr(nlp_pool, "NLP_POOL_MAX_PENDING", 3)
+    yield pool
+    pool.shutdown(wait=True)
+
+
+def test_calls_beyond_max_pending_are_rejected(small_pool):
+    release = threading.Event()
+
+    async def scenario():
+        # Two calls running and one waiting for a worker fill the pool's budget
+        held = [asyncio.create_task(nlp_pool.run_in_pool(release.wait, 5)) for _ in range(3)]
+        await asyncio.sleep(0)
+        assert nlp_pool.pool_stats()["pending"] == 3
+        with pytest.raises(nlp_pool.PoolBusy):
+            await nlp_pool.run_in_pool(sum, [1, 2])
+        release.set()
+        assert await asyncio.gather(*held) == [True] * 3
+        assert nlp_pool.pool_stats()["pending"] == 0
+        return await nlp_pool.run_in_pool(sum, [1, 2])
+
+    assert asyncio.run(scenario()) == 3
+
+
+def test_generate_answers_503_when_the_pool_is_busy(main_app, store, monkeypatch):
+    async def saturated(fn, *args, **kwargs):
+        raise nlp_pool.PoolBusy("NLP pool is saturated (3 requests pending)")
+
+    monkeypatch.setattr(main_app, "run_in_pool", saturated)
+    response = TestClient(main_app.app).post("/generate", json=TWIN_REQUEST)
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+    assert response.json() == {"status": "error", "detail": "NLP pool is saturated (3 requests pending)"}
@@ -0,0 +1,79 @@
+import os
+
+import numpy as np
+import pytest
+from conftest import make_twin
+
+import vector_store
+from brain_regions import compute_brain_regions, compute_subvectors
+
+
+def nt(i):
+    rng = np.random.default_rng(i)
+    return {k: round(float(v), 2) for k, v in zip(vector_store.NT_KEYS, rng.random(5))}
+
+
+def consistency():
+    metadata = vector_store.load_metadata()
+    return vector_store.check_consistency(vector_store.load_index(), metadata,
+                                          space_indexes=vector_store.load_space_indexes(metadata))
+
+
+def test_rebuild_space_indexes_repairs_and_keeps_stored_vectors(store):
+    # A twin written with its own region values (as /generate does) keeps them through a rebuild
+    regions = {"amygdala": 0.9, "prefrontal_cortex": 0.1, "hippocampus": 0.2, "hypothalamus": 0.3}
+    vector_store.add_twins([make_twin(f"user{i}", f"2026-01-01T00:00:0{i}", nt(i)) for i in range(8)]
+                           + [make_twin("own", "2026-01-02T00:00:00", nt(8), brain_regions=regions)])
+    assert consistency() == []
+
+    indexes = vector_store.load_space_indexes()
+    indexes["subvectors"].remove_ids(np.array([2], dtype='int64'))
+    indexes["brain_regions"].add_with_ids(np.zeros((1, 4), dtype='float32'), np.array([99], dtype='int64'))
+    vector_store.save_space_indexes(indexes)
+    problems = consistency()
+    assert any("missing from the subvectors index" in p for p in problems)
+    assert any("brain_regions index holds 1 ids" in p for p in problems)
+
+    metadata = vector_store.load_metadata()
+    index, kept, _ = vector_store.rebuild_index(metadata)
+    rebuilt = vector_store.rebuild_space_indexes(kept, vector_store.load_space_indexes(metadata))
+    assert vector_store.check_consistency(index, kept, space_indexes=rebuilt) == []
+
+    stored = vector_store.stored_space_vector(rebuilt["brain_regions"], 8)
+    assert stored.tolist() == pytest.approx(vector_store.space_vector("brain_regions", regions))
+    derived = vector_store.stored_space_vector(rebuilt["subvectors"], 2)
+    assert derived.tolist() == pytest.approx(vector_store.space_vector("subvectors", compute_subvectors(nt(2))))
+
+
+def test_missing_space_indexes_are_backfilled(store):
+    vector_store.add_twins([make_twin(f"user{i}", f"2026-01-01T00:00:0{i}", nt(i)) for i in range(5)])
+    for space in vector_store.EXTRA_SPACES:
+        os.remove(vector_store.space_index_path(space))
+    assert sorted(vector_store.ensure_space_indexes()) == sorted(vector_store.EXTRA_SPACES)
+    assert vector_store.ensure_space_indexes() == []
+    assert consistency() == []
+
+
+@pytest.mark.parametrize("space, derive", [("neurotransmitters", lambda n: n),
+                                           ("brain_regions", compute_brain_regions),
+                                           ("subvectors", compute_subvectors)])
+def test_search_matches_brute_force(store, space, derive):
+    vector_store.add_twins([make_twin(f"user{i}", f"2026-01-01T00:00:{i:02d}", nt(i)) for i in range(50)])
+    vector_store.delete_vector_ids([0, 1])
+    query = derive(nt(100))
+    metadata = vector_store.load_live_metadata()
+    vectors = vector_store.twin_space_vectors(metadata, space)
+    distances = ((vectors - np.array(vector_store.space_vector(space, query), dtype='float32')) ** 2).sum(axis=1)
+    expected = sorted(distances)[:5]
+    found = vector_store.search_similar_twins(query, top_k=5, space=space)
+    assert [r["distance"] for r in found] == pytest.approx(expected, abs=1e-5)
+    assert not {0, 1} & {r["vector_id"] for r in found}
+
+
+def test_space_vector_rejects_bad_input():
+    with pytest.raises(ValueError):
+        vector_store.space_vector("bogus", {})
+    with pytest.raises(ValueError):
+        vector_store.space_vector("brain_regions", {"amygdala": 1})
+    with pytest.raises(ValueError):
+        vector_store.space_vector("subvectors", [0.5] * 4)
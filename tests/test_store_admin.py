@@ -0,0 +1,62 @@
+import json
+
+import numpy as np
+from conftest import make_twin
+
+import store_admin
+import vector_store
+
+
+def twins(n):
+    rng = np.random.default_rng(0)
+    return [make_twin(f"user{i}", f"2026-01-01T00:00:{i % 60:02d}",
+                      {k: round(float(v), 2) for k, v in zip(vector_store.NT_KEYS, rng.random(5))})
+            for i in range(n)]
+
+
+def test_fresh_store_is_consistent(store):
+    vector_store.add_twins(twins(20))
+    assert vector_store.check_consistency(vector_store.load_index(), vector_store.load_metadata()) == []
+
+
+def test_rebuild_index_repairs_a_drifted_store(store):
+    vector_store.add_twins(twins(20))
+    index = vector_store.load_index()
+    index.remove_ids(np.array([3, 7], dtype='int64'))
+    vector_store.save_index(index)
+    metadata = vector_store.load_metadata()
+    metadata[5]["neurotransmitters"]["dopamine"] = 0.99
+    del metadata[8]["neurotransmitters"]["cortisol"]
+    vector_store.save_metadata(metadata)
+
+    problems = vector_store.check_consistency(vector_store.load_index(), vector_store.load_metadata())
+    assert problems
+
+    index, kept, dropped = vector_store.rebuild_index(vector_store.load_metadata())
+    assert dropped == 1 and len(kept) == 19
+    assert vector_store.check_consistency(index, kept) == []
+    vector_store.save_index(index)
+    vector_store.save_metadata(kept)
+    assert vector_store.check_consistency(vector_store.load_index(), vector_store.load_metadata()) == []
+
+
+def test_cli_import_rebuild_check(store, tmp_path, capsys):
+    path = tmp_path / "twins.jsonl"
+    lines = [json.dumps(t) for t in twins(10)] + ["not json", json.dumps({"name": "x"})]
+    path.write_text("\n".join(lines) + "\n")
+
+    assert store_admin.main(["import", str(path)]) == 0
+    assert len(vector_store.load_metadata()) == 10
+    assert store_admin.main(["rebuild"]) == 0
+    assert store_admin.main(["check"]) == 0
+    assert "Skipped" in capsys.readouterr().out
+
+
+def test_validate_twin_rejects_non_string_fields():
+    twin = make_twin("ana", "2026-01-01T00:00:00")
+    assert store_admin.validate_twin(twin) is None
+    assert store_admin.validate_twin({**twin, "user_id": None}) is None  # optional ones may be null
+    assert store_admin.validate_twin({**twin, "name": 123}) == "name: expected a string"
+    assert store_admin.validate_twin({**twin, "gender": None, "user_id": 7}) == "user_id, gender: expected a string"
+    assert store_admin.validate_twin({**twin, "timestamp": ["2026"]}) == "timestamp: expected a string"
+    assert store_admin.validate_twin({**twin, "neurotransmitters": [0.5] * 5}) == "neurotransmitters must be an object"
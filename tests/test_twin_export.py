@@ -0,0 +1,70 @@
+import json
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from conftest import make_twin
+
+import twin_export
+import vector_store
+
+
+@pytest.fixture
+def export_store(store):
+    vector_store.add_twins([
+        make_twin("ana", "2026-01-01T00:00:00", {"dopamine": 0.123456789, "serotonin": 1, "oxytocin": 0.5,
+                                                 "GABA": 0.5, "cortisol": 0.5, "hippocampus_memory_boost": 0.1}),
+        make_twin("bob", "2026-01-02T00:00:00", xbox_game="Halo Infinite", duration_minutes=45, cohort=2),
+        make_twin("cy", "2026-01-03T00:00:00", game_mode="co-op", spotify_playlist="Focus"),
+        make_twin("dee", "2026-01-04T00:00:00", duration_minutes="45", cohort=True),  # wrong types: kept in extra
+    ])
+    metadata = vector_store.load_metadata()
+    metadata[2]["tags"] = ["calm", "focus"]  # a field the typed columns know nothing about
+    vector_store.save_metadata(metadata)
+    return store
+
+
+def ndjson_entries():
+    text = b"".join(twin_export.ndjson_chunks(chunk_size=2)).decode("utf-8")
+    return [json.loads(line) for line in text.splitlines()]
+
+
+def read_columnar(path, fmt):
+    if fmt == "parquet":
+        return pq.read_table(path)
+    with pa.memory_map(str(path)) as source:
+        return pa.ipc.open_file(source).read_all()
+
+
+def rebuild(row):
+    """An entry put back together from its typed columns and the "extra" JSON object."""
+    extra = json.loads(row.pop(twin_export.EXTRA_COLUMN) or "{}")
+    entry = {k: v for k, v in row.items() if v is not None and k not in vector_store.NT_KEYS}
+    nt = {k: row[k] for k in vector_store.NT_KEYS if row[k] is not None}
+    nt.update(extra.pop("neurotransmitters", None) or {})
+    entry["neurotransmitters"] = nt
+    entry.update(extra)
+    return entry
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "arrow"])
+def test_columnar_export_agrees_with_ndjson(export_store, tmp_path, fmt):
+    path = tmp_path / f"twins.{fmt}"
+    assert twin_export.write_columnar(str(path), fmt, chunk_size=2) == 4
+    table = read_columnar(path, fmt)
+    expected = ndjson_entries()
+
+    # Shared columns hold the NDJSON values exactly: no float32 rounding of neurotransmitters
+    for col in ["vector_id"] + vector_store.STRING_COLUMNS:
+        assert table.column(col).to_pylist() == [e.get(col) for e in expected]
+    for nt in vector_store.NT_KEYS:
+        assert table.column(nt).type == pa.float64()
+        assert table.column(nt).to_pylist() == [e["neurotransmitters"][nt] for e in expected]
+    assert table.column("cohort").type == table.column("duration_minutes").type == pa.int64()
+    assert table.column("cohort").to_pylist() == [None, 2, None, None]
+    assert table.column("duration_minutes").to_pylist() == [None, 45, None, None]
+    assert table.column("xbox_game").to_pylist() == [None, "Halo Infinite", None, None]
+    assert table.column("spotify_playlist").to_pylist() == [None, None, "Focus", None]
+
+    # Nothing is dropped: the remaining fields come back through the extra column
+    assert [rebuild(row) for row in table.to_pylist()] == expected
@@ -0,0 +1,107 @@
+from conftest import make_twin
+
+import twin_history
+import vector_store
+from mmap_store import live_vector_ids
+
+
+def history_ids(user_id):
+    return [e["vector_id"] for e in twin_history.get_history_index().range(user_id)]
+
+
+def record(twin):
+    entries, before, after = vector_store.write_twins([twin])
+    twin_history.record_twin(entries[0], before, after)
+    return entries[0]
+
+
+def test_range_and_latest_are_time_ordered(store):
+    vector_store.add_twins([
+        make_twin("ana", "2026-01-03T00:00:00"),
+        make_twin("ana", "2026-01-01T00:00:00"),
+        make_twin("bob", "2026-01-02T00:00:00"),
+        make_twin("ana", "2026-01-02T00:00:00.500000"),
+    ])
+    ana = vector_store.user_id_for("ana")
+    index = twin_history.get_history_index()
+    assert history_ids(ana) == [1, 3, 0]
+    assert [e["vector_id"] for e in index.range(ana, "2026-01-02", "2026-01-02T23:59:59")] == [3]
+    assert index.latest(ana)["vector_id"] == 0
+    assert index.latest("nobody") is None
+
+
+def test_recorded_twins_merge_in_order(store):
+    vector_store.add_twins([make_twin("ana", "2026-01-01T00:00:00"), make_twin("ana", "2026-01-03T00:00:00")])
+    ana = vector_store.user_id_for("ana")
+    index = twin_history.get_history_index()
+    record(make_twin("ana", "2026-01-02T00:00:00"))
+    assert twin_history.get_history_index() is index  # folded in, not rebuilt
+    assert history_ids(ana) == [0, 2, 1]
+    assert index.latest(ana)["vector_id"] == 1
+
+
+def test_deleted_twins_stay_gone_after_compaction_and_new_writes(store):
+    vector_store.add_twins([
+        make_twin("ana", "2026-01-01T00:00:00"),
+        make_twin("ana", "2026-01-02T00:00:00"),
+        make_twin("bob", "2026-01-03T00:00:00"),
+    ])
+    ana = vector_store.user_id_for("ana")
+    assert history_ids(ana) == [0, 1]
+
+    vector_store.delete_vector_ids([0, 1])
+    assert history_ids(ana) == []
+
+    # Compaction truncates tombstones.log; the cached index must not outlive that rewrite
+    vector_store.compact_store()
+    record(make_twin("bob", "2026-01-04T00:00:00"))
+    assert history_ids(ana) == []
+    assert twin_history.get_history_index().latest(ana) is None
+
+
+def test_record_after_another_writer_rebuilds(store):
+    vector_store.add_twins([make_twin("ana", "2026-01-01T00:00:00")])
+    ana = vector_store.user_id_for("ana")
+    assert history_ids(ana) == [0]
+
+    vector_store.add_twins([make_twin("ana", "2026-01-02T00:00:00")])  # e.g. another worker
+    record(make_twin("ana", "2026-01-03T00:00:00"))
+    assert history_ids(ana) == [0, 1, 2]
+
+
+def test_live_vector_ids_reads_the_store(store):
+    vector_store.add_twins([make_twin("ana", "2026-01-01T00:00:00"), make_twin("ana", "2026-01-02T00:00:00"),
+                            make_twin("bob", "2026-01-03T00:00:00")])
+    ana = vector_store.user_id_for("ana")
+    assert live_vector_ids({"user_id": ana}) == [0, 1]
+    vector_store.delete_vector_ids([1])
+    assert live_vector_ids({"user_id": ana}) == [0]
+    assert live_vector_ids({"vector_id": 1}) == []
+
+
+def test_bisected_ranges_match_a_sorted_scan(store):
+    timestamps = ["2026-01-02T10:00:00", "2026-01-01", "2026-01-02T10:00:00Z", "2026-01-02T09:00:00.500000",
+                  "2026-01-03T00:00:00", "2026-01-02T10:00:00", "not a date", "2026-01-02"]
+    vector_store.add_twins([make_twin(f"user{i % 2}", ts) for i, ts in enumerate(timestamps)])
+    index = twin_history.get_history_index()
+    record(make_twin("user0", "2026-01-02T09:30:00"))
+    record(make_twin("user1", "2026-01-01T12:00:00"))
+    vector_store.delete_vector_ids([2])
+    metadata = vector_store.load_live_metadata()
+
+    bounds = [None, "2026-01-01", "2026-01-02", "2026-01-02T10:00:00", "2026-01-02T10:00:00Z", "2027"]
+    for user in ("user0", "user1"):
+        user_id = vector_store.user_id_for(user)
+        for start in bounds:
+            for end in bounds:
+                expected = sorted(
+                    (m for m in metadata if m["user_id"] == user_id
+                     and (not start or m["timestamp"] >= start) and (not end or m["timestamp"] <= end)),
+                    key=lambda m: (m["timestamp"], m["vector_id"]))
+                assert index.range(user_id, start, end) == expected
+        assert index.latest(user_id) == expected_latest(metadata, user_id)
+
+
+def expected_latest(metadata, user_id):
+    entries = sorted((m for m in metadata if m["user_id"] == user_id), key=lambda m: (m["timestamp"], m["vector_id"]))
+    return entries[-1] if entries else None
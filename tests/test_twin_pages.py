@@ -0,0 +1,81 @@
+import os
+
+import pytest
+from conftest import make_twin
+from fastapi.testclient import TestClient
+
+import http_cache
+import vector_store
+from twin_pages import InvalidCursor, page_twins
+
+
+@pytest.fixture(params=["columns", "metadata"])
+def paged_store(request, store, monkeypatch):
+    """A store paged through the mmap column file, or through the metadata.json fallback."""
+    if request.param == "metadata":
+        monkeypatch.setattr(vector_store, "save_columns", lambda metadata: None)
+    # Three twins share a timestamp, so vector_id has to break ties
+    timestamps = [f"2026-01-01T00:00:{i:02d}" for i in range(20)] + ["2026-01-01T00:00:10"] * 3
+    vector_store.add_twins([make_twin(f"user{i}", ts) for i, ts in enumerate(timestamps)])
+    if request.param == "metadata" and os.path.exists(vector_store.COLUMNS_PATH):
+        os.remove(vector_store.COLUMNS_PATH)
+    return store
+
+
+def key(entry):
+    return (entry["timestamp"], entry["vector_id"])
+
+
+def read_all(order, page_size, between_pages=None):
+    seen, cursor, pages = [], None, 0
+    while True:
+        entries, cursor, _ = page_twins(page_size=page_size, cursor=cursor, order=order)
+        seen.extend(entries)
+        pages += 1
+        if cursor is None:
+            return seen
+        if between_pages:
+            between_pages(pages)
+
+
+def test_pages_cover_the_store_once_in_order(paged_store):
+    for order in ("asc", "desc"):
+        seen = read_all(order, 4)
+        expected = sorted(vector_store.load_metadata(), key=key, reverse=order == "desc")
+        assert [e["vector_id"] for e in seen] == [e["vector_id"] for e in expected]
+
+
+def test_cursor_is_stable_across_writes(paged_store):
+    original = sorted(vector_store.load_metadata(), key=key)
+
+    def writes(pages):
+        if pages == 1:
+            vector_store.add_twin(make_twin("early", "2025-12-31T00:00:00"))  # behind the cursor: not seen
+            vector_store.add_twin(make_twin("late", "2026-01-02T00:00:00"))   # ahead of it: seen once
+            vector_store.delete_vector_ids([original[0]["vector_id"], original[-1]["vector_id"]])
+        if pages == 3:
+            vector_store.compact_store()
+
+    seen = read_all("asc", 4, writes)
+    ids = [e["vector_id"] for e in seen]
+    assert len(ids) == len(set(ids))
+    expected = [e["vector_id"] for e in original[:-1]] + [24]
+    assert ids == expected
+    assert seen == sorted(seen, key=key)
+
+
+def test_bad_cursors_are_rejected(paged_store):
+    _, cursor, _ = page_twins(page_size=2, order="asc")
+    with pytest.raises(InvalidCursor):
+        page_twins(page_size=2, cursor=cursor, order="desc")
+    with pytest.raises(InvalidCursor):
+        page_twins(page_size=2, cursor="not-a-cursor", order="asc")
+
+
+def test_twins_limit_is_capped(paged_store, main_app, monkeypatch):
+    monkeypatch.setattr(main_app, "MAX_PAGE_SIZE", 5)
+    monkeypatch.setattr(http_cache, "response_cache", http_cache.ResponseCache())
+    client = TestClient(main_app.app)
+    assert client.get("/twins?limit=10000000").json()["count"] == 5
+    assert client.get("/twins?limit=3").json()["count"] == 3
+    assert client.get("/twins?limit=0").status_code == 422
@@ -0,0 +1,55 @@
+import pytest
+from conftest import make_twin
+
+import vector_store
+from mmap_store import load_index_mmap
+from twin_table import TwinTable
+
+
+@pytest.fixture
+def varied_store(store):
+    nts = [
+        {"dopamine": 0.62, "serotonin": 0.55, "oxytocin": 0.48, "GABA": 0.41, "cortisol": 0.58},
+        {"dopamine": 0.123456789, "serotonin": 0.5, "oxytocin": 0.5, "GABA": 0.5, "cortisol": 0.5},
+        {"dopamine": 1, "serotonin": 0, "oxytocin": 0.5, "GABA": 0.5, "cortisol": 0.5},
+        {"dopamine": 0.3, "serotonin": 0.4, "oxytocin": 0.5, "GABA": 0.6, "cortisol": 0.7, "hippocampus_memory_boost": 0.1},
+        {"dopamine": 0.3, "serotonin": 0.4, "oxytocin": 0.5, "GABA": 0.6, "cortisol": 0.7, "hippocampus_memory_boost": 0},
+    ]
+    timestamps = ["2026-01-01T00:00:00", "2026-01-01T00:00:00.250000", "2026-01-01T00:00:00Z", "2026-01-01", "not a date"]
+    vector_store.add_twins([
+        make_twin(f"user{i % 3}", timestamps[i], nts[i], xbox_game="Halo Infinite" if i % 2 else None, cohort=i % 2)
+        for i in range(5)
+    ])
+    metadata = vector_store.load_metadata()
+    # Fields add_twins never writes, and a metadata value that disagrees with the index
+    metadata[0]["tags"] = ["calm", "focus"]
+    metadata[1]["flag"] = True
+    metadata[2]["flag"] = 1
+    metadata[3]["timestamp"] = None
+    metadata[4]["neurotransmitters"]["cortisol"] = 0.9
+    vector_store.save_metadata(metadata)
+    return vector_store.load_metadata()
+
+
+@pytest.mark.parametrize("load", [vector_store.load_index, load_index_mmap])
+def test_rows_round_trip_to_metadata_entries(varied_store, load):
+    table = TwinTable.from_store(load())
+    assert len(table) == len(varied_store)
+    for view, entry in zip(table, varied_store):
+        assert dict(view) == entry
+        if "flag" in entry:
+            assert type(view["flag"]) is type(entry["flag"])  # True and 1 stay apart
+
+
+def test_key_order_matches_uniform_entries(store):
+    vector_store.add_twins([make_twin(f"user{i}", f"2026-01-01T00:00:0{i}") for i in range(5)])
+    table = TwinTable.from_store(vector_store.load_index())
+    for view, entry in zip(table, vector_store.load_metadata()):
+        assert list(view) == list(entry)
+
+
+def test_table_shares_index_vectors(store):
+    vector_store.add_twins([make_twin(f"user{i}", f"2026-01-01T00:00:0{i}") for i in range(5)])
+    table = TwinTable.from_store(vector_store.load_index())
+    assert table.shares_vectors
+    assert table.nbytes() < table.nbytes(include_vectors=True)
@@ -0,0 +1,152 @@
+# twin_export.py
+"""Chunked export of the twin store as NDJSON, Parquet or Arrow.
+
+Entries are streamed from metadata.json and written chunk by chunk, so memory use
+depends on the chunk size rather than on the size of the store.
+
+Parquet/Arrow files give vector_id, the STRING_COLUMNS, each NT_KEYS value (float64,
+as stored) and the TYPED_FIELDS (cohort, recommendations) a typed column of their own. Every other field, including neurotransmitter
+keys beyond NT_KEYS, travels in the "extra" column as a JSON object, so a columnar dump
+holds the same entries as the NDJSON export of the same store.
+
+    python twin_export.py --format parquet --output twins.parquet --life-stage adult
+"""
+import argparse
+import json
+import sys
+
+from vector_store import NT_KEYS, STRING_COLUMNS, iter_metadata, matches_filters
+
+DEFAULT_CHUNK_SIZE = 1000
+EXPORT_FORMATS = ("ndjson", "parquet", "arrow")
+EXTRA_COLUMN = "extra"
+# Cohort and recommendation fields with a typed column; a value of another type stays in "extra"
+TYPED_FIELDS = {"cohort": int, "duration_minutes": int, "xbox_game": str, "game_mode": str, "spotify_playlist": str}
+
+
+def iter_twins(filters=None):
+    for entry in iter_metadata():
+        if matches_filters(entry, filters):
+            yield entry
+
+
+def iter_chunks(entries, chunk_size=DEFAULT_CHUNK_SIZE):
+    chunk = []
+    for entry in entries:
+        chunk.append(entry)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def ndjson_chunks(filters=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Encoded NDJSON, one bytes block per chunk of twins."""
+    for chunk in iter_chunks(iter_twins(filters), chunk_size):
+        yield "".join(json.dumps(entry, default=str) + "\n" for entry in chunk).encode("utf-8")
+
+
+def arrow_schema():
+    import pyarrow as pa
+
+    fields = [pa.field("vector_id", pa.int64())]
+    fields += [pa.field(col, pa.string()) for col in STRING_COLUMNS]
+    fields += [pa.field(nt, pa.float64()) for nt in NT_KEYS]
+    fields += [pa.field(col, pa.int64() if kind is int else pa.string()) for col, kind in TYPED_FIELDS.items()]
+    fields += [pa.field(EXTRA_COLUMN, pa.string())]
+    return pa.schema(fields)
+
+
+def _typed(value, kind):
+    # bool is an int subclass, but True must not come back as 1
+    return type(value) is kind
+
+
+def _extra(entry):
+    extra = {k: v for k, v in entry.items()
+             if k not in STRING_COLUMNS and k not in ("vector_id", "neurotransmitters")
+             and not (k in TYPED_FIELDS and _typed(v, TYPED_FIELDS[k]))}
+    nt = entry.get("neurotransmitters")
+    if nt is None or any(k not in NT_KEYS for k in nt):
+        extra["neurotransmitters"] = None if nt is None else {k: v for k, v in nt.items() if k not in NT_KEYS}
+    return json.dumps(extra, default=str) if extra else None
+
+
+def to_record_batch(chunk, schema):
+    import pyarrow as pa
+
+    columns = {"vector_id": [entry.get("vector_id") for entry in chunk]}
+    for col in STRING_COLUMNS:
+        columns[col] = [None if entry.get(col) is None else str(entry.get(col)) for entry in chunk]
+    for nt in NT_KEYS:
+        columns[nt] = [(entry.get("neurotransmitters") or {}).get(nt) for entry in chunk]
+    for col, kind in TYPED_FIELDS.items():
+        columns[col] = [entry.get(col) if _typed(entry.get(col), kind) else None for entry in chunk]
+    columns[EXTRA_COLUMN] = [_extra(entry) for entry in chunk]
+    return pa.RecordBatch.from_pydict(columns, schema=schema)
+
+
+def write_columnar(path, fmt="parquet", filters=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Write a Parquet (one row group per chunk) or Arrow IPC file and return the row count."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = arrow_schema()
+    if fmt == "parquet":
+        writer = pq.ParquetWriter(path, schema)
+    elif fmt == "arrow":
+        writer = pa.ipc.new_file(path, schema)
+    else:
+        raise ValueError(f"Unsupported columnar format: {fmt}")
+
+    count = 0
+    try:
+        for chunk in iter_chunks(iter_twins(filters), chunk_size):
+            batch = to_record_batch(chunk, schema)
+            if fmt == "parquet":
+                writer.write_table(pa.Table.from_batches([batch]))
+            else:
+                writer.write_batch(batch)
+            count += len(chunk)
+    finally:
+        writer.close()
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export the twin store in chunks.")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="ndjson")
+    parser.add_argument("--output", default="-", help="Output path ('-' writes NDJSON to stdout)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--gender")
+    parser.add_argument("--life-stage")
+    parser.add_argument("--age-range")
+    parser.add_argument("--user-id")
+    args = parser.parse_args(argv)
+
+    filters = {
+        "gender": args.gender,
+        "life_stage": args.life_stage,
+        "age_range": args.age_range,
+        "user_id": args.user_id,
+    }
+
+    if args.format == "ndjson":
+        out = sys.stdout.buffer if args.output == "-" else open(args.output, "wb")
+        try:
+            for block in ndjson_chunks(filters, args.chunk_size):
+                out.write(block)
+        finally:
+            if out is not sys.stdout.buffer:
+                out.close()
+        return
+
+    if args.output == "-":
+        parser.error(f"--output is required for {args.format}")
+    count = write_columnar(args.output, args.format, filters, args.chunk_size)
+    print(f"✅ Exported {count} twins to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
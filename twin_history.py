@@ -0,0 +1,188 @@
+# twin_history.py
+import bisect
+import heapq
+import threading
+from datetime import datetime
+
+import numpy as np
+
+import vector_store
+from mmap_store import load_index_mmap
+from twin_table import TwinTable
+from vector_store import NT_KEYS, load_tombstones
+
+
+class UserHistoryIndex:
+    """Per-user twin history, each user's records ordered by (timestamp, vector_id).
+
+    Twins on disk when the index is built stay in a columnar TwinTable; one row array,
+    sorted by (user, timestamp, vector_id) once at build time, holds every user's rows as
+    a contiguous ordered run. Twins recorded afterwards are kept as dicts, inserted in
+    order, until the next rebuild. Lookups bisect both, so a range costs
+    O(log n + results).
+    """
+
+    def __init__(self, metadata=(), table=None):
+        self.table = table
+        self._user_rows = np.empty(0, dtype=np.int64)
+        self._user_codes = np.empty(0, dtype=np.int64)
+        if table is not None and "user_id" in table.columns:
+            codes = table.columns["user_id"].codes
+            self._user_rows = np.lexsort((table.vector_ids, _timestamp_order(table), codes))
+            self._user_codes = codes[self._user_rows]
+        self._keys = {}
+        self._added = {}
+        for entry in metadata:
+            self.add(entry)
+
+    def add(self, entry):
+        user_id = entry.get("user_id")
+        if not user_id:
+            return
+        key = (str(entry.get("timestamp", "")), entry.get("vector_id", -1))
+        keys = self._keys.setdefault(user_id, [])
+        pos = bisect.bisect_right(keys, key)
+        keys.insert(pos, key)
+        self._added.setdefault(user_id, []).insert(pos, entry)
+
+    def added_count(self):
+        return sum(len(entries) for entries in self._added.values())
+
+    def users(self):
+        users = set(self._added)
+        if self.table is not None and "user_id" in self.table.columns:
+            users.update(v for v in self.table.columns["user_id"].values[1:])
+        return list(users)
+
+    def _table_rows(self, user_id):
+        if self.table is None or "user_id" not in self.table.columns:
+            return self._user_rows
+        code = self.table.columns["user_id"].code_for(user_id)
+        if not code:
+            return self._user_rows[:0]
+        lo, hi = np.searchsorted(self._user_codes, [code, code + 1])
+        return self._user_rows[lo:hi]
+
+    def _row_timestamp(self, row):
+        return str(self.table.timestamp(int(row)))
+
+    def _row_key(self, row):
+        return (self._row_timestamp(row), int(self.table.vector_ids[row]))
+
+    def _slice(self, user_id, start=None, end=None):
+        """(table rows, added keys, added entries) for user_id with start <= timestamp <= end."""
+        rows = self._table_rows(user_id)
+        lo = _count_before(rows, self._row_timestamp, start, inclusive=False) if start else 0
+        hi = _count_before(rows, self._row_timestamp, end, inclusive=True) if end else len(rows)
+        keys = self._keys.get(user_id, [])
+        added_lo = bisect.bisect_left(keys, (start,)) if start else 0
+        added_hi = bisect.bisect_right(keys, (end, float("inf"))) if end else len(keys)
+        return rows[lo:hi], keys[added_lo:added_hi], self._added.get(user_id, [])[added_lo:added_hi]
+
+    def range(self, user_id, start=None, end=None):
+        """Twins for user_id with start <= timestamp <= end (ISO strings, both optional)."""
+        rows, keys, added = self._slice(user_id, start, end)
+        tombstones = load_tombstones()
+        if added:
+            from_table = ((self._row_key(row), self.table[int(row)]) for row in rows)
+            records = (r for _, r in heapq.merge(from_table, zip(keys, added), key=lambda pair: pair[0]))
+        else:
+            records = (self.table[int(row)] for row in rows)
+        return [dict(r) for r in records if r.get("vector_id") not in tombstones]
+
+    def latest(self, user_id):
+        rows, keys, added = self._slice(user_id)
+        tombstones = load_tombstones()
+        i, j = len(rows) - 1, len(added) - 1
+        # Walk both ordered runs back from the end until a live twin turns up
+        while i >= 0 or j >= 0:
+            if j < 0 or (i >= 0 and self._row_key(rows[i]) > keys[j]):
+                record, i = self.table[int(rows[i])], i - 1
+            else:
+                record, j = added[j], j - 1
+            if record.get("vector_id") not in tombstones:
+                return dict(record)
+        return None
+
+    def deltas(self, user_id, start=None, end=None):
+        records = self.range(user_id, start, end)
+        return [twin_delta(prev, curr) for prev, curr in zip(records, records[1:])]
+
+
+def _timestamp_order(table):
+    """Per-row sort key that orders rows like their timestamp strings compare."""
+    if not table.timestamp_overrides:
+        # Every timestamp is a naive isoformat() string, which sorts like its microseconds
+        return table.timestamps
+    strings = np.array([str(table.timestamp(row)) for row in range(len(table))])
+    return np.unique(strings, return_inverse=True)[1]
+
+
+def _count_before(rows, timestamp, bound, inclusive):
+    """Number of leading rows whose timestamp is < bound (<= if inclusive); rows are in timestamp order."""
+    lo, hi = 0, len(rows)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        ts = timestamp(rows[mid])
+        if ts < bound or (inclusive and ts == bound):
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+def twin_delta(prev, curr):
+    prev_nt = prev.get("neurotransmitters") or {}
+    curr_nt = curr.get("neurotransmitters") or {}
+    try:
+        elapsed = (datetime.fromisoformat(curr["timestamp"]) - datetime.fromisoformat(prev["timestamp"])).total_seconds()
+    except (KeyError, TypeError, ValueError):
+        elapsed = None
+    return {
+        "from_vector_id": prev.get("vector_id"),
+        "to_vector_id": curr.get("vector_id"),
+        "from_timestamp": prev.get("timestamp"),
+        "to_timestamp": curr.get("timestamp"),
+        "elapsed_seconds": elapsed,
+        "neurotransmitters": {
+            k: round(curr_nt.get(k, 0) - prev_nt.get(k, 0), 4) for k in NT_KEYS
+        },
+    }
+
+
+_lock = threading.Lock()
+_index = None
+_index_key = None
+
+
+def get_history_index():
+    """Process-wide history index, rebuilt only when metadata.json changed on disk."""
+    global _index, _index_key
+    key = vector_store.metadata_key()
+    with _lock:
+        if _index is None or key != _index_key:
+            # Key taken before the build: a write during the build forces another one next time
+            _index = UserHistoryIndex(table=TwinTable.from_store(load_index_mmap()))
+            _index_key = key
+        return _index
+
+
+def record_twin(entry, before, after):
+    """Fold a freshly written metadata entry into the cached index without a rebuild.
+
+    before/after are the metadata keys around the write (see vector_store.write_twins). If
+    the index was not built from `before`, something else rewrote metadata.json in between
+    (another worker's twin, a compaction, a cohort relabel) and the index is dropped instead.
+    """
+    global _index, _index_key
+    with _lock:
+        if _index is None:
+            return
+        if _index_key != before:
+            _index = None
+            return
+        _index.add(entry)
+        _index_key = after
+        # Recorded twins are plain dicts; fold them into a fresh table once they add up
+        if _index.added_count() > max(1000, len(_index.table or ()) // 10):
+            _index = None
@@ -0,0 +1,74 @@
+# twin_pages.py
+"""Keyset pagination over the twin store, ordered by (timestamp, vector_id).
+
+A cursor is the opaque, URL-safe encoding of the last (timestamp, vector_id) a client
+received plus the sort order, so the next page starts right after it even while twins
+are added or deleted, and no page requires scanning the ones before it.
+"""
+import base64
+import json
+import os
+
+from mmap_store import get_mapped_store
+from vector_store import load_live_metadata, matches_filters
+
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", "50"))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "500"))
+ORDERS = ("asc", "desc")
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def page_key(entry):
+    return (entry.get("timestamp") or "", entry["vector_id"])
+
+
+def encode_cursor(entry, order):
+    timestamp, vector_id = page_key(entry)
+    payload = json.dumps({"t": timestamp, "v": vector_id, "o": order}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor, order):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        key = (str(payload["t"]), int(payload["v"]))
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidCursor(f"Malformed cursor: {e}")
+    if payload.get("o") != order:
+        raise InvalidCursor(f"Cursor was issued for order '{payload.get('o')}', not '{order}'")
+    return key
+
+
+def clamp_page_size(page_size):
+    return max(1, min(page_size or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE))
+
+
+def _page_from_metadata(filters, size, after, descending):
+    # Slow path for stores without a fresh column file: sort the live metadata once per call
+    entries = sorted((m for m in load_live_metadata()
+                      if isinstance(m.get("vector_id"), int) and matches_filters(m, filters)),
+                     key=page_key, reverse=descending)
+    if after is not None:
+        entries = [m for m in entries if (page_key(m) < after if descending else page_key(m) > after)]
+    return entries[:size]
+
+
+def page_twins(filters=None, page_size=None, cursor=None, order="asc"):
+    """Return (entries, next_cursor, page_size); next_cursor is None on the last page."""
+    if order not in ORDERS:
+        raise ValueError(f"order must be one of {', '.join(ORDERS)}")
+    page_size = clamp_page_size(page_size)
+    after = decode_cursor(cursor, order) if cursor else None
+    descending = order == "desc"
+
+    store = get_mapped_store()
+    if store.columns is not None:
+        entries = store.page(filters, page_size + 1, after, descending)
+    else:
+        entries = _page_from_metadata(filters, page_size + 1, after, descending)
+
+    next_cursor = encode_cursor(entries[page_size - 1], order) if len(entries) > page_size else None
+    return entries[:page_size], next_cursor, page_size
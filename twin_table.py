@@ -0,0 +1,405 @@
+# twin_table.py
+"""Columnar in-memory representation of the twin metadata.
+
+A list of metadata dicts costs well over a kilobyte per twin on the heap. TwinTable keeps
+the same information in a few numpy arrays instead:
+
+- neurotransmitters: a float32 view of the FAISS index's own vector storage
+  (rev_swig_ptr over IndexFlat.xb), so they cost nothing beyond the index itself, and
+  with a memory-mapped index they live in the shared page cache;
+- vector_id: int64; timestamp: int64 microseconds since the epoch;
+- every other field (gender, life_stage, age_range, user_id, name, game, cohort, ...):
+  dictionary-encoded into the smallest unsigned integer array that fits.
+
+Rows are read through TwinView, a read-only Mapping with __slots__, so existing code that
+does entry.get("gender") keeps working; dict(view) gives back the metadata entry.
+
+    python twin_table.py --records 1000000    # bytes per twin: dict-list vs TwinTable
+"""
+import argparse
+import json
+import math
+import sys
+import time
+import tracemalloc
+from array import array
+from collections.abc import Mapping
+from datetime import datetime, timedelta
+
+import faiss
+import numpy as np
+
+import vector_store
+from vector_store import NT_KEYS, VECTOR_DIM, iter_metadata
+
+EPOCH = datetime(1970, 1, 1)
+NO_TIMESTAMP = np.iinfo(np.int64).min
+ARRAY_FIELDS = ("vector_id", "timestamp", "neurotransmitters")
+NT_DECIMALS = 6  # float32 carries ~7 significant digits; rounding hides the float32 noise
+
+
+class Categorical:
+    """Dictionary-encoded column; code 0 means the field is absent from that row."""
+
+    __slots__ = ("values", "codes", "_lookup")
+
+    def __init__(self, rows_before=0):
+        self.values = [None]
+        self._lookup = {}
+        self.codes = array("I", bytes(4 * rows_before))
+
+    @staticmethod
+    def _key(value):
+        if type(value) is str:
+            return value
+        try:
+            hash(value)
+        except TypeError:
+            return ("json", json.dumps(value, sort_keys=True, default=str))
+        return (type(value).__name__, value)  # keeps True and 1 apart
+
+    def append(self, value):
+        key = self._key(value)
+        code = self._lookup.get(key)
+        if code is None:
+            code = self._lookup[key] = len(self.values)
+            self.values.append(value)
+        self.codes.append(code)
+
+    def append_absent(self):
+        self.codes.append(0)
+
+    def finish(self):
+        n = len(self.values)
+        dtype = np.uint8 if n <= 1 << 8 else np.uint16 if n <= 1 << 16 else np.uint32
+        self.codes = np.frombuffer(self.codes, dtype=np.uint32).astype(dtype) if len(self.codes) else np.empty(0, dtype=dtype)
+        return self
+
+    def code_for(self, value):
+        return self._lookup.get(self._key(value))
+
+    def nbytes(self):
+        return self.codes.nbytes
+
+
+class TwinView(Mapping):
+    """One row of a TwinTable, readable like the metadata dict it came from."""
+
+    __slots__ = ("table", "row")
+
+    def __init__(self, table, row):
+        self.table = table
+        self.row = row
+
+    def __getitem__(self, key):
+        return self.table.value(self.row, key)
+
+    def __iter__(self):
+        return iter(self.table.row_fields(self.row))
+
+    def __len__(self):
+        return len(self.table.row_fields(self.row))
+
+    def __repr__(self):
+        return f"TwinView({dict(self)!r})"
+
+
+class TwinTable:
+    def __init__(self, vector_ids, neurotransmitters, timestamps, columns, field_order,
+                 timestamp_overrides=None, nt_overrides=None, extra_nt=None, index=None, shares_vectors=False):
+        self.vector_ids = vector_ids
+        self.neurotransmitters = neurotransmitters
+        self.timestamps = timestamps
+        self.columns = columns
+        self.field_order = field_order
+        self.timestamp_overrides = timestamp_overrides or {}
+        self.nt_overrides = nt_overrides or {}
+        self.extra_nt = extra_nt or {}
+        self._index = index  # keeps the FAISS storage behind `neurotransmitters` alive
+        self.shares_vectors = shares_vectors
+        self._sorted_ids = None
+
+    @classmethod
+    def from_store(cls, index=None, entries=None):
+        """Build from an index and a stream of metadata entries (default: the store on disk, streamed)."""
+        if index is None:
+            index = vector_store.load_index()
+        if entries is None:
+            entries = iter_metadata(include_deleted=True)
+
+        vector_ids = array("q")
+        timestamps = array("q")
+        nt_values = array("d")
+        timestamp_overrides, nt_overrides = {}, {}
+        columns, field_order = {}, []
+        extra_nt = {}
+        row = 0
+        for entry in entries:
+            vid = entry.get("vector_id")
+            if not isinstance(vid, int):
+                continue
+            vector_ids.append(vid)
+
+            ts = entry.get("timestamp")
+            micros = _to_micros(ts)
+            if micros is None:
+                timestamps.append(_sort_micros(ts))
+                timestamp_overrides[row] = ts
+            else:
+                timestamps.append(micros)
+
+            nt = entry.get("neurotransmitters")
+            if not _plain_nt(nt):
+                nt_overrides[row] = nt
+                nt_values.extend([math.nan] * VECTOR_DIM)
+            else:
+                nt_values.extend(nt[k] for k in NT_KEYS)
+                for k, v in nt.items():
+                    if k in NT_KEYS:
+                        continue
+                    if k not in extra_nt:
+                        extra_nt[k] = array("d", [math.nan] * row)
+                    extra_nt[k].append(v)
+
+            for name in entry:
+                if name in columns or name in field_order:
+                    continue
+                field_order.append(name)
+                if name not in ARRAY_FIELDS:
+                    columns[name] = Categorical(rows_before=row)
+            for name, column in columns.items():
+                if name in entry:
+                    column.append(entry[name])
+                else:
+                    column.append_absent()
+            row += 1
+            for column in extra_nt.values():
+                if len(column) < row:
+                    column.append(math.nan)
+
+        ids = np.frombuffer(vector_ids, dtype=np.int64) if row else np.empty(0, dtype=np.int64)
+        vectors, shared = _index_vectors(index, ids)
+        if row:
+            # Rows whose metadata values don't survive float32 (or disagree with the index) keep their dict
+            expected = np.frombuffer(nt_values, dtype=np.float64).reshape(-1, VECTOR_DIM)
+            lossy = ~(np.round(vectors.astype(np.float64), NT_DECIMALS) == expected).all(axis=1)
+            for r in np.flatnonzero(lossy & ~np.isnan(expected).any(axis=1)).tolist():
+                nt = dict(zip(NT_KEYS, expected[r].tolist()))
+                nt.update((k, float(column[r])) for k, column in extra_nt.items() if not math.isnan(column[r]))
+                nt_overrides[r] = nt
+        table = cls(
+            vector_ids=ids,
+            neurotransmitters=vectors,
+            timestamps=np.frombuffer(timestamps, dtype=np.int64) if row else np.empty(0, dtype=np.int64),
+            columns={name: column.finish() for name, column in columns.items()},
+            field_order=field_order,
+            timestamp_overrides=timestamp_overrides,
+            nt_overrides=nt_overrides,
+            extra_nt={k: np.frombuffer(v, dtype=np.float64) for k, v in extra_nt.items()},
+            index=index,
+            shares_vectors=shared,
+        )
+        return table
+
+    def __len__(self):
+        return len(self.vector_ids)
+
+    def __getitem__(self, row):
+        return TwinView(self, row)
+
+    def __iter__(self):
+        return (TwinView(self, row) for row in range(len(self)))
+
+    def row_fields(self, row):
+        # Same key order as the metadata entry the row came from
+        return [name for name in self.field_order if name in ARRAY_FIELDS or self.columns[name].codes[row]]
+
+    def value(self, row, key):
+        if key == "vector_id":
+            return int(self.vector_ids[row])
+        if key == "timestamp":
+            return self.timestamp(row)
+        if key == "neurotransmitters":
+            return self.nt(row)
+        column = self.columns.get(key)
+        code = column.codes[row] if column is not None else 0
+        if not code:
+            raise KeyError(key)
+        return column.values[code]
+
+    def timestamp(self, row):
+        if row in self.timestamp_overrides:
+            return self.timestamp_overrides[row]
+        return (EPOCH + timedelta(microseconds=int(self.timestamps[row]))).isoformat()
+
+    def nt(self, row):
+        if row in self.nt_overrides:
+            return self.nt_overrides[row]
+        values = self.neurotransmitters[row]
+        nt = {k: round(float(v), NT_DECIMALS) for k, v in zip(NT_KEYS, values)}
+        for k, column in self.extra_nt.items():
+            if not math.isnan(column[row]):
+                nt[k] = float(column[row])
+        return nt
+
+    def rows_for_ids(self, vector_ids):
+        """Row numbers for vector_ids (-1 where absent)."""
+        if self._sorted_ids is None:
+            order = np.argsort(self.vector_ids, kind="stable")
+            self._sorted_ids = (order, self.vector_ids[order])
+        order, sorted_ids = self._sorted_ids
+        vector_ids = np.asarray(vector_ids, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(sorted_ids, vector_ids), max(len(sorted_ids) - 1, 0))
+        found = (sorted_ids[pos] == vector_ids) if len(sorted_ids) else np.zeros(len(vector_ids), dtype=bool)
+        return np.where(found, order[pos] if len(order) else -1, -1)
+
+    def mask(self, filters=None, tombstones=frozenset()):
+        mask = np.ones(len(self), dtype=bool)
+        for key, value in (filters or {}).items():
+            if value is None:
+                continue
+            if key == "vector_id":
+                mask &= self.vector_ids == int(value)
+                continue
+            column = self.columns.get(key)
+            code = column.code_for(value) if column is not None else None
+            if code is None:
+                mask[:] = False
+            else:
+                mask &= column.codes == code
+        if tombstones and len(self):
+            mask &= ~np.isin(self.vector_ids, np.fromiter(tombstones, dtype=np.int64))
+        return mask
+
+    def nbytes(self, include_vectors=False):
+        """Heap bytes held by the table (the shared index vectors only if include_vectors)."""
+        total = self.vector_ids.nbytes + self.timestamps.nbytes
+        total += sum(column.nbytes() for column in self.columns.values())
+        total += sum(column.nbytes for column in self.extra_nt.values())
+        if include_vectors or not self.shares_vectors:
+            total += self.neurotransmitters.nbytes
+        return total
+
+
+def _plain_nt(nt):
+    # ints (a clipped 0 or 1) would come back as floats, so those rows keep their dict
+    return isinstance(nt, dict) and all(k in nt for k in NT_KEYS) and all(type(v) is float for v in nt.values())
+
+
+def _to_micros(ts):
+    """Microseconds since the epoch if ts is a naive ISO timestamp that round-trips exactly, else None."""
+    if not isinstance(ts, str):
+        return None
+    try:
+        dt = datetime.fromisoformat(ts)
+    except ValueError:
+        return None
+    if dt.tzinfo is not None or dt.isoformat() != ts:
+        return None
+    return (dt - EPOCH) // timedelta(microseconds=1)
+
+
+def _sort_micros(ts):
+    # Sort key for timestamps kept verbatim: parseable ones in time order, the rest first
+    try:
+        dt = datetime.fromisoformat(ts)
+        return (dt.replace(tzinfo=None) - EPOCH) // timedelta(microseconds=1)
+    except (TypeError, ValueError):
+        return NO_TIMESTAMP
+
+
+def index_vectors_view(index):
+    """Zero-copy float32 (ntotal, 5) view of an IndexIDMap(IndexFlat)'s stored vectors."""
+    if index.ntotal == 0:
+        return np.empty((0, VECTOR_DIM), dtype=np.float32)
+    inner = faiss.downcast_index(index.index)
+    return faiss.rev_swig_ptr(inner.get_xb(), index.ntotal * VECTOR_DIM).reshape(-1, VECTOR_DIM)
+
+
+def _index_vectors(index, vector_ids):
+    """(vectors in table row order, shared): a view of the index when orders agree (the usual case), else a copy."""
+    vectors = index_vectors_view(index)
+    index_ids = faiss.rev_swig_ptr(index.id_map.data(), index.ntotal) if index.ntotal else np.empty(0, dtype=np.int64)
+    if len(index_ids) == len(vector_ids) and np.array_equal(index_ids, vector_ids):
+        return vectors, True
+    out = np.full((len(vector_ids), VECTOR_DIM), np.nan, dtype=np.float32)
+    if len(index_ids):
+        order = np.argsort(index_ids)
+        pos = np.minimum(np.searchsorted(index_ids[order], vector_ids), len(order) - 1)
+        found = index_ids[order][pos] == vector_ids
+        out[found] = vectors[order[pos[found]]]
+    return out, False
+
+
+def _measure(build):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current, peak, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bytes per twin: list of metadata dicts vs TwinTable.")
+    parser.add_argument("--records", type=int, default=1000000)
+    parser.add_argument("--store-dir", help="Existing store to measure (default: build a synthetic one)")
+    parser.add_argument("--output", help="Write the report as JSON")
+    args = parser.parse_args()
+
+    if args.store_dir:
+        vector_store.set_store_dir(args.store_dir)
+    else:
+        import random
+        import tempfile
+
+        vector_store.set_store_dir(tempfile.mkdtemp(prefix="neurosync-table-"))
+        rng = random.Random(0)
+        print(f"Building synthetic store with {args.records} twins in {vector_store.STORE_DIR} ...", file=sys.stderr)
+        games = ["Forza Horizon 5", "Stardew Valley", "ABZÛ", "Rocket League", "Ori and the Blind Forest"]
+        playlists = ["Lofi Chill | Relax & Study", "Upbeat Drive | Motivation Boost", "Calm Nature | Stress Recovery"]
+        vector_store.add_twins([{
+            "name": f"user{rng.randrange(args.records // 4 or 1)}",
+            "gender": rng.choice(["female", "male", "neutral"]),
+            "life_stage": rng.choice(["young_adult", "adult", "senior"]),
+            "age_range": rng.choice(["18-25", "25-40", "60+"]),
+            "neurotransmitters": {k: round(rng.random(), 2) for k in NT_KEYS},
+            "timestamp": (datetime(2025, 1, 1) + timedelta(seconds=rng.randrange(10 ** 7))).isoformat(),
+            "xbox_game": rng.choice(games),
+            "spotify_playlist": rng.choice(playlists),
+            "duration_minutes": rng.choice([25, 30, 35, 40]),
+            "cohort": rng.randrange(8),
+        } for _ in range(args.records)])
+
+    index = vector_store.load_index()
+    twins = index.ntotal
+    if not twins:
+        print(f"❌ No twins in {vector_store.STORE_DIR}", file=sys.stderr)
+        return 1
+    dicts, dict_bytes, dict_peak, dict_seconds = _measure(vector_store.load_metadata)
+    del dicts
+    table, table_bytes, table_peak, table_seconds = _measure(lambda: TwinTable.from_store(index))
+
+    report = {
+        "twins": twins,
+        "dict_list": {"bytes_per_twin": round(dict_bytes / twins, 1), "peak_bytes_per_twin": round(dict_peak / twins, 1),
+                      "load_seconds": round(dict_seconds, 2)},
+        "twin_table": {"bytes_per_twin": round(table_bytes / twins, 1), "peak_bytes_per_twin": round(table_peak / twins, 1),
+                       "load_seconds": round(table_seconds, 2),
+                       "column_bytes_per_twin": round(table.nbytes() / twins, 1),
+                       "shared_index_vector_bytes_per_twin": table.neurotransmitters.nbytes / twins},
+    }
+    report["reduction"] = round(dict_bytes / max(table_bytes, 1), 1)
+    print(f"{twins} twins: dict-list {report['dict_list']['bytes_per_twin']} B/twin, "
+          f"TwinTable {report['twin_table']['bytes_per_twin']} B/twin "
+          f"(+{report['twin_table']['shared_index_vector_bytes_per_twin']:.0f} B/twin shared with the FAISS index), "
+          f"{report['reduction']}x smaller")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,23 +4,250 @@ import numpy as np
 import os
 import json
 import hashlib
+import re
+import struct
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 
+import fcntl
+
+from brain_regions import BRAIN_REGIONS, SUBVECTOR_KEYS, compute_brain_regions, compute_subvectors
+
 VECTOR_DIM = 5  
+NT_KEYS = ["dopamine", "serotonin", "oxytocin", "GABA", "cortisol"]
+STORE_DIR = "vector_store"
 INDEX_PATH = "vector_store/faiss_index.index"
 META_PATH = "vector_store/metadata.json"
+STATE_PATH = "vector_store/state.json"
+TOMBSTONE_PATH = "vector_store/tombstones.log"
+COLUMNS_PATH = "vector_store/metadata.columns"
 
 os.makedirs("vector_store", exist_ok=True)
 
+LOCK_NAME = "store.lock"
+
+# Serializes load-modify-save cycles (writes and compaction) within one process;
+# store_lock adds an flock so uvicorn workers and store_admin.py exclude each other too.
+_write_lock = threading.RLock()
+_lock_file = None
+_lock_depth = 0
+
+
+class StoreLocked(Exception):
+    pass
+
+
+@contextmanager
+def store_lock(blocking=True):
+    """Exclusive write lock on the store, across threads and processes (reentrant per thread).
+
+    With blocking=False raises StoreLocked instead of waiting for another holder.
+    """
+    global _lock_file, _lock_depth
+    if not _write_lock.acquire(blocking=blocking):
+        raise StoreLocked(f"{STORE_DIR} is locked by another thread")
+    try:
+        if _lock_depth == 0:
+            f = open(store_path(LOCK_NAME), "a")
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                f.close()
+                raise StoreLocked(f"{STORE_DIR} is locked by another process")
+            _lock_file = f
+        _lock_depth += 1
+        try:
+            yield
+        finally:
+            _lock_depth -= 1
+            if _lock_depth == 0:
+                _lock_file.close()  # releases the flock
+                _lock_file = None
+    finally:
+        _write_lock.release()
+
+
+def set_store_dir(store_dir):
+    """Point every store file at another directory (scratch stores for tools and benchmarks)."""
+    global STORE_DIR, INDEX_PATH, META_PATH, STATE_PATH, TOMBSTONE_PATH, COLUMNS_PATH
+    os.makedirs(store_dir, exist_ok=True)
+    STORE_DIR = store_dir
+    INDEX_PATH = os.path.join(store_dir, "faiss_index.index")
+    META_PATH = os.path.join(store_dir, "metadata.json")
+    STATE_PATH = os.path.join(store_dir, "state.json")
+    TOMBSTONE_PATH = os.path.join(store_dir, "tombstones.log")
+    COLUMNS_PATH = os.path.join(store_dir, "metadata.columns")
+
+
+def store_path(name):
+    return os.path.join(STORE_DIR, name)
+
+
+def new_index():
+    return faiss.IndexIDMap(faiss.IndexFlatL2(VECTOR_DIM))
+
 
 def load_index():
     if os.path.exists(INDEX_PATH):
-        return faiss.read_index(INDEX_PATH)
-    return faiss.IndexFlatL2(VECTOR_DIM)
+        index = faiss.read_index(INDEX_PATH)
+        if isinstance(index, faiss.IndexIDMap):
+            return index
+        # Legacy IndexFlatL2: row position was the vector_id
+        migrated = new_index()
+        if index.ntotal:
+            migrated.add_with_ids(index.reconstruct_n(0, index.ntotal), np.arange(index.ntotal, dtype='int64'))
+        return migrated
+    return new_index()
 
 
 def save_index(index):
-    faiss.write_index(index, INDEX_PATH)
+    tmp_path = INDEX_PATH + ".tmp"
+    faiss.write_index(index, tmp_path)
+    os.replace(tmp_path, INDEX_PATH)
+
+
+def index_ids(index):
+    return faiss.vector_to_array(index.id_map).astype('int64')
+
+
+# Embedding spaces, each a FAISS index keyed by the same vector_ids. The neurotransmitter
+# index is faiss_index.index; the others are derived from the twin and written with it.
+SPACES = {"neurotransmitters": VECTOR_DIM, "brain_regions": len(BRAIN_REGIONS), "subvectors": len(SUBVECTOR_KEYS)}
+EXTRA_SPACES = ["brain_regions", "subvectors"]
+
+
+def space_index_path(space):
+    return INDEX_PATH if space == "neurotransmitters" else store_path(f"{space}.index")
+
+
+def space_vector(space, values):
+    """Flatten one twin's values for `space`: a neurotransmitter, region or nested subvector dict,
+    or an already flat list in NT_KEYS / BRAIN_REGIONS / SUBVECTOR_KEYS order."""
+    if space not in SPACES:
+        raise ValueError(f"Unknown space '{space}' (expected one of {', '.join(SPACES)})")
+    if not isinstance(values, dict):
+        try:
+            flat = [float(v) for v in values]
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Invalid {space} vector: {e}")
+        if len(flat) != SPACES[space]:
+            raise ValueError(f"{space} vectors have {SPACES[space]} values, got {len(flat)}")
+        return flat
+    try:
+        if space == "neurotransmitters":
+            return [float(values[k]) for k in NT_KEYS]
+        if space == "brain_regions":
+            return [float(values[r]) for r in BRAIN_REGIONS]
+        return [float(values[r][k]) for r, k in SUBVECTOR_KEYS]
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"Incomplete {space} vector: missing or invalid {e}")
+
+
+def twin_space_vectors(twins, space):
+    """(n, dim) float32 vectors for `space`; twins without that field get it derived from their neurotransmitters."""
+    derive = {"brain_regions": compute_brain_regions, "subvectors": compute_subvectors}.get(space)
+    rows = []
+    for twin in twins:
+        values = twin.get(space) if space != "neurotransmitters" else twin["neurotransmitters"]
+        if not values:
+            values = derive(twin["neurotransmitters"])
+        rows.append(space_vector(space, values))
+    return np.array(rows, dtype='float32').reshape(-1, SPACES[space])
+
+
+def new_space_index(space):
+    return faiss.IndexIDMap(faiss.IndexFlatL2(SPACES[space]))
+
+
+def load_space_index(space, metadata=None):
+    """Index for `space`; one that was never written is backfilled from metadata (derived from neurotransmitters)."""
+    if space == "neurotransmitters":
+        return load_index()
+    path = space_index_path(space)
+    if os.path.exists(path):
+        return faiss.read_index(path)
+    index = new_space_index(space)
+    entries = [m for m in (load_metadata() if metadata is None else metadata)
+               if isinstance(m.get("vector_id"), int) and all(k in (m.get("neurotransmitters") or {}) for k in NT_KEYS)]
+    if entries:
+        index.add_with_ids(twin_space_vectors(entries, space), np.array([m["vector_id"] for m in entries], dtype='int64'))
+    return index
+
+
+def load_space_indexes(metadata=None):
+    return {space: load_space_index(space, metadata) for space in EXTRA_SPACES}
+
+
+def save_space_indexes(indexes):
+    for space, index in indexes.items():
+        path = space_index_path(space)
+        tmp_path = path + ".tmp"
+        faiss.write_index(index, tmp_path)
+        os.replace(tmp_path, path)
+
+
+def ensure_space_indexes():
+    """Write the region/subvector indexes of a store created before they existed; returns the spaces built."""
+    with store_lock():
+        missing = [space for space in EXTRA_SPACES if not os.path.exists(space_index_path(space))]
+        if not missing or not os.path.exists(INDEX_PATH):
+            return []
+        metadata = load_metadata()
+        save_space_indexes({space: load_space_index(space, metadata) for space in missing})
+    return missing
+
+
+def stored_space_vector(index, vector_id):
+    """The vector index holds for vector_id as a float32 array, or None."""
+    rows = np.flatnonzero(index_ids(index) == vector_id)
+    if not len(rows):
+        return None
+    return index.index.reconstruct(int(rows[0]))
+
+
+def load_state():
+    if os.path.exists(STATE_PATH):
+        with open(STATE_PATH, "r") as f:
+            return json.load(f)
+    return {}
+
+
+def save_state(state):
+    tmp_path = STATE_PATH + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, STATE_PATH)
+
+
+def bump_version(state=None):
+    """Advance the store version; called after a change is on disk so readers never see a new version with old data."""
+    state = state if state is not None else load_state()
+    state["version"] = state.get("version", 0) + 1
+    save_state(state)
+    return state["version"]
+
+
+_version_cache = None
+
+
+def store_version():
+    """Monotonically increasing store version (state.json), re-read only when the file is replaced."""
+    global _version_cache
+    try:
+        stat = os.stat(STATE_PATH)
+    except FileNotFoundError:
+        return 0
+    key = (STATE_PATH, stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    if _version_cache is None or _version_cache[0] != key:
+        _version_cache = (key, load_state().get("version", 0))
+    return _version_cache[1]
+
+
+def next_vector_id(metadata):
+    """Next unused vector_id; ids are never reused, even after compaction removed the largest."""
+    top = max((m["vector_id"] for m in metadata if isinstance(m.get("vector_id"), int)), default=-1)
+    return max(load_state().get("next_vector_id", 0), top + 1)
 
 
 def load_metadata():
@@ -42,68 +269,402 @@ def load_metadata():
     return []
 
 
+_SEPARATOR = re.compile(r"[\s\[,]*")
+
+
+def iter_metadata(read_size=1 << 16, include_deleted=False):
+    """Yield metadata entries one by one, reading metadata.json in fixed-size chunks."""
+    if not os.path.exists(META_PATH):
+        return
+    tombstones = frozenset() if include_deleted else load_tombstones()
+    decoder = json.JSONDecoder()
+    with open(META_PATH, "r") as f:
+        buf, pos, eof = "", 0, False
+        while True:
+            pos = _SEPARATOR.match(buf, pos).end()
+            if buf.startswith("]", pos):
+                return
+            if pos < len(buf):
+                try:
+                    entry, pos = decoder.raw_decode(buf, pos)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                else:
+                    if isinstance(entry, dict) and entry.get("vector_id") not in tombstones:
+                        entry.setdefault("timestamp", "unknown")
+                        yield entry
+                    continue
+            elif eof:
+                return
+            chunk = f.read(read_size)
+            eof = not chunk
+            buf, pos = buf[pos:] + chunk, 0
+
+
+def matches_filters(entry, filters):
+    return all(entry.get(k) == v for k, v in (filters or {}).items() if v is not None)
+
+
 def save_metadata(metadata):
-    with open(META_PATH, "w") as f:
+    next_id = next_vector_id(metadata)
+    tmp_path = META_PATH + ".tmp"
+    with open(tmp_path, "w") as f:
         json.dump(metadata, f, indent=2)
+    os.replace(tmp_path, META_PATH)
+    save_columns(metadata)
+    state = load_state()
+    state["next_vector_id"] = next_id
+    bump_version(state)
 
 
-def add_twin(twin, vector=None):
-    index = load_index()
-    metadata = load_metadata()
+COLUMN_MAGIC = b"NSCOLS1\n"
+COLUMN_ALIGN = 64
+STRING_COLUMNS = ["user_id", "name", "gender", "life_stage", "age_range", "timestamp"]
+
+
+def _align(offset):
+    return (offset + COLUMN_ALIGN - 1) // COLUMN_ALIGN * COLUMN_ALIGN
+
+
+def metadata_key():
+    """Identity of metadata.json on disk (every rewrite replaces it, so the key changes), or None."""
+    try:
+        stat = os.stat(META_PATH)
+    except FileNotFoundError:
+        return None
+    return (META_PATH, stat.st_ino, stat.st_mtime_ns, stat.st_size)
 
-    if vector is None:
-        vector = np.array([[
-            twin["neurotransmitters"]["dopamine"],
-            twin["neurotransmitters"]["serotonin"],
-            twin["neurotransmitters"]["oxytocin"],
-            twin["neurotransmitters"]["GABA"],
-            twin["neurotransmitters"]["cortisol"]
-        ]], dtype='float32')
-    
-    index.add(vector)
-    
-    user_id = hashlib.sha256(twin["name"].encode()).hexdigest()[:8]
-    metadata.append({
+
+def metadata_stamp():
+    stat = os.stat(META_PATH)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def _column_extras(entry):
+    extra = {k: v for k, v in entry.items() if k not in STRING_COLUMNS and k not in ("vector_id", "neurotransmitters", "cohort")}
+    if "cohort" in entry and not isinstance(entry["cohort"], int):
+        extra["cohort"] = entry["cohort"]
+    nt = entry.get("neurotransmitters")
+    if nt is None or any(k not in NT_KEYS for k in nt):
+        extra["neurotransmitters"] = None if nt is None else {k: v for k, v in nt.items() if k not in NT_KEYS}
+    return json.dumps(extra, default=str).encode("utf-8") if extra else b""
+
+
+def save_columns(metadata):
+    """Write metadata as a fixed-layout column file that readers can memory-map (see mmap_store).
+
+    Layout: magic, u64 header length, JSON header, then each column as a contiguous
+    64-byte-aligned array. Rows are ordered by vector_id, "cohort" is -1 for twins
+    without one, and "ts_order" holds the row numbers sorted by (timestamp, vector_id); strings are fixed-width UTF-8
+    sized to the longest value in the file, with None stored as an empty string. Fields
+    without a column of their own (extra neurotransmitter keys, later additions) travel
+    in a JSON "extra" column so reads reproduce metadata.json entries exactly.
+    """
+    rows = sorted((m for m in metadata if isinstance(m.get("vector_id"), int)), key=lambda m: m["vector_id"])
+    columns = {
+        "vector_id": np.array([m["vector_id"] for m in rows], dtype='<i8'),
+        "neurotransmitters": np.array(
+            [[(m.get("neurotransmitters") or {}).get(k, np.nan) for k in NT_KEYS] for m in rows], dtype='<f8'
+        ).reshape(-1, VECTOR_DIM),
+        "cohort": np.array([m["cohort"] if isinstance(m.get("cohort"), int) else -1 for m in rows], dtype='<i4'),
+    }
+    for name in STRING_COLUMNS:
+        values = [b"" if m.get(name) is None else str(m[name]).encode("utf-8") for m in rows]
+        columns[name] = np.array(values, dtype=f"S{max(map(len, values), default=1) or 1}")
+    # Row numbers in (timestamp, vector_id) order, for keyset pagination
+    columns["ts_order"] = np.lexsort((columns["vector_id"], columns["timestamp"])).astype('<i8')
+    extras = [_column_extras(m) for m in rows]
+    columns["extra"] = np.array(extras, dtype=f"S{max(map(len, extras), default=1) or 1}")
+
+    layout, offset = [], 0
+    for name, arr in columns.items():
+        offset = _align(offset)
+        layout.append({"name": name, "dtype": arr.dtype.str, "shape": list(arr.shape), "offset": offset})
+        offset += arr.nbytes
+    header = json.dumps({"rows": len(rows), "metadata_stamp": metadata_stamp(), "columns": layout}).encode("utf-8")
+    data_start = _align(len(COLUMN_MAGIC) + 8 + len(header))
+
+    tmp_path = COLUMNS_PATH + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(COLUMN_MAGIC + struct.pack("<Q", len(header)) + header)
+        for spec, arr in zip(layout, columns.values()):
+            f.seek(data_start + spec["offset"])
+            f.write(np.ascontiguousarray(arr).tobytes())
+    os.replace(tmp_path, COLUMNS_PATH)
+
+
+def load_live_metadata():
+    tombstones = load_tombstones()
+    return [m for m in load_metadata() if m.get("vector_id") not in tombstones]
+
+
+_tombstone_cache = (None, frozenset())
+
+
+def load_tombstones():
+    """Set of deleted vector_ids that have not been compacted away yet (cached per file version)."""
+    global _tombstone_cache
+    try:
+        stat = os.stat(TOMBSTONE_PATH)
+    except FileNotFoundError:
+        return frozenset()
+    key = (TOMBSTONE_PATH, stat.st_mtime_ns, stat.st_size)
+    if _tombstone_cache[0] != key:
+        with open(TOMBSTONE_PATH, "r") as f:
+            ids = frozenset(int(line) for line in f if line.strip())
+        _tombstone_cache = (key, ids)
+    return _tombstone_cache[1]
+
+
+def delete_vector_ids(vector_ids):
+    """Tombstone twins by vector_id: an O(1) append per id; space is reclaimed by compact_store."""
+    vector_ids = [int(v) for v in vector_ids]
+    if vector_ids:
+        with store_lock():
+            with open(TOMBSTONE_PATH, "a") as f:
+                f.write("".join(f"{v}\n" for v in vector_ids))
+            bump_version()
+    return vector_ids
+
+
+def compact_store(wait=True):
+    """Drop tombstoned twins from the index and metadata; vector_ids of the survivors are unchanged.
+
+    Holds store_lock for the whole load-modify-save and tombstone rewrite; with wait=False
+    raises StoreLocked rather than queueing behind another writer.
+    """
+    with store_lock(blocking=wait):
+        if not os.path.exists(TOMBSTONE_PATH):
+            return {"removed": 0, "remaining": None}
+        with open(TOMBSTONE_PATH, "r") as f:
+            snapshot = f.read()
+        dead = {int(line) for line in snapshot.splitlines() if line.strip()}
+        if not dead:
+            return {"removed": 0, "remaining": None}
+
+        index = load_index()
+        metadata = load_metadata()
+        space_indexes = load_space_indexes(metadata)
+        dead_ids = np.array(sorted(dead), dtype='int64')
+        removed = index.remove_ids(dead_ids)
+        for space_index in space_indexes.values():
+            space_index.remove_ids(dead_ids)
+        metadata = [m for m in metadata if m.get("vector_id") not in dead]
+        save_space_indexes(space_indexes)
+        save_index(index)
+        save_metadata(metadata)
+
+        # Writers hold store_lock, so nothing should have been appended; keep any tail regardless
+        with open(TOMBSTONE_PATH, "r") as f:
+            tail = f.read()[len(snapshot):]
+        tmp_path = TOMBSTONE_PATH + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(tail)
+        os.replace(tmp_path, TOMBSTONE_PATH)
+        return {"removed": int(removed), "remaining": index.ntotal}
+
+
+def user_id_for(name):
+    return hashlib.sha256(name.encode()).hexdigest()[:8]
+
+
+def twin_vectors(twins):
+    return np.array([[twin["neurotransmitters"][k] for k in NT_KEYS] for twin in twins], dtype='float32').reshape(-1, VECTOR_DIM)
+
+
+# Recommendation fields kept with each twin (when present) so cohorts can report what their members got
+RECOMMENDATION_FIELDS = ["xbox_game", "game_mode", "duration_minutes", "switch_time", "spotify_playlist", "cohort"]
+
+
+def make_entry(twin, vector_id):
+    entry = {
         "name": twin["name"],
         "gender": twin["gender"],
         "life_stage": twin["life_stage"],
         "age_range": twin["age_range"],
         "neurotransmitters": twin.get("neurotransmitters"),
         "timestamp": twin.get("timestamp", datetime.utcnow().isoformat()),
-        "vector_id": len(metadata),
-        "user_id": user_id
-    })
+        "vector_id": vector_id,
+        "user_id": user_id_for(twin["name"])
+    }
+    entry.update({k: twin[k] for k in RECOMMENDATION_FIELDS if twin.get(k) is not None})
+    return entry
 
-    save_index(index)
-    save_metadata(metadata)
 
+def append_twins(index, metadata, twins, vectors=None, space_indexes=None):
+    """Add a batch of twins to an already loaded index/metadata pair with a single index.add.
 
-def search_similar_twins(query_vector, top_k=5, filters=None):
-    index = load_index()
-    metadata = load_metadata()
+    space_indexes ({space: index}, see load_space_indexes) get the same ids in the same batch.
+    """
+    if vectors is None:
+        vectors = twin_vectors(twins)
+    start = next_vector_id(metadata)
+    entries = [make_entry(twin, start + i) for i, twin in enumerate(twins)]
+    ids = np.array([e["vector_id"] for e in entries], dtype='int64')
+    index.add_with_ids(vectors, ids)
+    for space, space_index in (space_indexes or {}).items():
+        space_index.add_with_ids(twin_space_vectors(twins, space), ids)
+    metadata.extend(entries)
+    return entries
 
-    query = np.array([[
-        query_vector["dopamine"],
-        query_vector["serotonin"],
-        query_vector["oxytocin"],
-        query_vector["GABA"],
-        query_vector["cortisol"]
-    ]], dtype='float32')
+
+def write_twins(twins, vectors=None):
+    """add_twins, also returning metadata_key() from just before and just after the write.
+
+    In-memory views built from metadata.json can fold the new entries in only if the key
+    they were built from is still the "before" key, i.e. nothing else rewrote the file.
+    """
+    with store_lock():
+        before = metadata_key()
+        index = load_index()
+        metadata = load_metadata()
+        space_indexes = load_space_indexes(metadata)
+        entries = append_twins(index, metadata, twins, vectors, space_indexes)
+        # Region indexes first: readers key off faiss_index.index and metadata.json
+        save_space_indexes(space_indexes)
+        save_index(index)
+        save_metadata(metadata)
+        return entries, before, metadata_key()
+
+
+def add_twins(twins, vectors=None):
+    return write_twins(twins, vectors)[0]
+
+
+def add_twin(twin, vector=None):
+    return add_twins([twin], vector)[0]
+
+
+def _preview(ids, limit=10):
+    ids = sorted(ids)
+    return ", ".join(map(str, ids[:limit])) + (" ..." if len(ids) > limit else "")
+
+
+def check_consistency(index, metadata, tolerance=1e-4, space_indexes=None):
+    """List the ways index vectors and metadata entries disagree (empty when consistent)."""
+    problems = []
+    by_id = {}
+    for pos, entry in enumerate(metadata):
+        vid = entry.get("vector_id")
+        if not isinstance(vid, int):
+            problems.append(f"metadata[{pos}] has no integer vector_id")
+        elif vid in by_id:
+            problems.append(f"vector_id {vid} appears more than once in metadata")
+        else:
+            by_id[vid] = entry
+
+    ids = index_ids(index)
+    rows = {int(vid): row for row, vid in enumerate(ids)}
+    if len(rows) != len(ids):
+        problems.append(f"index holds {len(ids) - len(rows)} duplicate ids")
+
+    missing_in_index = by_id.keys() - rows.keys()
+    if missing_in_index:
+        problems.append(f"{len(missing_in_index)} metadata entries have no vector in the index: {_preview(missing_in_index)}")
+    missing_in_metadata = rows.keys() - by_id.keys()
+    if missing_in_metadata:
+        problems.append(f"{len(missing_in_metadata)} index vectors have no metadata entry: {_preview(missing_in_metadata)}")
+
+    if rows and next_vector_id(metadata) <= max(rows):
+        problems.append("state.json next_vector_id would reuse an id already in the index")
+
+    if index.ntotal:
+        stored = index.index.reconstruct_n(0, index.ntotal)
+        for vid, entry in by_id.items():
+            if vid not in rows:
+                continue
+            nt = entry.get("neurotransmitters") or {}
+            if any(k not in nt for k in NT_KEYS):
+                problems.append(f"vector_id {vid} is missing neurotransmitter values")
+                continue
+            expected = np.array([nt[k] for k in NT_KEYS], dtype='float32')
+            if not np.allclose(stored[rows[vid]], expected, atol=tolerance):
+                problems.append(f"index vector for vector_id {vid} does not match its metadata neurotransmitters")
+
+    for space, space_index in (space_indexes or {}).items():
+        space_ids = set(index_ids(space_index).tolist())
+        missing = rows.keys() - space_ids
+        if missing:
+            problems.append(f"{len(missing)} twins are missing from the {space} index: {_preview(missing)}")
+        extra = space_ids - rows.keys()
+        if extra:
+            problems.append(f"{space} index holds {len(extra)} ids the neurotransmitter index does not: {_preview(extra)}")
+    return problems
+
+
+def rebuild_index(metadata):
+    """Build a fresh index from metadata in one batch, keeping each entry's vector_id.
+
+    Entries without a full neurotransmitter vector cannot be indexed and are dropped, as
+    are repeated vector_ids; entries without one get a fresh id.
+    Returns (index, kept_metadata, dropped_count).
+    """
+    kept, seen, unnumbered = [], set(), []
+    for entry in metadata:
+        if not all(k in (entry.get("neurotransmitters") or {}) for k in NT_KEYS):
+            continue
+        vid = entry.get("vector_id")
+        if not isinstance(vid, int):
+            unnumbered.append(entry)
+        elif vid not in seen:
+            seen.add(vid)
+            kept.append(entry)
+    next_id = next_vector_id(kept)
+    for i, entry in enumerate(unnumbered):
+        entry["vector_id"] = next_id + i
+    kept.extend(unnumbered)
+
+    index = new_index()
+    if kept:
+        index.add_with_ids(twin_vectors(kept), np.array([e["vector_id"] for e in kept], dtype='int64'))
+    return index, kept, len(metadata) - len(kept)
+
+
+def rebuild_space_indexes(metadata, previous=None):
+    """Region/subvector indexes for metadata's twins, keeping each twin's vector from `previous`
+    ({space: index}) when it has one there and deriving it from the neurotransmitters otherwise."""
+    ids = np.array([e["vector_id"] for e in metadata], dtype='int64')
+    rebuilt = {}
+    for space in EXTRA_SPACES:
+        vectors = twin_space_vectors(metadata, space) if len(ids) else np.empty((0, SPACES[space]), dtype='float32')
+        old = (previous or {}).get(space)
+        if old is not None and old.ntotal and len(ids):
+            old_rows = {int(vid): row for row, vid in enumerate(index_ids(old))}
+            old_vectors = old.index.reconstruct_n(0, old.ntotal)
+            for i, vid in enumerate(ids.tolist()):
+                if vid in old_rows:
+                    vectors[i] = old_vectors[old_rows[vid]]
+        index = new_space_index(space)
+        if len(ids):
+            index.add_with_ids(vectors, ids)
+        rebuilt[space] = index
+    return rebuilt
+
+
+def search_similar_twins(query_vector, top_k=5, filters=None, space="neurotransmitters"):
+    query = np.array([space_vector(space, query_vector)], dtype='float32')
+    metadata = load_metadata()
+    index = load_space_index(space, metadata)
 
     if index.ntotal == 0:
         return []
 
-    distances, indices = index.search(query, top_k)
+    params = None
+    tombstones = load_tombstones()
+    if tombstones:
+        selector = faiss.IDSelectorNot(faiss.IDSelectorBatch(np.array(sorted(tombstones), dtype='int64')))
+        params = faiss.SearchParameters(sel=selector)
+    distances, ids = index.search(query, top_k, params=params)
 
+    by_id = {m.get("vector_id"): m for m in metadata}
     similar = []
-    for i, idx in enumerate(indices[0]):
-        if idx >= len(metadata):
+    for i, vid in enumerate(ids[0]):
+        entry = by_id.get(int(vid))
+        if entry is None:
+            continue
+        if not matches_filters(entry, filters):
             continue
-        entry = metadata[idx]
-        if filters:
-            match = all(entry.get(k) == v for k, v in filters.items())
-            if not match:
-                continue
         entry["distance"] = float(distances[0][i])
         similar.append(entry)
     return similar